@@ -0,0 +1,164 @@
+import zlib
+
+import numpy as np
+
+from question_classifier import normalize_text
+
+# Служебные и вежливые слова, которые не меняют смысла вопроса
+STOPWORDS = frozenset("""
+    а ах бы в во вам вас вы где да для до же за здравствуйте и из или как какой какая какое
+    какие к ко ли либо мне меня мной мы на нам нас не ни но ну о об от по подскажите пожалуйста
+    при про с со скажите спасибо так там то тут у уже что чтобы я это этот эта эти можно
+""".split())
+
+
+def content_words(text: str) -> tuple:
+    """
+    Возвращает значимые слова вопроса в исходном порядке: нормализованный текст без служебных слов.
+    Числа, даты, дни недели и фамилии остаются значимыми словами.
+    """
+    return tuple(word for word in normalize_text(text).split() if word not in STOPWORDS)
+
+
+class AnswerCache:
+    """
+    Класс AnswerCache представляет собой кэш ответов, который находит похожие по смыслу
+    (перефразированные) вопросы по косинусному сходству хэшированных векторов n-грамм.
+
+    N-граммы не различают вопросы, отличающиеся одной датой, числом, днем недели или фамилией
+    ("9 мая" и "1 мая" дают сходство 0.955), а для медицинского бота это неверный ответ.
+    Поэтому сходство считается по значимым словам (без служебных), совпадение дополнительно
+    требует одинакового набора значимых слов, а для коротких вопросов порог сходства выше.
+
+    Каждая запись привязана к версии данных, на которых был построен ответ. При смене версии
+    (например, изменилось расписание или контакты на сайте) все записи удаляются.
+
+    Attributes:
+        dim (int): Размерность хэшированного вектора.
+        threshold (float): Минимальное косинусное сходство для совпадения.
+        maxsize (int): Максимальное число записей; при переполнении вытесняются самые старые.
+        ngram (int): Длина символьных n-грамм.
+        version: Версия данных, к которой относятся текущие записи.
+        hits (int): Число попаданий в кэш.
+        misses (int): Число промахов.
+    """
+
+    def __init__(self, maxsize: int = 512, threshold: float = 0.9, dim: int = 2048, ngram: int = 3):
+        """
+        Инициализирует экземпляр класса AnswerCache.
+
+        Args:
+            maxsize (int): Максимальное число записей.
+            threshold (float): Минимальное косинусное сходство для совпадения.
+            dim (int): Размерность хэшированного вектора.
+            ngram (int): Длина символьных n-грамм.
+        """
+        self.maxsize = maxsize
+        self.threshold = threshold
+        self.dim = dim
+        self.ngram = ngram
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self._vectors = np.zeros((maxsize, dim), dtype=np.float32)
+        self._answers = [None] * maxsize
+        self._keys = [None] * maxsize
+        self._size = 0
+        self._next = 0
+
+    def embed(self, text: str) -> np.ndarray:
+        """
+        Строит нормированный хэшированный вектор символьных n-грамм текста.
+
+        Args:
+            text (str): Исходный текст.
+
+        Returns:
+            np.ndarray: Вектор единичной длины размерности `dim`.
+        """
+        vector = np.zeros(self.dim, dtype=np.float32)
+        padded = f" {' '.join(content_words(text))} "
+        for i in range(max(len(padded) - self.ngram + 1, 1)):
+            gram = padded[i:i + self.ngram].encode("utf-8")
+            vector[zlib.crc32(gram) % self.dim] += 1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def min_similarity(self, words) -> float:
+        """
+        Порог сходства для вопроса: для вопросов короче шести значимых слов он выше,
+        потому что одно отличающееся слово в них меняет мало n-грамм.
+        """
+        return self.threshold + (1 - self.threshold) * max(6 - len(words), 0) / 6
+
+    def _check_version(self, version):
+        """Удаляет все записи, если версия данных изменилась."""
+        if version != self.version:
+            self.clear()
+            self.version = version
+
+    def get(self, question: str, version):
+        """
+        Ищет ответ на похожий вопрос, построенный на данных указанной версии.
+
+        Args:
+            question (str): Вопрос пользователя.
+            version: Текущая версия данных.
+
+        Returns:
+            str | None: Сохраненный ответ или None, если похожий вопрос не найден.
+        """
+        self._check_version(version)
+        if self._size:
+            words = content_words(question)
+            key = frozenset(words)
+            threshold = self.min_similarity(words)
+            similarities = self._vectors[:self._size] @ self.embed(question)
+            for index in np.argsort(-similarities):
+                if similarities[index] < threshold:
+                    break
+                if self._keys[index] == key:
+                    self.hits += 1
+                    return self._answers[index]
+        self.misses += 1
+        return None
+
+    def set(self, question: str, answer: str, version):
+        """
+        Сохраняет ответ на вопрос. Ответы, построенные на устаревших данных, не сохраняются.
+
+        Args:
+            question (str): Вопрос пользователя.
+            answer (str): Ответ на вопрос.
+            version: Версия данных, на которых построен ответ.
+        """
+        if version != self.version:
+            return
+        self._vectors[self._next] = self.embed(question)
+        self._answers[self._next] = answer
+        self._keys[self._next] = frozenset(content_words(question))
+        self._next = (self._next + 1) % self.maxsize
+        self._size = min(self._size + 1, self.maxsize)
+
+    def clear(self):
+        """Удаляет все записи, не сбрасывая счетчики."""
+        self._answers = [None] * self.maxsize
+        self._keys = [None] * self.maxsize
+        self._size = 0
+        self._next = 0
+
+    def stats(self) -> dict:
+        """
+        Возвращает статистику использования кэша.
+
+        Returns:
+            Dict[str, Any]: Размер, число попаданий и промахов и доля попаданий.
+        """
+        total = self.hits + self.misses
+        return {
+            "size": self._size,
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
@@ -0,0 +1,147 @@
+import asyncio
+import json
+
+import aiohttp
+
+from config import CONFIG
+
+# Статусы, при которых запрос повторяется: сервис временно недоступен
+RETRY_STATUSES = {502, 503, 504}
+# Методы, повтор которых не меняет результат. Остальные (POST /qa — это обращение к LLM)
+# повторяются, только если соединение не установлено и запрос точно не дошел до сервера.
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+class ApiClient:
+    """
+    Класс ApiClient представляет собой асинхронный HTTP-клиент к API бота.
+    Использует общую сессию с пулом соединений и keep-alive, ограничивает время запросов
+    и повторяет запросы при временных ошибках соединения (запросы POST — только если
+    соединение не было установлено).
+
+    Attributes:
+        base_url (str): Базовый URL API.
+        timeout (float): Общий таймаут запроса в секундах.
+        connect_timeout (float): Таймаут установки соединения в секундах.
+        retries (int): Число повторов при временных ошибках.
+        backoff (float): Базовая задержка между повторами в секундах (удваивается с каждой попыткой).
+        limit (int): Максимальное число одновременных соединений в пуле.
+        session: Общая асинхронная HTTP-сессия.
+    """
+
+    def __init__(self, base_url: str, timeout: float = None, connect_timeout: float = None,
+                 retries: int = None, backoff: float = None, limit: int = None):
+        """
+        Инициализирует экземпляр класса ApiClient. Сессия создается лениво при первом запросе.
+
+        Args:
+            base_url (str): Базовый URL API.
+            timeout (float, optional): Общий таймаут запроса в секундах.
+            connect_timeout (float, optional): Таймаут установки соединения в секундах.
+            retries (int, optional): Число повторов при временных ошибках.
+            backoff (float, optional): Базовая задержка между повторами в секундах.
+            limit (int, optional): Максимальное число одновременных соединений.
+        """
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout if timeout is not None else CONFIG.get("api_timeout", 60)
+        self.connect_timeout = connect_timeout if connect_timeout is not None else CONFIG.get("api_connect_timeout", 5)
+        self.retries = retries if retries is not None else CONFIG.get("api_retries", 2)
+        self.backoff = backoff if backoff is not None else CONFIG.get("api_retry_backoff", 0.5)
+        self.limit = limit if limit is not None else CONFIG.get("api_pool_size", 100)
+        self.session = None
+
+    def _get_session(self):
+        """
+        Возвращает общую HTTP-сессию, создавая ее при первом обращении.
+
+        Returns:
+            aiohttp.ClientSession: Сессия с пулом соединений и поддержкой keep-alive.
+        """
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.limit),
+                timeout=aiohttp.ClientTimeout(total=self.timeout, connect=self.connect_timeout)
+            )
+        return self.session
+
+    async def close(self):
+        """Закрывает общую HTTP-сессию и освобождает соединения пула."""
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+
+    async def request(self, method: str, path: str, **kwargs) -> dict:
+        """
+        Выполняет запрос к API и возвращает JSON-ответ.
+
+        Args:
+            method (str): HTTP-метод.
+            path (str): Путь относительно базового URL.
+            **kwargs: Дополнительные параметры запроса aiohttp (json, params, headers).
+
+        Returns:
+            dict: Разобранный JSON-ответ.
+
+        Raises:
+            aiohttp.ClientError, asyncio.TimeoutError: Если запрос не удался после всех повторов.
+
+        Описание логики:
+        - Ошибки соединения и ответы 502/503/504 повторяются до `retries` раз
+          с экспоненциальной задержкой.
+        - Неидемпотентные запросы (POST) повторяются только при ошибке установки соединения:
+          обрыв после отправки (ServerDisconnected) или ответ прокси 502/504 не означают,
+          что сервер не выполнил запрос.
+        - Таймаут ответа не повторяется, чтобы не дублировать долгие запросы.
+        """
+        url = f"{self.base_url}{path}"
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        for attempt in range(self.retries + 1):
+            try:
+                async with self._get_session().request(method, url, **kwargs) as response:
+                    if idempotent and response.status in RETRY_STATUSES and attempt < self.retries:
+                        raise aiohttp.ClientResponseError(
+                            response.request_info, response.history, status=response.status
+                        )
+                    response.raise_for_status()
+                    return await response.json()
+            except (aiohttp.ClientConnectionError, aiohttp.ClientResponseError) as e:
+                if isinstance(e, aiohttp.ClientConnectorError):
+                    retryable = True
+                elif not idempotent:
+                    retryable = False
+                else:
+                    retryable = isinstance(e, aiohttp.ClientConnectionError) or e.status in RETRY_STATUSES
+                if not retryable or attempt >= self.retries:
+                    raise
+                await asyncio.sleep(self.backoff * 2 ** attempt)
+
+    async def stream_events(self, path: str, **kwargs):
+        """
+        Выполняет POST-запрос к потоковому маршруту API и разбирает ответ Server-Sent Events.
+
+        Args:
+            path (str): Путь относительно базового URL.
+            **kwargs: Дополнительные параметры запроса aiohttp (json, headers).
+
+        Yields:
+            Tuple[str, dict]: Имя события ("message", если не указано) и разобранные JSON-данные.
+        """
+        async with self._get_session().post(f"{self.base_url}{path}", **kwargs) as response:
+            response.raise_for_status()
+            event = "message"
+            async for raw_line in response.content:
+                line = raw_line.decode("utf-8").rstrip("\r\n")
+                if not line:
+                    event = "message"
+                elif line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                elif line.startswith("data:"):
+                    yield event, json.loads(line[len("data:"):].strip())
+
+    async def get(self, path: str, **kwargs) -> dict:
+        """Выполняет GET-запрос к API."""
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path: str, **kwargs) -> dict:
+        """Выполняет POST-запрос к API."""
+        return await self.request("POST", path, **kwargs)
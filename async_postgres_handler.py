@@ -0,0 +1,258 @@
+from datetime import datetime
+
+import asyncpg
+
+from config import CONFIG
+from db_handler import *
+from db_migrations import apply_migrations_async
+from write_behind import CallWriteBehind
+
+
+class AsyncPostgreSQLHandler(AsyncDatabaseHandler):
+    """
+    Асинхронный обработчик PostgreSQL на пуле соединений asyncpg.
+
+    Каждый запрос берет соединение из пула, поэтому одновременные вызовы не делят
+    один курсор и не блокируют цикл событий. asyncpg подготавливает запросы на сервере
+    и кэширует подготовленные запросы в каждом соединении пула (`statement_cache_size`).
+    Каждый запрос ограничен по времени (`query_timeout`). При подключении применяются
+    новые миграции схемы, если включен `auto_migrate`.
+
+    Если включен `write_behind`, создание запросов на звонок и изменение их статуса
+    записываются пакетами через CallWriteBehind (результат возвращается после фиксации).
+    """
+
+    def __init__(self, dbname, user, password, host="localhost", port="5432",
+                 min_size=None, max_size=None, query_timeout=None, statement_cache_size=None, auto_migrate=None,
+                 write_behind=None):
+        self.dbname = dbname
+        self.user = user
+        self.password = password
+        self.host = host
+        self.port = port
+        self.min_size = min_size if min_size is not None else CONFIG.get("db_pool_min_size", 1)
+        self.max_size = max_size if max_size is not None else CONFIG.get("db_pool_max_size", 10)
+        self.query_timeout = query_timeout if query_timeout is not None else CONFIG.get("db_query_timeout", 5)
+        self.statement_cache_size = (statement_cache_size if statement_cache_size is not None
+                                     else CONFIG.get("db_statement_cache_size", 100))
+        self.auto_migrate = auto_migrate if auto_migrate is not None else CONFIG.get("db_auto_migrate", True)
+        self.write_behind = write_behind if write_behind is not None else CONFIG.get("db_write_behind", True)
+        self.pool = None
+        self.writer = None
+
+    async def connect(self):
+        """Создание пула соединений; вызывается из работающего цикла событий"""
+        if self.pool is not None:
+            return
+        try:
+            self.pool = await asyncpg.create_pool(
+                database=self.dbname,
+                user=self.user,
+                password=self.password,
+                host=self.host,
+                port=int(self.port),
+                min_size=self.min_size,
+                max_size=self.max_size,
+                command_timeout=self.query_timeout,
+                statement_cache_size=self.statement_cache_size
+            )
+            if self.auto_migrate:
+                await self.migrate()
+            if self.write_behind:
+                self.writer = CallWriteBehind(self.pool, query_timeout=self.query_timeout)
+                self.writer.start()
+        except Exception as e:
+            print(f"Error connecting to database: {e}")
+
+    async def migrate(self):
+        """Применение новых миграций схемы (см. db_migrations.py)"""
+        applied = await apply_migrations_async(self.pool)
+        if applied:
+            print(f"Applied schema migrations: {applied}")
+
+    async def close(self):
+        """Закрытие пула соединений; накопленные пакетные записи сначала фиксируются"""
+        if self.writer is not None:
+            await self.writer.close()
+            self.writer = None
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    async def connect_listener(self):
+        """Отдельное соединение вне пула для LISTEN: оно занято подпиской все время работы"""
+        return await asyncpg.connect(
+            database=self.dbname,
+            user=self.user,
+            password=self.password,
+            host=self.host,
+            port=int(self.port),
+            timeout=self.query_timeout
+        )
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def get_user_by_id(self, user_id):
+        try:
+            row = await self.pool.fetchrow("SELECT * FROM users WHERE user_id = $1", user_id,
+                                           timeout=self.query_timeout)
+            return dict(row) if row else None
+        except Exception as e:
+            print(f"Error fetching user data: {e}")
+            return None
+
+    async def is_user_verified(self, user_id):
+        """Проверка верификации пользователя; None при ошибке базы данных"""
+        try:
+            result = await self.pool.fetchval("SELECT is_verified FROM users WHERE user_id = $1", user_id,
+                                              timeout=self.query_timeout)
+            return bool(result)
+        except Exception as e:
+            print(f"Error checking user verification: {e}")
+            return None  # Неизвестно: в отличие от False, не кэшируется менеджером
+
+    async def is_user_registered(self, user_id):
+        """Проверка, зарегистрирован ли пользователь; None при ошибке базы данных"""
+        try:
+            return await self.pool.fetchval("SELECT EXISTS(SELECT 1 FROM users WHERE user_id = $1)", user_id,
+                                            timeout=self.query_timeout)
+        except Exception as e:
+            print(f"Error checking user registration: {e}")
+            return None  # Неизвестно: в отличие от False, не кэшируется менеджером
+
+    async def register_user(self, user_id, username, phone, full_name=""):
+        try:
+            # Одна операция вместо проверки и вставки: уже зарегистрированный пользователь не изменяется
+            await self.pool.execute("""
+                INSERT INTO users (user_id, username, phone, full_name, is_verified, registration_date)
+                VALUES ($1, $2, $3, $4, $5, $6)
+                ON CONFLICT (user_id) DO NOTHING
+            """, user_id, username, phone, full_name, False, datetime.now(), timeout=self.query_timeout)
+            return True
+        except Exception as e:
+            print(f"Registration error: {e}")
+            return False
+
+    async def create_call_request(self, user_id):
+        if self.writer is not None:
+            return await self.writer.create_call_request(user_id)
+        try:
+            # Телефон берется из users той же вставкой; если пользователя нет, строка не вставляется
+            result = await self.pool.execute("""
+                INSERT INTO call_requests (user_id, phone, request_time, call_status)
+                SELECT user_id, phone, $2, FALSE FROM users WHERE user_id = $1
+            """, user_id, datetime.now(), timeout=self.query_timeout)
+            return result != "INSERT 0 0"
+        except Exception as e:
+            print(f"Call request error: {e}")
+            return False
+
+    async def get_pending_requests(self):
+        """Получение ожидающих запросов"""
+        try:
+            rows = await self.pool.fetch("""
+                SELECT * FROM call_requests
+                WHERE call_status = FALSE
+                ORDER BY request_time, request_id
+            """, timeout=self.query_timeout)
+            return [dict(row) for row in rows]
+        except Exception as e:
+            print(f"Error fetching pending requests: {e}")
+            return []
+
+    async def get_pending_requests_page(self, limit=100, after=None):
+        """
+        Страница очереди ожидающих запросов в порядке поступления (keyset-пагинация).
+
+        after — курсор (request_time, request_id) последней строки предыдущей страницы;
+        запрос читает только частичный индекс call_requests_pending_idx.
+        """
+        try:
+            if after is None:
+                rows = await self.pool.fetch("""
+                    SELECT * FROM call_requests
+                    WHERE call_status = FALSE
+                    ORDER BY request_time, request_id
+                    LIMIT $1
+                """, limit, timeout=self.query_timeout)
+            else:
+                rows = await self.pool.fetch("""
+                    SELECT * FROM call_requests
+                    WHERE call_status = FALSE AND (request_time, request_id) > ($1, $2)
+                    ORDER BY request_time, request_id
+                    LIMIT $3
+                """, after[0], after[1], limit, timeout=self.query_timeout)
+            return [dict(row) for row in rows]
+        except Exception as e:
+            print(f"Error fetching pending requests: {e}")
+            return []
+
+    async def get_call_feed_cursor(self):
+        """
+        Курсор ленты запросов: xmin текущего снимка. Все запросы, невидимые в этот момент,
+        созданы транзакциями с номером не меньше курсора.
+
+        Returns:
+            int | None: Курсор или None при ошибке.
+        """
+        try:
+            return await self.pool.fetchval("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint",
+                                            timeout=self.query_timeout)
+        except Exception as e:
+            print(f"Error fetching call feed cursor: {e}")
+            return None
+
+    async def get_call_request_changes_since(self, cursor=0, after_id=0, limit=100):
+        """
+        Страница запросов для ленты в порядке request_id после after_id. С курсором — запросы,
+        созданные или изменившие статус в транзакциях с номером не меньше курсора: ожидающие
+        новые запросы отдаются событием "created", остальные — событием "status". Без курсора
+        (cursor = 0) — вся очередь ожидающих запросов событиями "created".
+
+        Returns:
+            List[dict] | None: Запросы с полем event или None при ошибке.
+        """
+        try:
+            rows = await self.pool.fetch("""
+                SELECT request_id, user_id, phone, request_time, call_status,
+                       CASE WHEN call_status = FALSE AND created_xid >= $1::text::xid8
+                            THEN 'created' ELSE 'status' END AS event
+                FROM call_requests
+                WHERE updated_xid >= $1::text::xid8 AND ($1 <> '0' OR call_status = FALSE)
+                  AND request_id > $2
+                ORDER BY request_id
+                LIMIT $3
+            """, str(cursor), after_id, limit, timeout=self.query_timeout)
+            return [dict(row) for row in rows]
+        except Exception as e:
+            print(f"Error fetching call request changes: {e}")
+            return None
+
+    async def get_pending_requests_by_user(self, user_id):
+        try:
+            rows = await self.pool.fetch("""
+                SELECT * FROM call_requests
+                WHERE user_id = $1 AND call_status = FALSE
+                ORDER BY request_time DESC
+            """, user_id, timeout=self.query_timeout)
+            return [dict(row) for row in rows]
+        except Exception as e:
+            print(f"Error fetching pending requests: {e}")
+            return []
+
+    async def update_call_status(self, request_id, status=True):
+        if self.writer is not None:
+            return await self.writer.update_call_status(request_id, status)
+        try:
+            await self.pool.execute("""
+                UPDATE call_requests SET call_status = $1 WHERE request_id = $2
+            """, status, request_id, timeout=self.query_timeout)
+            return True
+        except Exception as e:
+            print(f"Error updating call status: {e}")
+            return False
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import AsyncIterator, List
 from langchain_core.messages import BaseMessage
 
 class BaseLLMAdapter(ABC):
@@ -11,6 +11,10 @@ class BaseLLMAdapter(ABC):
     async def get_response(self, messages: List[BaseMessage], context: dict = None,**kwargs) -> str:
         pass
 
+    async def stream_response(self, messages: List[BaseMessage], context: dict = None, **kwargs) -> AsyncIterator[str]:
+        # По умолчанию ответ отдается одним фрагментом; адаптеры с потоковой генерацией переопределяют метод
+        yield await self.get_response(messages, context=context, **kwargs)
+
     @abstractmethod
     def format_message(self, text: str, is_user: bool) -> BaseMessage:
         pass
\ No newline at end of file
@@ -0,0 +1,207 @@
+import asyncio
+import json
+from datetime import datetime
+
+from config import CONFIG
+from db_migrations import CALL_REQUESTS_CHANNEL
+
+
+def row_event(row: dict, event: str = "created") -> dict:
+    """Преобразует строку call_requests в событие ленты (в том же виде, что и уведомление триггера)."""
+    request_time = row.get("request_time")
+    return {
+        "event": event,
+        "request_id": row["request_id"],
+        "user_id": row.get("user_id"),
+        "phone": row.get("phone"),
+        "request_time": request_time.isoformat() if isinstance(request_time, datetime) else request_time,
+        "call_status": row.get("call_status"),
+    }
+
+
+class CallFeed:
+    """
+    Класс CallFeed представляет собой ленту запросов на обратный звонок для операторов.
+
+    Одно соединение PostgreSQL подписано (LISTEN) на канал, в который триггер call_requests
+    публикует создание запросов и изменение их статуса; события раздаются всем подписчикам
+    через их очереди.
+
+    Подписчик сначала получает запросы, созданные или изменившие статус после его курсора
+    (или всю очередь ожидающих запросов при первом подключении), затем событие "synced"
+    с новым курсором и события в реальном времени. Так запрос, закрытый пока клиент был
+    отключен, тоже приходит событием "status". Подписка оформляется до чтения изменений,
+    поэтому события между чтением и подпиской не теряются, а уже отданные запросы
+    отбрасываются.
+
+    Курсор — xmin снимка (см. миграции 4 и 5), а не request_id: номер запроса выдается
+    при вставке, а видимым запрос становится при фиксации, поэтому запрос с меньшим номером
+    может появиться позже. Уведомления доставляются в порядке фиксации, так что после события
+    все еще не полученные создания и изменения статуса сделаны транзакциями с номером
+    не меньше его курсора. При продолжении с курсора событие может прийти повторно; клиент
+    отбрасывает повторы по request_id.
+
+    Если подписчик не успевает читать события или соединение LISTEN обрывается, его поток
+    завершается: клиент переподключается с последним курсором и догоняет пропущенное.
+
+    Attributes:
+        handler (AsyncPostgreSQLHandler): Обработчик базы данных.
+        channel (str): Канал LISTEN/NOTIFY.
+        queue_size (int): Размер очереди событий одного подписчика.
+        backlog_page (int): Размер страницы при чтении пропущенных запросов.
+        heartbeat (float): Интервал пустых событий для поддержания соединения (секунды).
+        reconnect_delay (float): Пауза перед переподключением LISTEN (секунды).
+        connected (bool): Подписано ли соединение на канал.
+    """
+
+    def __init__(self, handler, channel: str = CALL_REQUESTS_CHANNEL, queue_size: int = None,
+                 backlog_page: int = None, heartbeat: float = None, reconnect_delay: float = None):
+        """
+        Инициализирует экземпляр класса CallFeed. Не указанные параметры берутся из `CONFIG`.
+
+        Args:
+            handler (AsyncPostgreSQLHandler): Обработчик базы данных с подключенным пулом.
+            channel (str): Канал LISTEN/NOTIFY.
+            queue_size (int, optional): Размер очереди событий одного подписчика.
+            backlog_page (int, optional): Размер страницы при чтении пропущенных запросов.
+            heartbeat (float, optional): Интервал пустых событий в секундах.
+            reconnect_delay (float, optional): Пауза перед переподключением LISTEN в секундах.
+        """
+        self.handler = handler
+        self.channel = channel
+        self.queue_size = queue_size if queue_size is not None else CONFIG.get("call_feed_queue_size", 1000)
+        self.backlog_page = backlog_page if backlog_page is not None else CONFIG.get("call_feed_backlog_page", 500)
+        self.heartbeat = heartbeat if heartbeat is not None else CONFIG.get("call_feed_heartbeat", 15)
+        self.reconnect_delay = (reconnect_delay if reconnect_delay is not None
+                                else CONFIG.get("call_feed_reconnect_delay", 2))
+        self.connected = False
+        self._subscribers = set()
+        self._task = None
+
+    def start(self):
+        """Запускает фоновую подписку на канал; вызывается из работающего цикла событий."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._listen_loop())
+
+    async def stop(self):
+        """Останавливает подписку и завершает потоки всех подписчиков."""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        self._drop_subscribers()
+
+    async def _listen_loop(self):
+        """Держит соединение LISTEN и переподключается при обрыве."""
+        while True:
+            conn = None
+            try:
+                conn = await self.handler.connect_listener()
+                closed = asyncio.Event()
+                conn.add_termination_listener(lambda _: closed.set())
+                await conn.add_listener(self.channel, self._on_notify)
+                # Подписчики, подключившиеся без активного LISTEN, могли пропустить события
+                self._drop_subscribers()
+                self.connected = True
+                await closed.wait()
+                print("Соединение LISTEN закрыто, переподключение")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Ошибка подписки на {self.channel}: {e}")
+            finally:
+                self.connected = False
+                if conn is not None and not conn.is_closed():
+                    await conn.close()
+            self._drop_subscribers()
+            await asyncio.sleep(self.reconnect_delay)
+
+    def _on_notify(self, connection, pid, channel, payload):
+        """Раздает уведомление подписчикам; отстающие подписчики отключаются."""
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            print(f"Некорректное уведомление {channel}: {payload!r}")
+            return
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self._close_subscriber(queue)
+
+    def _close_subscriber(self, queue):
+        """Отключает подписчика: очищает его очередь и кладет признак завершения."""
+        self._subscribers.discard(queue)
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+    def _drop_subscribers(self):
+        for queue in list(self._subscribers):
+            self._close_subscriber(queue)
+
+    async def subscribe(self, cursor: int = None):
+        """
+        Подписывает на ленту запросов.
+
+        Args:
+            cursor (int, optional): Последний полученный клиентом курсор. Если не указан,
+                                    сначала отдается вся очередь ожидающих запросов, иначе —
+                                    запросы, созданные или изменившие статус после курсора.
+
+        Yields:
+            dict | None: Событие ("created", "status" или "synced") с полем cursor — курсором,
+                         с которого можно продолжить после этого события; или None — пустое
+                         событие раз в `heartbeat` секунд без событий, чтобы соединение
+                         не закрывалось по простою. Поток завершается при ошибке чтения очереди.
+        """
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        try:
+            # Курсор берется до чтения очереди: все, что чтение не увидит, придет уведомлением
+            synced = await self.handler.get_call_feed_cursor()
+            if synced is None:
+                return
+            # Пропущенные изменения страницами по request_id; до конца страниц курсор не сдвигается
+            replayed = set()
+            last_id = 0
+            while True:
+                rows = await self.handler.get_call_request_changes_since(cursor or 0, last_id,
+                                                                         self.backlog_page)
+                if rows is None:
+                    return
+                for row in rows:
+                    replayed.add(row["request_id"])
+                    yield dict(row_event(row, row["event"]), cursor=cursor)
+                    last_id = row["request_id"]
+                if len(rows) < self.backlog_page:
+                    break
+            cursor = max(cursor or 0, synced)
+            yield {"event": "synced", "cursor": cursor}
+
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if event is None:
+                    return
+                cursor = max(cursor, event.get("cursor") or 0)
+                if event.get("event") == "created" and event.get("request_id") in replayed:
+                    continue  # Уже отдан при чтении пропущенных изменений
+                yield dict(event, cursor=cursor)
+        finally:
+            self._subscribers.discard(queue)
+
+    def stats(self) -> dict:
+        """
+        Возвращает состояние ленты.
+
+        Returns:
+            Dict[str, Any]: Подписано ли соединение на канал и число подписчиков.
+        """
+        return {"connected": self.connected, "subscribers": len(self._subscribers)}
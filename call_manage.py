@@ -1,18 +1,66 @@
+from config import CONFIG
 from db_handler import *
+from ttl_cache import TTLCache
+
+
+class UserStatusCache:
+    """
+    Кэш состояния пользователей (зарегистрирован / верифицирован) со сквозной записью.
+
+    Значения обновляются при записи через менеджер, а изменения, сделанные в обход него
+    (например, верификация оператором), подхватываются по истечении времени жизни записи.
+    """
+
+    def __init__(self, maxsize=None, ttl=None):
+        self.cache = TTLCache(
+            maxsize=maxsize if maxsize is not None else CONFIG.get("user_cache_size", 10000),
+            ttl=ttl if ttl is not None else CONFIG.get("user_cache_ttl", 300)
+        )
+
+    def get(self, user_id, field):
+        """Значение поля ("registered" или "verified") или None при промахе"""
+        return self.cache.get((user_id, field))
+
+    def set(self, user_id, field, value):
+        self.cache.set((user_id, field), value)
+
+    def registered(self, user_id):
+        """Отмечает регистрацию; верификация существующего пользователя неизвестна и перечитывается"""
+        self.cache.set((user_id, "registered"), True)
+        self.cache.pop((user_id, "verified"))
+
+    def stats(self):
+        return self.cache.stats()
 
 
 class UserCallManager:
-    def __init__(self, db_handler: DatabaseHandler):
+    def __init__(self, db_handler: DatabaseHandler, status_cache: UserStatusCache = None):
         self.db_handler = db_handler
+        self.status_cache = status_cache or UserStatusCache()
 
     def is_user_verified(self, user_id):
-        return self.db_handler.is_user_verified(user_id)
+        verified = self.status_cache.get(user_id, "verified")
+        if verified is None:
+            verified = self.db_handler.is_user_verified(user_id)
+            if verified is None:
+                return False  # Ошибка базы данных не кэшируется
+            self.status_cache.set(user_id, "verified", bool(verified))
+        return verified
 
     def is_user_registered(self, user_id):
-        return self.db_handler.is_user_registered(user_id)
+        registered = self.status_cache.get(user_id, "registered")
+        if registered is None:
+            registered = self.db_handler.is_user_registered(user_id)
+            if registered is None:
+                return False  # Ошибка базы данных не кэшируется
+            self.status_cache.set(user_id, "registered", bool(registered))
+        return registered
 
     def register_user(self, user_id, username, phone, full_name=""):
-        return self.db_handler.register_user(user_id, username, phone, full_name)
+        result = self.db_handler.register_user(user_id, username, phone, full_name)
+        if result:
+            self.status_cache.registered(user_id)
+        return result
 
     def create_call_request(self, user_id):
         return self.db_handler.create_call_request(user_id)
@@ -20,8 +68,69 @@ class UserCallManager:
     def get_pending_requests(self):
         return self.db_handler.get_pending_requests()
 
+    def get_pending_requests_page(self, limit=100, after=None):
+        return self.db_handler.get_pending_requests_page(limit, after)
+
     def update_call_status(self, request_id, status=True):
         return self.db_handler.update_call_status(request_id, status)
 
+    def cache_stats(self):
+        """Статистика кэша состояния пользователей (размер, попадания, промахи, доля попаданий)"""
+        return self.status_cache.stats()
+
     def close(self):
-        self.db_handler.close()
\ No newline at end of file
+        self.db_handler.close()
+
+
+class AsyncUserCallManager:
+    """Асинхронный вариант UserCallManager для обработчиков в цикле событий"""
+
+    def __init__(self, db_handler: AsyncDatabaseHandler, status_cache: UserStatusCache = None):
+        self.db_handler = db_handler
+        self.status_cache = status_cache or UserStatusCache()
+
+    async def connect(self):
+        await self.db_handler.connect()
+
+    async def is_user_verified(self, user_id):
+        verified = self.status_cache.get(user_id, "verified")
+        if verified is None:
+            verified = await self.db_handler.is_user_verified(user_id)
+            if verified is None:
+                return False  # Ошибка базы данных не кэшируется
+            self.status_cache.set(user_id, "verified", bool(verified))
+        return verified
+
+    async def is_user_registered(self, user_id):
+        registered = self.status_cache.get(user_id, "registered")
+        if registered is None:
+            registered = await self.db_handler.is_user_registered(user_id)
+            if registered is None:
+                return False  # Ошибка базы данных не кэшируется
+            self.status_cache.set(user_id, "registered", bool(registered))
+        return registered
+
+    async def register_user(self, user_id, username, phone, full_name=""):
+        result = await self.db_handler.register_user(user_id, username, phone, full_name)
+        if result:
+            self.status_cache.registered(user_id)
+        return result
+
+    async def create_call_request(self, user_id):
+        return await self.db_handler.create_call_request(user_id)
+
+    async def get_pending_requests(self):
+        return await self.db_handler.get_pending_requests()
+
+    async def get_pending_requests_page(self, limit=100, after=None):
+        return await self.db_handler.get_pending_requests_page(limit, after)
+
+    async def update_call_status(self, request_id, status=True):
+        return await self.db_handler.update_call_status(request_id, status)
+
+    def cache_stats(self):
+        """Статистика кэша состояния пользователей (размер, попадания, промахи, доля попаданий)"""
+        return self.status_cache.stats()
+
+    async def close(self):
+        await self.db_handler.close()
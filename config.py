@@ -10,7 +10,82 @@ CONFIG = {
     "db_user": "postgres",
     "db_password": "123",
     "db_host": "localhost",
-    "db_port": "5432"
+    "db_port": "5432",
+    "db_pool_min_size": 1,  # Минимальное число соединений в пуле PostgreSQL
+    "db_pool_max_size": 10,  # Максимальное число соединений в пуле PostgreSQL
+    "db_query_timeout": 5,  # Предельное время одного запроса к базе данных (секунды)
+    "db_statement_cache_size": 100,  # Размер кэша подготовленных запросов в каждом соединении пула
+    "db_auto_migrate": True,  # Применять новые миграции схемы при подключении к базе данных
+    "db_write_behind": True,  # Записывать запросы на звонок и изменения статуса пакетами (асинхронный обработчик)
+    "db_batch_size": 500,  # Максимальное число операций в одном пакете
+    "db_flush_interval": 0.02,  # Максимальное время накопления пакета (секунды)
+    "call_feed_enabled": False,  # Лента запросов на звонок для операторов (/calls/feed, LISTEN/NOTIFY)
+    "call_feed_token": "",  # Токен заголовка X-Operator-Token для /calls/feed (обязателен: без него — 403)
+    "call_feed_queue_size": 1000,  # Сколько событий может накопить оператор, прежде чем поток будет закрыт
+    "call_feed_backlog_page": 500,  # Размер страницы при отдаче пропущенных запросов
+    "call_feed_heartbeat": 15,  # Интервал пустых событий для поддержания соединения (секунды)
+    "call_feed_reconnect_delay": 2,  # Пауза перед переподключением LISTEN после обрыва (секунды)
+    "user_cache_size": 10000,  # Максимальное число записей кэша состояния пользователей
+    "user_cache_ttl": 300,  # Время жизни записи кэша состояния пользователей (секунды)
+    "data_ttl": 600,  # Время жизни снимка данных с сайта (в секундах)
+    "data_retry_delay": 30,  # Пауза перед повтором неудачной загрузки сайта (удваивается, не больше data_ttl)
+    "data_max_stale": 3600,  # Возраст снимка, после которого неудачные обновления пишутся в лог (в секундах)
+    "scraper_timeout": 10,  # Таймаут загрузки одной страницы сайта (в секундах)
+    "scraper_limit_per_host": 4,  # Максимум одновременных соединений к одному хосту
+    "scraper_keepalive": 30,  # Время удержания простаивающего соединения (в секундах)
+    "page_cache_dir": "data/page_cache",  # Директория дискового кэша страниц сайта
+    "html_parser": "lxml",  # Движок парсинга HTML: "lxml" или "html.parser"
+    "history_max_turns": 5,  # Сколько последних пар вопрос-ответ хранится в истории пользователя
+    "max_sessions": 1000,  # Максимальное число хранимых пользовательских сессий
+    "session_idle_ttl": 1800,  # Время простоя (в секундах), после которого сессия удаляется
+    "prompt_token_budget": 4000,  # Бюджет токенов на один промпт к модели
+    "classifier_data": "classifier_questions.json",  # Размеченные вопросы для локального классификатора
+    "classifier_threshold": 0.6,  # Порог уверенности локального классификатора; ниже него вызывается LLM
+    "classification_cache_size": 1024,  # Максимальное число записей в кэше классификации
+    "classification_cache_ttl": 3600,  # Время жизни записи кэша классификации (в секундах)
+    "answer_cache_size": 512,  # Максимальное число ответов в кэше похожих вопросов
+    "answer_cache_threshold": 0.9,  # Минимальное сходство вопросов для ответа из кэша (для коротких вопросов выше)
+    "api_timeout": 60,  # Общий таймаут запроса Telegram-бота к API (в секундах)
+    "api_connect_timeout": 5,  # Таймаут установки соединения с API (в секундах)
+    "api_retries": 2,  # Число повторов запроса к API при временных ошибках
+    "api_retry_backoff": 0.5,  # Базовая задержка между повторами (в секундах)
+    "api_pool_size": 100,  # Максимальное число соединений в пуле клиента API
+    "bot_mode": "http",  # "http" — бот обращается к /qa; "inprocess" — бот и API в одном процессе;
+                         # "webhook" — бот принимает обновления маршрутом /telegram/webhook приложения FastAPI
+    "webhook_url": "",  # Публичный URL маршрута /telegram/webhook для регистрации в Telegram
+    "webhook_secret": "",  # Секрет заголовка X-Telegram-Bot-Api-Secret-Token (обязателен в режиме "webhook")
+    "webhook_workers": 8,  # Число обработчиков очереди обновлений
+    "webhook_queue_size": 1000,  # Максимальный размер очереди обновлений
+    "telegram_base_url": None,  # Альтернативный адрес Bot API (например, локальный фейковый сервер)
+    "telegram_streaming": True,  # Показывать ответ в Telegram по мере генерации
+    "telegram_edit_interval": 1.0,  # Минимальный интервал между правками сообщения (в секундах)
+    "batch_concurrency": 4,  # Число одновременных обращений к LLM при обработке /qa/batch по умолчанию
+    "batch_max_concurrency": 16,  # Верхний предел concurrency, который может запросить клиент /qa/batch
+    "batch_max_items": 100,  # Максимальное число вопросов в одном запросе /qa/batch
+    "llm_max_concurrency": 8,  # Максимальное число одновременных вызовов GigaChat
+    "llm_timeout": 20,  # Предельное время одного вызова GigaChat (секунды)
+    "llm_deadline": 25,  # Предельное время всех попыток вызова вместе с задержками (секунды); классификация
+                         # и ответ моделью вместе должны укладываться в api_timeout
+    "llm_retries": 2,  # Число повторов вызова GigaChat при таймаутах, 429 и 5xx
+    "llm_retry_base_delay": 0.5,  # Базовая задержка перед повтором (секунды, растет экспоненциально)
+    "llm_retry_max_delay": 5,  # Максимальная задержка перед повтором (секунды)
+    "breaker_failure_threshold": 5,  # Число сбоев подряд, после которого вызовы GigaChat приостанавливаются
+    "breaker_reset_timeout": 30,  # Пауза (секунды) перед пробным вызовом после размыкания цепи
+    "llm_backend": "gigachat",  # Модель: "gigachat" или "fake" (заглушка для нагрузочных тестов, см. load_test.py)
+    "fake_llm_latency": 0.8,  # Медианная задержка ответа заглушки (секунды)
+    "fake_llm_jitter": 0.3,  # Разброс задержки заглушки (сигма логнормального распределения)
+    "fake_llm_error_rate": 0.0,  # Доля вызовов заглушки, завершающихся ошибкой 503
+    "profile_sample_rate": 0.0,  # Доля запросов /qa, для которых в ответ добавляется дерево участков обработки
+    "profile_header": "X-Profile",  # Заголовок профилирования: "1" — дерево участков, "cpu" — и профиль CPU
+    "profile_token": "",  # Секрет заголовка X-Profile-Token; пустой — заголовок профилирования игнорируется
+    "profile_cpu": False,  # Снимать профиль CPU у всех запросов, попавших в выборку
+    "slow_request_threshold": 2.0,  # Запросы дольше порога (секунды) записываются в журнал медленных запросов
+    "slow_request_log": "data/slow_requests.log",  # Журнал медленных запросов (JSON по строке на запрос)
+    "slow_request_log_max_bytes": 5 * 1024 * 1024,  # Размер файла журнала до ротации (байты)
+    "slow_request_log_backups": 5,  # Сколько старых файлов журнала хранить
+    "slow_request_redact": False,  # Записывать в журнал хэш и длину вопроса вместо текста
+    "api_host": "0.0.0.0",  # Адрес, на котором API слушает в режимах "inprocess" и "webhook"
+    "api_port": 8000  # Порт API в режимах "inprocess" и "webhook"
 }
 
 
@@ -1,4 +1,12 @@
+import asyncio
+import hashlib
+import json
+import time
+
+from config import CONFIG
 from file_scraper import FileScraper
+from metrics import DATA_GETTER_SECONDS
+from profiler import span
 from website_scraper import WebsiteScraper
 
 class DataProcessor:
@@ -6,77 +14,242 @@ class DataProcessor:
     Класс DataProcessor представляет собой процессор данных, который использует скраперы
     для получения информации с веб-сайтов и из файлов.
 
+    Данные с сайта хранятся в виде единого снимка (контакты, расписание, результаты, памятка),
+    который обновляется в фоне по истечении времени жизни. Пока новый снимок не готов,
+    отдается предыдущий.
+
+    После неудачного обновления следующая попытка откладывается (retry_delay, удваивается
+    с каждой неудачей подряд, но не больше ttl), чтобы запросы пользователей не запускали
+    загрузку сайта, который не отвечает. Если снимок старше `max_stale`, каждая неудача
+    записывается в лог с возрастом отдаваемых данных.
+
     Attributes:
         scrapers (Dict[str, BaseScraper]): Словарь, содержащий экземпляры скраперов
                                           для работы с веб-сайтами и файлами.
+        ttl (float): Время жизни снимка данных в секундах.
+        retry_delay (float): Пауза перед повтором после первой неудачной загрузки в секундах.
+        max_stale (float): Возраст снимка в секундах, после которого неудачи обновления
+                           считаются проблемой и пишутся в лог.
+        version (str | None): Хэш содержимого текущего снимка; меняется при изменении данных на сайте.
+        failures (int): Число неудачных обновлений подряд.
     """
 
-    def __init__(self):
+    def __init__(self, ttl: float = None, retry_delay: float = None, max_stale: float = None):
         """
         Инициализирует экземпляр класса. Создает словарь с экземплярами скраперов,
         которые будут использоваться для обработки данных.
 
+        Args:
+            ttl (float, optional): Время жизни снимка данных в секундах.
+                                   По умолчанию берется из `CONFIG["data_ttl"]`.
+            retry_delay (float, optional): Пауза перед повтором после неудачной загрузки.
+                                           По умолчанию берется из `CONFIG["data_retry_delay"]`.
+            max_stale (float, optional): Допустимый возраст снимка при неудачных обновлениях.
+                                         По умолчанию берется из `CONFIG["data_max_stale"]`.
+
         Описание логики:
         - Создаются экземпляры `WebsiteScraper` и `FileScraper`.
         - Эти экземпляры сохраняются в словаре `scrapers` для дальнейшего использования.
+        - Снимок данных изначально пуст и загружается при первом обращении.
         """
         # Инициализируем скраперы без создания сессии
         self.scrapers = {
             "website": WebsiteScraper(),
             "file": FileScraper()
         }
+        self.ttl = ttl if ttl is not None else CONFIG.get("data_ttl", 600)
+        self.retry_delay = retry_delay if retry_delay is not None else CONFIG.get("data_retry_delay", 30)
+        self.max_stale = max_stale if max_stale is not None else CONFIG.get("data_max_stale", 3600)
+        self._snapshot = None
+        self._snapshot_time = 0.0
+        self.version = None
+        self.failures = 0
+        self._failed_at = None
+        self._refresh_task = None
+        self._refresh_loop_task = None
+
+    def _is_stale(self):
+        """Проверяет, истекло ли время жизни текущего снимка."""
+        return time.monotonic() - self._snapshot_time >= self.ttl
+
+    def _retry_after(self) -> float:
+        """Пауза перед следующей попыткой обновления после неудач подряд."""
+        return min(self.retry_delay * 2 ** max(self.failures - 1, 0), self.ttl)
+
+    def _backing_off(self):
+        """Проверяет, не рано ли повторять обновление после неудачной попытки."""
+        return self._failed_at is not None and time.monotonic() - self._failed_at < self._retry_after()
+
+    def _record_failure(self):
+        """Отмечает неудачное обновление; сообщает, если отдаваемый снимок старше `max_stale`."""
+        self.failures += 1
+        self._failed_at = time.monotonic()
+        if self._snapshot is not None:
+            age = self._failed_at - self._snapshot_time
+            if age >= self.max_stale:
+                print(f"Данные сайта не обновляются ({self.failures} неудач подряд): "
+                      f"снимку {age / 60:.0f} мин при допустимых {self.max_stale / 60:.0f} мин")
+
+    async def _refresh(self):
+        """
+        Загружает свежие данные с сайта и заменяет ими текущий снимок.
+
+        Описание логики:
+        - Вызывается метод `fetch_data` у `WebsiteScraper`, который использует
+          общую сессию с пулом соединений.
+        - Если данные получены, снимок заменяется целиком, а версия пересчитывается по его содержимому.
+        - При ошибке парсинга предыдущий снимок сохраняется, а неудача запоминается
+          для отложенного повтора (см. `_record_failure`).
+        """
+        try:
+            data = await self.scrapers["website"].fetch_data()
+        except Exception:
+            self._record_failure()
+            raise
+        if not data:
+            self._record_failure()
+            return
+        self._snapshot = data[0]
+        self._snapshot_time = time.monotonic()
+        self.failures = 0
+        self._failed_at = None
+        content = json.dumps(self._snapshot, ensure_ascii=False, sort_keys=True)
+        self.version = hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+    def _schedule_refresh(self):
+        """
+        Запускает фоновое обновление снимка, если оно еще не выполняется.
 
-    async def get_contacts(self):
+        Returns:
+            asyncio.Task: Задача обновления снимка.
+        """
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh())
+        return self._refresh_task
+
+    async def get_snapshot(self):
+        """
+        Асинхронно возвращает текущий снимок данных с сайта.
+
+        Returns:
+            Dict[str, Any] | None: Словарь с ключами "contacts", "schedule", "results"
+                                   и "patient_reminder" или None, если данные получить не удалось.
+
+        Описание логики:
+        - Если снимка еще нет, ожидается его первая загрузка (общая для всех вызывающих).
+        - Если снимок устарел, запускается фоновое обновление, а вызывающему сразу
+          возвращается устаревшая копия.
+        - После неудачного обновления новая попытка не запускается до истечения паузы.
+        """
+        if self._backing_off():
+            return self._snapshot
+        if self._snapshot is None:
+            try:
+                await asyncio.shield(self._schedule_refresh())
+            except Exception as e:
+                print(f"Ошибка обновления данных: {e}")
+        elif self._is_stale():
+            self._schedule_refresh()
+        return self._snapshot
+
+    async def _refresh_loop(self):
+        """
+        Периодически обновляет снимок данных с интервалом, равным времени жизни;
+        после неудачи повторяет раньше, с паузой `_retry_after`.
+        """
+        while True:
+            try:
+                await self._schedule_refresh()
+            except Exception as e:
+                print(f"Ошибка обновления данных: {e}")
+            await asyncio.sleep(self._retry_after() if self.failures else self.ttl)
+
+    def start(self):
+        """
+        Запускает фоновую задачу периодического обновления снимка.
+        Должен вызываться из работающего цикла событий (например, при старте приложения).
+        """
+        if self._refresh_loop_task is None or self._refresh_loop_task.done():
+            self._refresh_loop_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        """Останавливает фоновые задачи обновления снимка и закрывает HTTP-сессию скрапера."""
+        for task in (self._refresh_loop_task, self._refresh_task):
+            if task and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._refresh_loop_task = None
+        self._refresh_task = None
+        await self.scrapers["website"].close()
+
+    async def get_contacts(self, snapshot=None):
         """
         Асинхронно получает контактную информацию с веб-сайта.
 
+        Args:
+            snapshot (dict, optional): Снимок данных, из которого нужно взять значение.
+                                       Если не указан, берется текущий снимок через `get_snapshot`.
+
         Returns:
             str: Текстовое представление контактной информации.
                  Если данные не найдены, возвращается сообщение "Контакты не найдены".
 
         Описание логики:
-        - Используется контекстный менеджер `async with` для управления жизненным циклом сессии.
-        - Вызывается метод `fetch_data` у `WebsiteScraper` для получения данных.
-        - Возвращается контактная информация из полученных данных.
+        - Берется переданный или текущий снимок данных.
+        - Возвращается контактная информация из снимка.
         """
-        # Используем async with для управления жизненным циклом сессии
-        async with self.scrapers["website"] as scraper:
-            data = await scraper.fetch_data()
-            return data[0]["contacts"] if data else "Контакты не найдены"
+        with DATA_GETTER_SECONDS.time(getter="contacts") as labels, span("get_contacts"):
+            data = snapshot if snapshot is not None else await self.get_snapshot()
+            if not data:
+                labels["outcome"] = "missing"
+        return data["contacts"] if data else "Контакты не найдены"
 
-    async def get_schedule(self):
+    async def get_schedule(self, snapshot=None):
         """
         Асинхронно получает расписание с веб-сайта.
 
+        Args:
+            snapshot (dict, optional): Снимок данных, из которого нужно взять значение.
+                                       Если не указан, берется текущий снимок через `get_snapshot`.
+
         Returns:
             str: Текстовое представление расписания.
                  Если данные не найдены, возвращается сообщение "Расписание не найдено".
 
         Описание логики:
-        - Используется контекстный менеджер `async with` для управления жизненным циклом сессии.
-        - Вызывается метод `fetch_data` у `WebsiteScraper` для получения данных.
-        - Возвращается расписание из полученных данных.
+        - Берется переданный или текущий снимок данных.
+        - Возвращается расписание из снимка.
         """
-        async with self.scrapers["website"] as scraper:
-            data = await scraper.fetch_data()
-            return data[0]["schedule"] if data else "Расписание не найдено"
+        with DATA_GETTER_SECONDS.time(getter="schedule") as labels, span("get_schedule"):
+            data = snapshot if snapshot is not None else await self.get_snapshot()
+            if not data:
+                labels["outcome"] = "missing"
+        return data["schedule"] if data else "Расписание не найдено"
 
-    async def get_reminder(self):
+    async def get_reminder(self, snapshot=None):
         """
         Асинхронно получает напоминания для пациентов с веб-сайта.
 
+        Args:
+            snapshot (dict, optional): Снимок данных, из которого нужно взять значение.
+                                       Если не указан, берется текущий снимок через `get_snapshot`.
+
         Returns:
             str: Текстовое представление напоминаний.
                  Если данные не найдены, возвращается сообщение "Памятка не найдена".
 
         Описание логики:
-        - Используется контекстный менеджер `async with` для управления жизненным циклом сессии.
-        - Вызывается метод `fetch_data` у `WebsiteScraper` для получения данных.
-        - Возвращаются напоминания из полученных данных.
+        - Берется переданный или текущий снимок данных.
+        - Возвращаются напоминания из снимка.
         """
-        async with self.scrapers["website"] as scraper:
-            data = await scraper.fetch_data()
-            return data[0]["patient_reminder"] if data else "Памятка не найдена"
+        with DATA_GETTER_SECONDS.time(getter="reminder") as labels, span("get_reminder"):
+            data = snapshot if snapshot is not None else await self.get_snapshot()
+            if not data:
+                labels["outcome"] = "missing"
+        return data["patient_reminder"] if data else "Памятка не найдена"
 
     async def process_file(self, file_data, file_type):
         """
@@ -98,4 +271,4 @@ class DataProcessor:
         # FileScraper может не требовать async with, если не использует aiohttp
         # Но если использует - нужно аналогично добавить контекстный менеджер
         scraper = self.scrapers["file"]
-        return await scraper.fetch_data(file_data, file_type)
\ No newline at end of file
+        return await scraper.fetch_data(file_data, file_type)
@@ -14,12 +14,12 @@ class DatabaseHandler(ABC):
 
     @abstractmethod
     def is_user_verified(self, user_id):
-        """Проверка верификации пользователя"""
+        """Проверка верификации пользователя; None при ошибке базы данных"""
         pass
 
     @abstractmethod
     def is_user_registered(self, user_id):
-        """Проверка, зарегистрирован ли пользователь"""
+        """Проверка, зарегистрирован ли пользователь; None при ошибке базы данных"""
         pass
 
     @abstractmethod
@@ -37,7 +37,70 @@ class DatabaseHandler(ABC):
         """Получение ожидающих запросов"""
         pass
 
+    @abstractmethod
+    def get_pending_requests_page(self, limit=100, after=None):
+        """Страница очереди ожидающих запросов после курсора (request_time, request_id)"""
+        pass
+
     @abstractmethod
     def update_call_status(self, request_id, status=True):
         """Обновление статуса звонка"""
-        pass
\ No newline at end of file
+        pass
+
+class AsyncDatabaseHandler(ABC):
+    """Асинхронный интерфейс хранилища пользователей и запросов на обратный звонок"""
+
+    @abstractmethod
+    async def connect(self):
+        """Создание пула соединений с базой данных"""
+        pass
+
+    @abstractmethod
+    async def close(self):
+        """Закрытие пула соединений"""
+        pass
+
+    @abstractmethod
+    async def is_user_verified(self, user_id):
+        """Проверка верификации пользователя; None при ошибке базы данных"""
+        pass
+
+    @abstractmethod
+    async def is_user_registered(self, user_id):
+        """Проверка, зарегистрирован ли пользователь; None при ошибке базы данных"""
+        pass
+
+    @abstractmethod
+    async def register_user(self, user_id, username, phone, full_name=""):
+        """Регистрация нового пользователя"""
+        pass
+
+    @abstractmethod
+    async def create_call_request(self, user_id):
+        """Создание запроса на обратный звонок"""
+        pass
+
+    @abstractmethod
+    async def get_pending_requests(self):
+        """Получение ожидающих запросов"""
+        pass
+
+    @abstractmethod
+    async def get_pending_requests_page(self, limit=100, after=None):
+        """Страница очереди ожидающих запросов после курсора (request_time, request_id)"""
+        pass
+
+    @abstractmethod
+    async def get_call_feed_cursor(self):
+        """Курсор ленты запросов в порядке фиксации (None при ошибке)"""
+        pass
+
+    @abstractmethod
+    async def get_call_request_changes_since(self, cursor=0, after_id=0, limit=100):
+        """Запросы, созданные или изменившие статус после курсора, в порядке request_id (None при ошибке)"""
+        pass
+
+    @abstractmethod
+    async def update_call_status(self, request_id, status=True):
+        """Обновление статуса звонка"""
+        pass
@@ -0,0 +1,213 @@
+"""
+Версионированные миграции схемы базы данных (таблицы users и call_requests).
+
+Примененные версии хранятся в таблице schema_migrations. Каждая миграция выполняется
+в отдельной транзакции под advisory-блокировкой, поэтому несколько одновременно
+запускаемых экземпляров бота не применят одну миграцию дважды.
+
+Запуск:
+    python db_migrations.py            # применить новые миграции
+    python db_migrations.py --status   # показать примененные версии
+"""
+import argparse
+import asyncio
+
+from config import CONFIG
+
+# Ключ advisory-блокировки миграций
+MIGRATION_LOCK_ID = 7403215
+# Канал LISTEN/NOTIFY, в который публикуются создание запросов на звонок и изменение их статуса
+CALL_REQUESTS_CHANNEL = "call_requests"
+
+# (версия, описание, SQL). Новые миграции добавляются только в конец списка.
+MIGRATIONS = [
+    (1, "users and call_requests", """
+        CREATE TABLE IF NOT EXISTS users (
+            user_id BIGINT PRIMARY KEY,
+            username TEXT,
+            phone TEXT,
+            full_name TEXT DEFAULT '',
+            is_verified BOOLEAN NOT NULL DEFAULT FALSE,
+            registration_date TIMESTAMP NOT NULL DEFAULT now()
+        );
+        CREATE TABLE IF NOT EXISTS call_requests (
+            request_id BIGSERIAL PRIMARY KEY,
+            user_id BIGINT NOT NULL REFERENCES users (user_id),
+            phone TEXT,
+            request_time TIMESTAMP NOT NULL DEFAULT now(),
+            call_status BOOLEAN NOT NULL DEFAULT FALSE
+        );
+    """),
+    (2, "pending queue and per-user status indexes", """
+        -- Очередь ожидающих звонков: только строки с call_status = FALSE, в порядке очереди
+        CREATE INDEX IF NOT EXISTS call_requests_pending_idx
+            ON call_requests (request_time, request_id) WHERE call_status = FALSE;
+        CREATE INDEX IF NOT EXISTS call_requests_user_status_idx
+            ON call_requests (user_id, call_status);
+    """),
+    (3, "notify on call request changes", """
+        -- Уведомления публикуются при фиксации транзакции любым клиентом базы данных,
+        -- включая пакетную запись и синхронный обработчик
+        CREATE OR REPLACE FUNCTION notify_call_request() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('""" + CALL_REQUESTS_CHANNEL + """', json_build_object(
+                'event', CASE WHEN TG_OP = 'INSERT' THEN 'created' ELSE 'status' END,
+                'request_id', NEW.request_id,
+                'user_id', NEW.user_id,
+                'phone', NEW.phone,
+                'request_time', NEW.request_time,
+                'call_status', NEW.call_status
+            )::text);
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+        DROP TRIGGER IF EXISTS call_requests_notify_insert ON call_requests;
+        CREATE TRIGGER call_requests_notify_insert
+            AFTER INSERT ON call_requests
+            FOR EACH ROW EXECUTE FUNCTION notify_call_request();
+        DROP TRIGGER IF EXISTS call_requests_notify_status ON call_requests;
+        CREATE TRIGGER call_requests_notify_status
+            AFTER UPDATE OF call_status ON call_requests
+            FOR EACH ROW WHEN (OLD.call_status IS DISTINCT FROM NEW.call_status)
+            EXECUTE FUNCTION notify_call_request();
+    """),
+    (4, "commit-ordered call feed cursor", """
+        -- request_id выдается при вставке, а строка становится видна при фиксации, поэтому
+        -- продолжать ленту по request_id нельзя. Курсор ленты — xmin снимка: транзакции с
+        -- меньшим номером завершились до него. Требуется PostgreSQL 13+.
+        ALTER TABLE call_requests
+            ADD COLUMN IF NOT EXISTS created_xid xid8 NOT NULL DEFAULT pg_current_xact_id();
+        CREATE OR REPLACE FUNCTION notify_call_request() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('""" + CALL_REQUESTS_CHANNEL + """', json_build_object(
+                'event', CASE WHEN TG_OP = 'INSERT' THEN 'created' ELSE 'status' END,
+                'request_id', NEW.request_id,
+                'user_id', NEW.user_id,
+                'phone', NEW.phone,
+                'request_time', NEW.request_time,
+                'call_status', NEW.call_status,
+                -- Уведомления доставляются в порядке фиксации: все транзакции с номером
+                -- меньше этого xmin зафиксированы и уведомлены раньше
+                'cursor', pg_snapshot_xmin(pg_current_snapshot())::text::bigint
+            )::text);
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+    """),
+    (5, "call feed replays status changes", """
+        -- Номер транзакции последнего изменения статуса: при продолжении ленты с курсора
+        -- отдаются и запросы, закрытые (или вновь открытые) пока клиент был отключен
+        ALTER TABLE call_requests ADD COLUMN IF NOT EXISTS updated_xid xid8;
+        UPDATE call_requests SET updated_xid = created_xid WHERE updated_xid IS NULL;
+        ALTER TABLE call_requests
+            ALTER COLUMN updated_xid SET DEFAULT pg_current_xact_id(),
+            ALTER COLUMN updated_xid SET NOT NULL;
+        CREATE INDEX IF NOT EXISTS call_requests_updated_xid_idx ON call_requests (updated_xid);
+        CREATE OR REPLACE FUNCTION touch_call_request() RETURNS trigger AS $$
+        BEGIN
+            NEW.updated_xid := pg_current_xact_id();
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+        DROP TRIGGER IF EXISTS call_requests_touch_status ON call_requests;
+        CREATE TRIGGER call_requests_touch_status
+            BEFORE UPDATE OF call_status ON call_requests
+            FOR EACH ROW WHEN (OLD.call_status IS DISTINCT FROM NEW.call_status)
+            EXECUTE FUNCTION touch_call_request();
+    """),
+]
+
+CREATE_MIGRATIONS_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        description TEXT NOT NULL,
+        applied_at TIMESTAMP NOT NULL DEFAULT now()
+    )
+"""
+
+
+def apply_migrations(conn):
+    """
+    Применяет новые миграции через синхронное соединение psycopg2.
+
+    Args:
+        conn: Соединение psycopg2.
+
+    Returns:
+        List[int]: Версии примененных миграций.
+    """
+    applied = []
+    with conn.cursor() as cursor:
+        cursor.execute(CREATE_MIGRATIONS_TABLE)
+        conn.commit()
+        for version, description, sql in MIGRATIONS:
+            try:
+                cursor.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATION_LOCK_ID,))
+                cursor.execute("SELECT 1 FROM schema_migrations WHERE version = %s", (version,))
+                if cursor.fetchone() is None:
+                    cursor.execute(sql)
+                    cursor.execute("INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                                   (version, description))
+                    applied.append(version)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+    return applied
+
+
+async def apply_migrations_async(pool):
+    """
+    Применяет новые миграции через пул соединений asyncpg.
+
+    Args:
+        pool (asyncpg.Pool): Пул соединений.
+
+    Returns:
+        List[int]: Версии примененных миграций.
+    """
+    applied = []
+    async with pool.acquire() as conn:
+        await conn.execute(CREATE_MIGRATIONS_TABLE)
+        for version, description, sql in MIGRATIONS:
+            async with conn.transaction():
+                await conn.execute("SELECT pg_advisory_xact_lock($1)", MIGRATION_LOCK_ID)
+                if await conn.fetchval("SELECT 1 FROM schema_migrations WHERE version = $1", version) is None:
+                    await conn.execute(sql)
+                    await conn.execute("INSERT INTO schema_migrations (version, description) VALUES ($1, $2)",
+                                       version, description)
+                    applied.append(version)
+    return applied
+
+
+async def main(args):
+    from async_postgres_handler import AsyncPostgreSQLHandler
+
+    handler = AsyncPostgreSQLHandler(CONFIG["db_name"], CONFIG["db_user"], CONFIG["db_password"],
+                                     CONFIG["db_host"], CONFIG["db_port"], auto_migrate=False,
+                                     write_behind=False)
+    await handler.connect()
+    if handler.pool is None:
+        return
+    try:
+        if args.status:
+            await handler.pool.execute(CREATE_MIGRATIONS_TABLE)
+            rows = await handler.pool.fetch("SELECT version, description, applied_at FROM schema_migrations "
+                                            "ORDER BY version")
+            done = {row["version"] for row in rows}
+            for row in rows:
+                print(f"{row['version']:>4}  {row['applied_at']:%Y-%m-%d %H:%M}  {row['description']}")
+            for version, description, _ in MIGRATIONS:
+                if version not in done:
+                    print(f"{version:>4}  не применена         {description}")
+        else:
+            applied = await apply_migrations_async(handler.pool)
+            print(f"Применены миграции: {applied}" if applied else "Схема актуальна")
+    finally:
+        await handler.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Миграции схемы базы данных")
+    parser.add_argument("--status", action="store_true", help="Показать примененные версии")
+    asyncio.run(main(parser.parse_args()))
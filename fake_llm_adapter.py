@@ -0,0 +1,156 @@
+import asyncio
+import json
+import random
+import re
+from typing import AsyncIterator, List
+
+from langchain_core.messages import AIMessage, SystemMessage, HumanMessage
+from base_llm_adapter import *
+from config import CONFIG
+from prompt_builder import PromptBuilder, prompt_stats
+from question_classifier import CATEGORIES, KEYWORDS, normalize_text
+
+# Ответы по умолчанию на обычные вопросы
+DEFAULT_REPLIES = [
+    "Записаться на прием можно по телефону единого центра обработки звонков или в регистратуре поликлиники.",
+    "Поликлиника работает по будням, расписание приема указано в разделе «Расписание».",
+    "Результаты анализов выдаются в регистратуре в часы работы лаборатории.",
+]
+
+# Признак промпта классификации, который формирует MedicBotCore
+CLASSIFICATION_MARKER = "Классифицируй"
+_QUESTION_PATTERN = re.compile(r'Вопрос:\s*"(.*)"', re.S)
+
+
+class FakeLLMError(Exception):
+    """Имитация ошибки провайдера модели (по умолчанию HTTP 503, считается временной)."""
+
+    def __init__(self, message: str, status_code: int = 503):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class FakeLLMAdapter(BaseLLMAdapter):
+    """
+    Класс FakeLLMAdapter представляет собой адаптер-заглушку языковой модели для нагрузочного
+    тестирования без расхода квоты GigaChat. Промпт собирается тем же `PromptBuilder`, что и
+    в GigaChatAdapter, а ответ возвращается после случайной задержки.
+
+    Attributes:
+        system_prompt (str): Системное сообщение.
+        prompt_builder (PromptBuilder): Сборщик промпта в пределах бюджета токенов.
+        latency (float): Медианная задержка ответа в секундах.
+        jitter (float): Разброс задержки (сигма логнормального распределения).
+        error_rate (float): Доля вызовов, завершающихся ошибкой.
+        replies (List[str]): Заготовленные ответы на обычные вопросы.
+        chunk_size (int): Число слов во фрагменте потокового ответа.
+        calls (int): Число вызовов модели.
+        errors (int): Число имитированных ошибок.
+    """
+
+    def __init__(self, system_prompt: str, latency: float = None, jitter: float = None,
+                 error_rate: float = None, replies: List[str] = None, chunk_size: int = 3,
+                 token_budget: int = None, seed: int = None, **kwargs):
+        """
+        Инициализирует экземпляр класса FakeLLMAdapter. Не указанные параметры берутся из `CONFIG`.
+
+        Args:
+            system_prompt (str): Системное сообщение.
+            latency (float, optional): Медианная задержка ответа в секундах.
+            jitter (float, optional): Сигма логнормального распределения задержки (0 — без разброса).
+            error_rate (float, optional): Доля вызовов, завершающихся ошибкой (от 0 до 1).
+            replies (List[str], optional): Заготовленные ответы на обычные вопросы.
+            chunk_size (int): Число слов во фрагменте потокового ответа.
+            token_budget (int, optional): Бюджет токенов на один промпт.
+            seed (int, optional): Начальное значение генератора случайных чисел.
+        """
+        self.system_prompt = system_prompt
+        self.prompt_builder = PromptBuilder(
+            token_budget=token_budget if token_budget is not None else CONFIG.get("prompt_token_budget", 4000)
+        )
+        self.latency = latency if latency is not None else CONFIG.get("fake_llm_latency", 0.8)
+        self.jitter = jitter if jitter is not None else CONFIG.get("fake_llm_jitter", 0.3)
+        self.error_rate = error_rate if error_rate is not None else CONFIG.get("fake_llm_error_rate", 0.0)
+        self.replies = replies or DEFAULT_REPLIES
+        self.chunk_size = chunk_size
+        self.random = random.Random(seed)
+        self.calls = 0
+        self.errors = 0
+
+    def _delay(self) -> float:
+        """Случайная задержка ответа из логнормального распределения с медианой `latency`."""
+        if self.jitter <= 0:
+            return self.latency
+        return self.latency * self.random.lognormvariate(0, self.jitter)
+
+    def _classify(self, prompt: str) -> str:
+        """Возвращает JSON с категориями вопроса из промпта классификации по ключевым словам."""
+        match = _QUESTION_PATTERN.search(prompt)
+        words = normalize_text(match.group(1) if match else prompt).split()
+        categories = {
+            category: 1.0 for category in CATEGORIES
+            if any(word.startswith(stem) for word in words for stem in KEYWORDS[category])
+        }
+        return json.dumps(categories, ensure_ascii=False)
+
+    def _reply(self, messages: List[BaseMessage]) -> str:
+        """Выбирает ответ: JSON для промпта классификации, иначе один из заготовленных ответов."""
+        last = messages[-1].content if messages else ""
+        if CLASSIFICATION_MARKER in last:
+            return self._classify(last)
+        return self.random.choice(self.replies)
+
+    async def _simulate(self, messages: List[BaseMessage], context: dict = None) -> str:
+        """Собирает промпт, ждет случайную задержку и, с заданной вероятностью, имитирует ошибку."""
+        modified_messages, stats = self.prompt_builder.build(messages, context)
+        prompt_stats.set(stats)
+        self.calls += 1
+        await asyncio.sleep(self._delay())
+        if self.random.random() < self.error_rate:
+            self.errors += 1
+            raise FakeLLMError("Имитация недоступности модели")
+        return self._reply(modified_messages)
+
+    async def get_response(self, messages: List[BaseMessage], context: dict = None, **kwargs) -> str:
+        """
+        Асинхронно возвращает заготовленный ответ после случайной задержки.
+
+        Args:
+            messages (List[BaseMessage]): Список сообщений, которые будут отправлены модели.
+            context (dict, optional): Словарь с контекстными данными.
+            **kwargs: Параметры генерации (не используются).
+
+        Returns:
+            str: Текст ответа.
+
+        Raises:
+            FakeLLMError: С вероятностью `error_rate`.
+        """
+        return await self._simulate(messages, context)
+
+    async def stream_response(self, messages: List[BaseMessage], context: dict = None, **kwargs) -> AsyncIterator[str]:
+        """
+        Отдает заготовленный ответ по `chunk_size` слов. Задержка до первого фрагмента
+        равна задержке обычного ответа, остальные фрагменты идут без пауз.
+        """
+        words = (await self._simulate(messages, context)).split(" ")
+        for i in range(0, len(words), self.chunk_size):
+            yield " ".join(words[i:i + self.chunk_size]) + (" " if i + self.chunk_size < len(words) else "")
+
+    def format_message(self, text: str, is_user: bool) -> BaseMessage:
+        """Форматирует текстовое сообщение так же, как GigaChatAdapter."""
+        if not is_user and text == self.system_prompt:
+            return SystemMessage(content=text)
+        elif is_user:
+            return HumanMessage(content=text)
+        else:
+            return AIMessage(content=text)
+
+    def stats(self) -> dict:
+        """
+        Возвращает статистику вызовов заглушки.
+
+        Returns:
+            Dict[str, int]: Число вызовов и имитированных ошибок.
+        """
+        return {"calls": self.calls, "errors": self.errors}
@@ -0,0 +1,119 @@
+"""
+Локальная заглушка Telegram Bot API для проверки режима webhook без обращения к Telegram.
+
+Сервер отвечает на методы, которые вызывает TelegramAdapter (getMe, setWebhook, deleteWebhook,
+sendMessage, editMessageText, sendChatAction), и запоминает все вызовы. Бот направляется
+на заглушку настройкой telegram_base_url (см. tests/test_telegram_webhook.py).
+
+Запуск:
+    python fake_telegram.py --port 8081
+    # затем в config.py: "telegram_base_url": "http://127.0.0.1:8081/bot"
+"""
+import argparse
+import asyncio
+import time
+
+from aiohttp import web
+
+
+class FakeTelegramServer:
+    """
+    Класс FakeTelegramServer представляет собой заглушку Telegram Bot API на aiohttp.
+
+    Attributes:
+        host (str): Адрес, на котором слушает сервер.
+        port (int): Порт сервера (0 — любой свободный).
+        calls (list): Вызовы методов в порядке поступления: (метод, параметры).
+        base_url (str | None): Значение для telegram_base_url после запуска.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self.calls = []
+        self.base_url = None
+        self._runner = None
+        self._message_id = 0
+        self._called = asyncio.Condition()
+
+    async def start(self) -> str:
+        """
+        Запускает сервер.
+
+        Returns:
+            str: Базовый URL Bot API (к нему Telegram-клиент добавляет токен и метод).
+        """
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        self.port = self._runner.addresses[0][1]
+        self.base_url = f"http://{self.host}:{self.port}/bot"
+        return self.base_url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def wait_for(self, method: str, timeout: float = 5) -> dict:
+        """
+        Ждет вызова метода Bot API.
+
+        Returns:
+            dict: Параметры первого вызова метода.
+
+        Raises:
+            asyncio.TimeoutError: Если метод не был вызван за `timeout` секунд.
+        """
+        async def called():
+            async with self._called:
+                await self._called.wait_for(lambda: any(name == method for name, _ in self.calls))
+        await asyncio.wait_for(called(), timeout)
+        return next(params for name, params in self.calls if name == method)
+
+    async def _handle(self, request):
+        method = request.match_info["method"]
+        if request.content_type == "application/json":
+            params = await request.json()
+        else:
+            params = dict(await request.post())
+        async with self._called:
+            self.calls.append((method, params))
+            self._called.notify_all()
+        return web.json_response({"ok": True, "result": self._result(method, params)})
+
+    def _result(self, method, params):
+        if method == "getMe":
+            return {"id": 1, "is_bot": True, "first_name": "Fake", "username": "fake_bot"}
+        if method in ("sendMessage", "editMessageText"):
+            if method == "sendMessage":
+                self._message_id += 1
+            return {
+                "message_id": int(params.get("message_id") or self._message_id),
+                "date": int(time.time()),
+                "chat": {"id": int(params["chat_id"]), "type": "private"},
+                "text": params.get("text", ""),
+            }
+        return True
+
+
+async def main(args):
+    server = FakeTelegramServer(args.host, args.port)
+    print(f"telegram_base_url: {await server.start()}")
+    try:
+        while True:
+            await asyncio.sleep(3600)
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Заглушка Telegram Bot API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -1,10 +1,18 @@
+import hmac
+import json
 import uuid
 
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from fastapi import FastAPI, Header, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from medic_bot import MedicBotCore
 from llm_service import LLMService
-from gigachat_service import GigaChatAdapter
+from metrics import REGISTRY, REQUEST_SECONDS, question_category
+from profiler import RequestProfiler
+from prompt_builder import prompt_stats
+from resilient_adapter import ResilientAdapter
+from single_flight_adapter import SingleFlightAdapter
 from config import CONFIG
 from datetime import datetime, timezone
 import time
@@ -34,39 +42,130 @@ SYSTEM_PROMPT = """Вы — Ассистент регистратуры поли
 
                     Вежливый, четкий, без лишней информации.
                     """
-llm_service = LLMService(
-    adapter=GigaChatAdapter(
+if CONFIG.get("llm_backend") == "fake":
+    # Заглушка модели для нагрузочного тестирования без расхода квоты GigaChat
+    from fake_llm_adapter import FakeLLMAdapter
+    model_adapter = FakeLLMAdapter(system_prompt=SYSTEM_PROMPT)
+else:
+    from gigachat_service import GigaChatAdapter
+    model_adapter = GigaChatAdapter(
         system_prompt=SYSTEM_PROMPT,
         credentials=CONFIG["SBER_AUTH"]
 
     )
+llm_service = LLMService(
+    # Одинаковые одновременные запросы объединяются, общее число вызовов GigaChat ограничено;
+    # каждый вызов ограничен по времени, временные ошибки повторяются, при серии сбоев цепь размыкается
+    adapter=SingleFlightAdapter(ResilientAdapter(model_adapter))
 )
 bot_core = MedicBotCore(llm_service)
+profiler = RequestProfiler()
+telegram_adapter = None
+call_feed = None
+db_handler = None
+
+@app.on_event("startup")
+async def startup():
+    global telegram_adapter, call_feed, db_handler
+    # Загружаем данные с сайта в фоне, чтобы /qa не ждал сайт поликлиники
+    bot_core.data_processor.start()
+    if CONFIG.get("bot_mode") == "webhook":
+        if not CONFIG.get("webhook_secret"):
+            # Без секрета маршрут /telegram/webhook принимал бы поддельные обновления от кого угодно
+            raise RuntimeError("Для bot_mode = \"webhook\" нужно задать webhook_secret")
+        from telegram_adapter import TelegramAdapter
+        telegram_adapter = TelegramAdapter(token=CONFIG["token"], bot_core=bot_core)
+        await telegram_adapter.start_webhook(
+            webhook_url=CONFIG.get("webhook_url"),
+            secret_token=CONFIG.get("webhook_secret")
+        )
+    if CONFIG.get("call_feed_enabled"):
+        if not CONFIG.get("call_feed_token"):
+            print("call_feed_token не задан: /calls/feed будет отвечать 403")
+        from async_postgres_handler import AsyncPostgreSQLHandler
+        from call_feed import CallFeed
+        db_handler = AsyncPostgreSQLHandler(CONFIG["db_name"], CONFIG["db_user"], CONFIG["db_password"],
+                                            CONFIG["db_host"], CONFIG["db_port"])
+        await db_handler.connect()
+        call_feed = CallFeed(db_handler)
+        call_feed.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    if telegram_adapter is not None:
+        await telegram_adapter.stop_webhook()
+    if call_feed is not None:
+        await call_feed.stop()
+    if db_handler is not None:
+        await db_handler.close()
+    await bot_core.data_processor.stop()
 
 class QARequest(BaseModel):
     question: str
+    session_id: Optional[str] = None
     temperature: float = 0.7
     max_length: int = 500
     top_k: int = 3
     confidence_threshold: float = 0.5
 
+class QABatchRequest(BaseModel):
+    items: List[QARequest]
+    concurrency: Optional[int] = Field(None, ge=1)
+    stream: bool = False
+
 @app.get("/health")
 async def health_check():
     current_time = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
     return {"status": "ok", "timestamp": current_time}
 
+@app.get("/metrics")
+async def metrics_endpoint():
+    # Метрики в текстовом формате Prometheus
+    return Response(content=REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/schedule")
+async def schedule_endpoint():
+    # Расписание из кэшированных данных сайта, без обращения к LLM
+    return {"schedule": await bot_core.get_schedule()}
+
+@app.get("/contacts")
+async def contacts_endpoint():
+    # Контакты из кэшированных данных сайта, без обращения к LLM
+    return {"contacts": await bot_core.get_contacts()}
+
+@app.post("/telegram/webhook")
+async def telegram_webhook(request: Request):
+    # Обновление сразу подтверждается, а обрабатывается пулом обработчиков в фоне
+    if telegram_adapter is None:
+        return Response(status_code=404)
+    secret = CONFIG.get("webhook_secret")
+    if not secret or not hmac.compare_digest(request.headers.get("X-Telegram-Bot-Api-Secret-Token") or "", secret):
+        return Response(status_code=403)
+    if not telegram_adapter.enqueue_update(await request.json()):
+        # Очередь переполнена: Telegram повторит доставку позже
+        return Response(status_code=503)
+    return {"ok": True}
+
 @app.post("/qa")
-async def qa_endpoint(request: QARequest):
+async def qa_endpoint(request: QARequest, http_request: Request):
+    # Фиксируем время начала обработки
+    start_time = time.time()
+    outcome = "error"
+    request_id = str(uuid.uuid4())
+    # Участки обработки записываются для каждого запроса; клиенту они отдаются только
+    # по заголовку профилирования или при попадании в выборку
+    profile_mode = profiler.mode(http_request.headers)
+    trace = None
     try:
-        # Фиксируем время начала обработки
-        start_time = time.time()
 
         # Выполняем основную логику (например, получение ответа от бота)
-        answer = await bot_core.get_answer(request.question,
-                                           temperature=request.temperature,
-                                           max_length=request.max_length,
-                                           top_k=request.top_k,
-                                           confidence_threshold=request.confidence_threshold)
+        with profiler.trace("/qa", cpu=profile_mode == "cpu") as trace:
+            answer = await bot_core.get_answer(request.question,
+                                               session_id=request.session_id,
+                                               temperature=request.temperature,
+                                               max_length=request.max_length,
+                                               top_k=request.top_k,
+                                               confidence_threshold=request.confidence_threshold)
 
         # Фиксируем время окончания обработки
         end_time = time.time()
@@ -74,15 +173,122 @@ async def qa_endpoint(request: QARequest):
         # Вычисляем время обработки
         processing_time = round(end_time - start_time, 2)  # В секундах, округленное до 2 знаков
 
-        return {
+        outcome = "ok"
+        response = {
             "answer": answer,
             "links": [],
-            "request_id": str(uuid.uuid4()),
-            "processing_time": processing_time
+            "request_id": request_id,
+            "processing_time": processing_time,
+            "prompt_tokens": prompt_stats.get()
         }
+        if profile_mode:
+            response["profile"] = trace.to_dict()
+        return response
     except Exception as e:
         raise HTTPException(status_code=500, detail={"error": str(e), "code": 500})
+    finally:
+        REQUEST_SECONDS.observe(time.time() - start_time, route="/qa",
+                                category=question_category.get(), outcome=outcome)
+        if trace is not None:
+            # Медленные запросы записываются в журнал с разбивкой времени по этапам
+            profiler.record(trace, request.question, request_id=request_id, route="/qa", outcome=outcome,
+                            category=question_category.get(), prompt_tokens=prompt_stats.get())
+
+def sse_event(data: dict, event: str = None, event_id=None) -> str:
+    # Форматирует событие Server-Sent Events; id клиент вернет в Last-Event-ID при переподключении
+    prefix = f"id: {event_id}\n" if event_id is not None else ""
+    prefix += f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/qa/stream")
+async def qa_stream_endpoint(request: QARequest):
+    async def events():
+        start_time = time.time()
+        first_chunk_time = None
+        outcome = "error"
+        try:
+            async for chunk in bot_core.stream_answer(request.question,
+                                                      session_id=request.session_id,
+                                                      temperature=request.temperature,
+                                                      max_length=request.max_length,
+                                                      top_k=request.top_k,
+                                                      confidence_threshold=request.confidence_threshold):
+                if first_chunk_time is None:
+                    first_chunk_time = round(time.time() - start_time, 2)
+                yield sse_event({"delta": chunk})
+            yield sse_event({
+                "request_id": str(uuid.uuid4()),
+                "processing_time": round(time.time() - start_time, 2),
+                "time_to_first_chunk": first_chunk_time
+            }, event="done")
+            outcome = "ok"
+        except Exception as e:
+            yield sse_event({"error": str(e), "code": 500}, event="error")
+        finally:
+            REQUEST_SECONDS.observe(time.time() - start_time, route="/qa/stream",
+                                    category=question_category.get(), outcome=outcome)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.post("/qa/batch")
+async def qa_batch_endpoint(request: QABatchRequest):
+    max_items = CONFIG.get("batch_max_items", 100)
+    if len(request.items) > max_items:
+        raise HTTPException(status_code=400, detail={"error": f"Не более {max_items} вопросов в пакете", "code": 400})
+    items = [item.model_dump() for item in request.items]
+    concurrency = min(request.concurrency or CONFIG.get("batch_concurrency", 4),
+                      CONFIG.get("batch_max_concurrency", 16))
+
+    if request.stream:
+        # Результаты отдаются построчно в формате NDJSON по мере готовности
+        async def lines():
+            with REQUEST_SECONDS.time(route="/qa/batch", category="mixed"):
+                async for result in bot_core.answer_batch(items, concurrency=concurrency):
+                    yield json.dumps(result, ensure_ascii=False) + "\n"
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    start_time = time.time()
+    with REQUEST_SECONDS.time(route="/qa/batch", category="mixed"):
+        results = [result async for result in bot_core.answer_batch(items, concurrency=concurrency)]
+    results.sort(key=lambda result: result["index"])
+    return {
+        "results": results,
+        "request_id": str(uuid.uuid4()),
+        "processing_time": round(time.time() - start_time, 2)
+    }
+
+@app.get("/calls/feed")
+async def calls_feed_endpoint(cursor: Optional[int] = None,
+                              last_event_id: Optional[str] = Header(None),
+                              x_operator_token: Optional[str] = Header(None)):
+    # Лента запросов на звонок для операторов: сначала ожидающие запросы, пропущенные после
+    # cursor (или Last-Event-ID при переподключении), затем создание запросов и изменение статуса
+    if call_feed is None:
+        raise HTTPException(status_code=404, detail={"error": "Лента запросов отключена", "code": 404})
+    # В ленте телефоны пациентов: без настроенного токена доступ закрыт
+    token = CONFIG.get("call_feed_token")
+    if not token or not hmac.compare_digest(x_operator_token or "", token):
+        raise HTTPException(status_code=403, detail={"error": "Неверный токен оператора", "code": 403})
+    if cursor is None and last_event_id:
+        try:
+            cursor = int(last_event_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail={"error": "Некорректный Last-Event-ID", "code": 400})
+
+    async def events():
+        async for event in call_feed.subscribe(cursor):
+            if event is None:
+                yield ": ping\n\n"
+                continue
+            # id — курсор в порядке фиксации транзакций, с которого лента продолжится после обрыва
+            yield sse_event(event, event=event["event"], event_id=event["cursor"])
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
-    return {"error": exc.detail["error"], "code": exc.detail["code"]}
\ No newline at end of file
+    return JSONResponse(status_code=exc.status_code,
+                        content={"error": exc.detail["error"], "code": exc.detail["code"]})
\ No newline at end of file
@@ -1,7 +1,9 @@
 from langchain_core.messages import AIMessage, SystemMessage, HumanMessage
 from langchain_gigachat.chat_models import GigaChat
 from base_llm_adapter import *
-from typing import List
+from config import CONFIG
+from prompt_builder import PromptBuilder, prompt_stats
+from typing import AsyncIterator, List
 
 
 class GigaChatAdapter(BaseLLMAdapter):
@@ -12,15 +14,18 @@ class GigaChatAdapter(BaseLLMAdapter):
     Attributes:
         model: Экземпляр модели GigaChat, который используется для генерации ответов.
         system_prompt (str): Системное сообщение, которое задает контекст или инструкции для модели.
+        prompt_builder (PromptBuilder): Сборщик промпта в пределах бюджета токенов.
     """
 
-    def __init__(self, system_prompt: str, credentials: str, **kwargs):
+    def __init__(self, system_prompt: str, credentials: str, token_budget: int = None, **kwargs):
         """
         Инициализирует экземпляр класса GigaChatAdapter.
 
         Args:
             system_prompt (str): Системное сообщение, которое будет использоваться для настройки модели.
             credentials (str): Учетные данные для аутентификации в GigaChat.
+            token_budget (int, optional): Бюджет токенов на один промпт. По умолчанию
+                                          берется из `CONFIG["prompt_token_budget"]`.
             **kwargs: Дополнительные параметры для настройки модели GigaChat.
         """
         self.model = GigaChat(
@@ -29,6 +34,9 @@ class GigaChatAdapter(BaseLLMAdapter):
             **kwargs
         )
         self.system_prompt = system_prompt
+        self.prompt_builder = PromptBuilder(
+            token_budget=token_budget if token_budget is not None else CONFIG.get("prompt_token_budget", 4000)
+        )
 
     async def get_response(self, messages: List[BaseMessage], context: dict = None, **kwargs) -> str:
         """
@@ -43,29 +51,39 @@ class GigaChatAdapter(BaseLLMAdapter):
             str: Текст ответа, сгенерированный моделью.
 
         Описание логики:
-        - Если контекст предоставлен, он добавляется к системному сообщению.
-        - Если системное сообщение отсутствует, оно создается на основе контекста.
-        - Модель вызывается с модифицированным списком сообщений, и возвращается текст ответа.
+        - Промпт собирается `PromptBuilder`: контекст добавляется к копии системного сообщения,
+          исходное системное сообщение не изменяется.
+        - Если промпт не помещается в бюджет токенов, урезаются разделы контекста с низким
+          приоритетом и самые старые сообщения истории.
+        - Статистика токенов сохраняется в `prompt_stats` текущего запроса.
+        - Модель вызывается с собранным списком сообщений, и возвращается текст ответа.
         """
-        modified_messages = list(messages)
-
-        if context:
-            # Формируем строку с контекстными данными
-            context_str = "Контекстные данные:\n" + "\n".join(
-                [f"{k}: {v}" for k, v in context.items()]
-            )
-
-            # Находим существующее системное сообщение или создаем новое
-            system_msg = next((msg for msg in modified_messages if isinstance(msg, SystemMessage)), None)
-            if system_msg:
-                system_msg.content += f"\n\n{context_str}"
-            else:
-                modified_messages.insert(0, SystemMessage(content=context_str))
+        modified_messages, stats = self.prompt_builder.build(messages, context)
+        prompt_stats.set(stats)
 
         # Вызываем модель для генерации ответа
         response = await self.model.ainvoke(modified_messages, **kwargs)
         return response.content
 
+    async def stream_response(self, messages: List[BaseMessage], context: dict = None, **kwargs) -> AsyncIterator[str]:
+        """
+        Асинхронно получает ответ от модели GigaChat по частям, по мере генерации.
+
+        Args:
+            messages (List[BaseMessage]): Список сообщений, которые будут отправлены модели.
+            context (dict, optional): Словарь с контекстными данными, которые будут добавлены к системному сообщению.
+            **kwargs: Дополнительные параметры для вызова модели.
+
+        Yields:
+            str: Очередной фрагмент текста ответа.
+        """
+        modified_messages, stats = self.prompt_builder.build(messages, context)
+        prompt_stats.set(stats)
+
+        async for chunk in self.model.astream(modified_messages, **kwargs):
+            if chunk.content:
+                yield chunk.content
+
     def format_message(self, text: str, is_user: bool) -> BaseMessage:
         """
         Форматирует текстовое сообщение в соответствующий тип сообщения (SystemMessage, HumanMessage или AIMessage).
@@ -1,21 +1,100 @@
 import json
+import time
+from collections import OrderedDict
 
 from base_llm_adapter import BaseLLMAdapter
+from config import CONFIG
 
 
 class LLMService:
-    def __init__(self, adapter: BaseLLMAdapter):
+    """
+    Класс LLMService хранит историю диалогов отдельно для каждого пользователя (сессии)
+    и передает ее адаптеру языковой модели.
+
+    Attributes:
+        adapter (BaseLLMAdapter): Адаптер языковой модели.
+        max_turns (int): Сколько последних пар вопрос-ответ хранится в истории сессии.
+        max_sessions (int): Максимальное число одновременно хранимых сессий.
+        session_ttl (float): Время простоя в секундах, после которого сессия удаляется.
+        sessions (OrderedDict): Сессии в порядке последнего обращения.
+    """
+
+    def __init__(self, adapter: BaseLLMAdapter, max_turns: int = None, max_sessions: int = None,
+                 session_ttl: float = None):
         self.adapter = adapter
-        self.reset_chat_history()  # Инициализируем историю с системным сообщением
+        self.max_turns = max_turns if max_turns is not None else CONFIG.get("history_max_turns", 5)
+        self.max_sessions = max_sessions if max_sessions is not None else CONFIG.get("max_sessions", 1000)
+        self.session_ttl = session_ttl if session_ttl is not None else CONFIG.get("session_idle_ttl", 1800)
+        self.system_message = self.adapter.format_message(self.adapter.system_prompt, is_user=False)
+        self.sessions = OrderedDict()  # session_id -> {"history": [...], "last_seen": float}
 
-    def reset_chat_history(self):
-        self.chat_history = [self.adapter.format_message(self.adapter.system_prompt, is_user=False)]
+    def reset_chat_history(self, session_id=None):
+        """Очищает историю указанной сессии или всех сессий, если она не указана."""
+        if session_id is None:
+            self.sessions.clear()
+        else:
+            self.sessions.pop(session_id, None)
 
-    async def get_answer(self, user_input: str, context: dict = None,**kwargs) -> str:
-        user_message = self.adapter.format_message(user_input, is_user=True)
-        self.chat_history.append(user_message)
+    def _evict(self, now):
+        """Удаляет простаивающие сессии и самые давние сессии сверх лимита."""
+        while self.sessions:
+            session_id, session = next(iter(self.sessions.items()))
+            if now - session["last_seen"] < self.session_ttl and len(self.sessions) <= self.max_sessions:
+                break
+            del self.sessions[session_id]
+
+    def _get_history(self, session_id):
+        """Возвращает историю сессии, отмечая обращение к ней."""
+        now = time.monotonic()
+        self._evict(now)
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = self.sessions[session_id] = {"history": [], "last_seen": now}
+        session["last_seen"] = now
+        self.sessions.move_to_end(session_id)
+        return session["history"]
+
+    def _build_messages(self, user_message, session_id):
+        """Собирает сообщения для модели: системное, история сессии и текущий вопрос."""
+        history = self._get_history(session_id) if session_id is not None else []
+        return [self.system_message] + history + [user_message]
+
+    def has_history(self, session_id) -> bool:
+        """Есть ли в истории сессии предыдущие вопросы (ответ без истории не зависит от сессии)."""
+        session = self.sessions.get(session_id) if session_id is not None else None
+        return bool(session and session["history"])
 
-        response = await self.adapter.get_response(self.chat_history, context=context, **kwargs)
-        self.chat_history.append(self.adapter.format_message(response, is_user=False))
+    def remember(self, session_id, user_input: str, response: str):
+        """Добавляет в историю сессии ответ, полученный без обращения к модели (например, из кэша)."""
+        self._remember(session_id, self.adapter.format_message(user_input, is_user=True), response)
+
+    def _remember(self, session_id, user_message, response: str):
+        """Добавляет пару вопрос-ответ в историю сессии, сохраняя только последние `max_turns` пар."""
+        if session_id is None:
+            return
+        history = self._get_history(session_id)
+        history.append(user_message)
+        history.append(self.adapter.format_message(response, is_user=False))
+        del history[:max(len(history) - 2 * self.max_turns, 0)]
+
+    async def get_answer(self, user_input: str, context: dict = None, session_id=None, **kwargs) -> str:
+        user_message = self.adapter.format_message(user_input, is_user=True)
+        messages = self._build_messages(user_message, session_id)
+        response = await self.adapter.get_response(messages, context=context, **kwargs)
+        self._remember(session_id, user_message, response)
         return response
 
+    async def stream_answer(self, user_input: str, context: dict = None, session_id=None, **kwargs):
+        """Потоковый вариант `get_answer`: отдает фрагменты ответа по мере генерации."""
+        user_message = self.adapter.format_message(user_input, is_user=True)
+        messages = self._build_messages(user_message, session_id)
+        chunks = []
+        async for chunk in self.adapter.stream_response(messages, context=context, **kwargs):
+            chunks.append(chunk)
+            yield chunk
+        self._remember(session_id, user_message, "".join(chunks))
+
+    async def complete(self, prompt: str, **kwargs) -> str:
+        """Разовый запрос к модели без сохранения в историю (например, для классификации)."""
+        return await self.get_answer(prompt, **kwargs)
+
@@ -0,0 +1,246 @@
+"""
+Нагрузочный тест конвейера /qa без расхода квоты GigaChat и без обращения к сайту поликлиники.
+
+По умолчанию в процессе поднимаются заглушка сайта поликлиники (сохраненные фикстуры
+parser_benchmark.py или встроенные страницы) и приложение FastAPI с заглушкой модели
+FakeLLMAdapter. Генератор нагрузки отправляет вопросы на /qa с заданной частотой (RPS)
+и ограничением числа одновременных запросов и выводит процентили задержки,
+пропускную способность и долю ошибок.
+
+Задержка считается от запланированного времени отправки запроса, поэтому ожидание
+свободного слота при перегрузке тоже попадает в результат.
+
+Запуск:
+    python load_test.py --rps 20 --concurrency 50 --duration 30
+    python load_test.py --latency 1.5 --error-rate 0.05 --no-answer-cache
+    python load_test.py --url http://localhost:8000 --rps 5    # уже запущенный API
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import tempfile
+import threading
+import time
+
+import aiohttp
+from aiohttp import web
+
+from config import CONFIG
+from parser_benchmark import FIXTURES_DIR, load_pages
+
+async def start_clinic_stub(pages, host="127.0.0.1", port=0):
+    """
+    Поднимает заглушку сайта поликлиники с поддержкой условных запросов (ETag / 304).
+
+    Returns:
+        Tuple[web.AppRunner, str]: Запущенный сервер и его базовый URL.
+    """
+    async def handler(request):
+        html = pages[request.match_info["name"]]
+        etag = '"' + hashlib.sha1(html.encode("utf-8")).hexdigest() + '"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(text=html, content_type="text/html", headers={"ETag": etag})
+
+    app = web.Application()
+    app.router.add_get("/{name}", handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://{host}:{port}"
+
+
+def start_api(host, port):
+    """
+    Запускает приложение FastAPI в отдельном потоке со своим циклом событий,
+    чтобы генератор нагрузки не делил с ним цикл событий.
+
+    Returns:
+        Tuple[uvicorn.Server, threading.Thread]: Сервер и поток, в котором он работает.
+    """
+    import uvicorn
+    from fast_api import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("Не удалось запустить API")
+        time.sleep(0.05)
+    return server, thread
+
+
+def load_questions(path):
+    """Читает вопросы из размеченных данных классификатора."""
+    with open(path, "r", encoding="utf-8") as file:
+        return [item["question"] for item in json.load(file)]
+
+
+def percentile(values, p):
+    """Процентиль по методу ближайшего ранга; values должны быть отсортированы."""
+    if not values:
+        return 0.0
+    return values[max(math.ceil(p / 100 * len(values)) - 1, 0)]
+
+
+async def run_load(url, questions, rps, concurrency, duration, timeout, sessions=0, seed=None):
+    """
+    Отправляет вопросы на /qa с постоянной частотой и ограничением числа одновременных запросов.
+
+    Args:
+        url (str): Базовый URL API.
+        questions (List[str]): Вопросы, из которых случайно выбирается очередной запрос.
+        rps (float): Частота отправки запросов.
+        concurrency (int): Максимальное число одновременных запросов.
+        duration (float): Длительность теста в секундах.
+        timeout (float): Таймаут одного запроса в секундах.
+        sessions (int): Число имитируемых пользователей с историей диалога (0 — без session_id).
+        seed (int, optional): Начальное значение генератора случайных чисел.
+
+    Returns:
+        Dict[str, Any]: Отчет: число запросов и ошибок, пропускная способность и задержки в мс.
+    """
+    rng = random.Random(seed)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], {}
+
+    async def send(session, scheduled, payload):
+        async with semaphore:
+            try:
+                async with session.post(f"{url}/qa", json=payload) as response:
+                    await response.read()
+                    status = response.status
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                status = type(e).__name__
+        if status == 200:
+            latencies.append((time.perf_counter() - scheduled) * 1000)
+        else:
+            errors[str(status)] = errors.get(str(status), 0) + 1
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        # Прогревочный запрос: дожидаемся первой загрузки данных сайта
+        async with session.post(f"{url}/qa", json={"question": questions[0]}) as response:
+            await response.read()
+
+        tasks = []
+        start = time.perf_counter()
+        for i in range(int(rps * duration)):
+            scheduled = start + i / rps
+            await asyncio.sleep(max(scheduled - time.perf_counter(), 0))
+            payload = {"question": rng.choice(questions)}
+            if sessions:
+                payload["session_id"] = f"load-{rng.randrange(sessions)}"
+            tasks.append(asyncio.create_task(send(session, scheduled, payload)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    total = len(tasks)
+    failed = sum(errors.values())
+    return {
+        "requests": total,
+        "ok": len(latencies),
+        "errors": failed,
+        "error_rate": round(failed / total, 4) if total else 0.0,
+        "error_statuses": errors,
+        "duration": round(elapsed, 2),
+        "throughput": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 1),
+            "p95": round(percentile(latencies, 95), 1),
+            "p99": round(percentile(latencies, 99), 1),
+            "max": round(latencies[-1], 1) if latencies else 0.0,
+        },
+    }
+
+
+def print_report(report):
+    """Печатает отчет нагрузочного теста."""
+    latency = report["latency_ms"]
+    print(f"Запросов: {report['requests']}, успешно: {report['ok']}, "
+          f"ошибок: {report['errors']} ({report['error_rate']:.2%})")
+    if report["error_statuses"]:
+        print(f"Ошибки по статусам: {report['error_statuses']}")
+    print(f"Длительность: {report['duration']} с, пропускная способность: {report['throughput']} запросов/с")
+    print(f"Задержка, мс: p50 {latency['p50']}, p95 {latency['p95']}, p99 {latency['p99']}, max {latency['max']}")
+    if "server" in report:
+        print(f"Сервер: {report['server']}")
+
+
+async def main(args):
+    questions = load_questions(args.questions)
+    stub = None
+    server = None
+    url = args.url
+    try:
+        if url is None:
+            stub, clinic_url = await start_clinic_stub(load_pages(args.fixtures))
+            # Настройки применяются до импорта fast_api, который создает сервисы по CONFIG
+            CONFIG.update({
+                "llm_backend": "fake",
+                "fake_llm_latency": args.latency,
+                "fake_llm_jitter": args.jitter,
+                "fake_llm_error_rate": args.error_rate,
+                "website_url": f"{clinic_url}/main",
+                "consultative_url": f"{clinic_url}/consultative",
+                "lab_url": f"{clinic_url}/lab",
+                "page_cache_dir": tempfile.mkdtemp(prefix="page_cache_"),
+            })
+            if args.no_answer_cache:
+                CONFIG["answer_cache_threshold"] = 1.01  # Сходство не превышает 1: кэш ответов не срабатывает
+            server, thread = start_api("127.0.0.1", args.port)
+            url = f"http://127.0.0.1:{args.port}"
+
+        report = await run_load(url, questions, args.rps, args.concurrency, args.duration,
+                                args.timeout, sessions=args.sessions, seed=args.seed)
+
+        if server is not None:
+            import fast_api
+            report["server"] = {
+                "llm": fast_api.model_adapter.stats(),
+                "single_flight": fast_api.llm_service.adapter.stats(),
+                "answer_cache": fast_api.bot_core.answer_cache.stats(),
+            }
+    finally:
+        if server is not None:
+            server.should_exit = True
+            thread.join()
+        if stub is not None:
+            await stub.cleanup()
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Нагрузочный тест /qa с заглушкой модели")
+    parser.add_argument("--url", help="Базовый URL уже запущенного API (по умолчанию API поднимается в процессе)")
+    parser.add_argument("--rps", type=float, default=10, help="Частота запросов в секунду")
+    parser.add_argument("--concurrency", type=int, default=50, help="Максимум одновременных запросов")
+    parser.add_argument("--duration", type=float, default=30, help="Длительность теста в секундах")
+    parser.add_argument("--timeout", type=float, default=60, help="Таймаут одного запроса в секундах")
+    parser.add_argument("--sessions", type=int, default=0, help="Число пользователей с историей диалога")
+    parser.add_argument("--latency", type=float, default=CONFIG.get("fake_llm_latency", 0.8),
+                        help="Медианная задержка заглушки модели в секундах")
+    parser.add_argument("--jitter", type=float, default=CONFIG.get("fake_llm_jitter", 0.3),
+                        help="Разброс задержки заглушки (сигма логнормального распределения)")
+    parser.add_argument("--error-rate", type=float, default=CONFIG.get("fake_llm_error_rate", 0.0),
+                        help="Доля вызовов заглушки, завершающихся ошибкой 503")
+    parser.add_argument("--no-answer-cache", action="store_true", help="Отключить кэш ответов")
+    parser.add_argument("--questions", default=CONFIG.get("classifier_data", "classifier_questions.json"),
+                        help="JSON с вопросами")
+    parser.add_argument("--fixtures", default=FIXTURES_DIR, help="Директория с HTML-фикстурами сайта")
+    parser.add_argument("--port", type=int, default=8765, help="Порт API, поднимаемого в процессе")
+    parser.add_argument("--seed", type=int, help="Начальное значение генератора случайных чисел")
+    parser.add_argument("--json", action="store_true", help="Вывести отчет в формате JSON")
+    asyncio.run(main(parser.parse_args()))
@@ -1,14 +1,40 @@
+import asyncio
+
 from config import CONFIG
 from telegram_adapter import *
 
-if __name__ == "__main__":
 
+async def run_inprocess():
+    """
+    Запускает API и Telegram-бота в одном процессе и одном цикле событий.
+    Бот вызывает MedicBotCore напрямую, а /qa остается доступным для других клиентов.
+    """
+    import uvicorn
+    from fast_api import app, bot_core
+
+    adapter = TelegramAdapter(token=CONFIG["token"], bot_core=bot_core)
+    server = uvicorn.Server(uvicorn.Config(app, host=CONFIG.get("api_host", "0.0.0.0"),
+                                           port=CONFIG.get("api_port", 8000)))
+    await adapter.start_polling()
+    try:
+        await server.serve()
+    finally:
+        await adapter.stop()
 
 
-        API_URL = "http://localhost:8000"
+if __name__ == "__main__":
+
+        if CONFIG.get("bot_mode") == "inprocess":
+            asyncio.run(run_inprocess())
+        elif CONFIG.get("bot_mode") == "webhook":
+            # Бот запускается вместе с приложением FastAPI и принимает обновления через webhook
+            import uvicorn
+            uvicorn.run("fast_api:app", host=CONFIG.get("api_host", "0.0.0.0"), port=CONFIG.get("api_port", 8000))
+        else:
+            API_URL = "http://localhost:8000"
 
 
-        adapter = TelegramAdapter(token=CONFIG["token"], api_url=API_URL)
+            adapter = TelegramAdapter(token=CONFIG["token"], api_url=API_URL)
 
-        # Запускаем бота
-        adapter.run()
+            # Запускаем бота
+            adapter.run()
@@ -1,7 +1,43 @@
+import asyncio
+import html
 import json
+import re
+import time
 
+from answer_cache import AnswerCache
+from config import CONFIG
 from data_processor import DataProcessor
 from llm_service import LLMService
+from metrics import (ANSWERS_TOTAL, CACHE_REQUESTS_TOTAL, CLASSIFIED_TOTAL, CLASSIFY_SECONDS, LLM_SECONDS,
+                     observe_prompt, primary_category, question_category)
+from profiler import span
+from prompt_builder import prompt_stats
+from question_classifier import CATEGORIES, QuestionClassifier, normalize_text
+from resilient_adapter import LLMUnavailableError
+from ttl_cache import TTLCache
+
+# Заголовки разделов контекста в ответе без участия модели
+DEGRADED_SECTIONS = {
+    "schedule": "Расписание",
+    "contacts": "Контакты",
+    "analyze_time": "Сроки выполнения анализов",
+    "reminder": "Памятка для пациента",
+}
+DEGRADED_HEADER = "Сервис ответов временно недоступен. Справочная информация с сайта:"
+
+
+def plain_text(value) -> str:
+    """
+    Приводит раздел данных сайта к простому тексту для справочного ответа: ответ отправляется
+    без разметки, поэтому теги убираются, а HTML-сущности раскрываются. Памятки вида
+    {заголовок: [пункты]} оформляются маркированным списком.
+    """
+    if isinstance(value, dict):
+        return "\n\n".join(f"{plain_text(title)}:\n{plain_text(items)}" for title, items in value.items())
+    if isinstance(value, (list, tuple)):
+        return "\n".join(f"• {plain_text(item)}" for item in value)
+    text = html.unescape(re.sub(r"<[^>]+>", "", str(value)))
+    return "\n".join(line.strip() for line in text.strip().splitlines())
 
 
 class MedicBotCore:
@@ -12,6 +48,9 @@ class MedicBotCore:
     Attributes:
         llm_service (LLMService): Сервис для работы с языковой моделью (LLM), который используется для генерации ответов.
         data_processor (DataProcessor): Обработчик данных, который предоставляет информацию с веб-сайтов и файлов.
+        classifier (QuestionClassifier): Локальный классификатор вопросов, используемый до обращения к LLM.
+        classification_cache (TTLCache): Кэш результатов классификации по нормализованному тексту вопроса.
+        answer_cache (AnswerCache): Кэш ответов на похожие вопросы, привязанный к версии данных сайта.
     """
 
     def __init__(self, llm: LLMService):
@@ -23,32 +62,186 @@ class MedicBotCore:
         """
         self.llm_service = llm
         self.data_processor = DataProcessor()
+        self.classifier = QuestionClassifier(
+            CONFIG.get("classifier_data"),
+            threshold=CONFIG.get("classifier_threshold", 0.6)
+        )
+        self.classification_cache = TTLCache(
+            maxsize=CONFIG.get("classification_cache_size", 1024),
+            ttl=CONFIG.get("classification_cache_ttl", 3600)
+        )
+        self.answer_cache = AnswerCache(
+            maxsize=CONFIG.get("answer_cache_size", 512),
+            threshold=CONFIG.get("answer_cache_threshold", 0.9)
+        )
 
-    async def get_answer(self, question: str, **kwargs) -> str:
+    async def get_answer(self, question: str, session_id=None, **kwargs) -> str:
         """
         Асинхронно обрабатывает вопрос пользователя, классифицирует его и формирует ответ на основе контекста.
 
         Args:
             question (str): Вопрос пользователя.
+            session_id (optional): Идентификатор сессии (пользователя или чата) для истории диалога.
             **kwargs: Дополнительные параметры для передачи в LLMService.
 
         Returns:
             str: Текстовый ответ на вопрос пользователя.
 
         Описание логики:
+        - Ищет ответ на похожий вопрос в кэше ответов для текущей версии данных сайта.
+          Кэш используется, только если в истории сессии нет предыдущих вопросов: такой ответ
+          не зависит от диалога. Ответ из кэша добавляется в историю сессии.
         - Классифицирует вопрос с помощью метода `classify_question`.
         - Формирует контекст на основе категорий вопроса, используя данные из `DataProcessor`.
-        - Передает контекст и вопрос в LLM для генерации ответа.
+        - Передает контекст и вопрос в LLM для генерации ответа и сохраняет ответ в кэш.
+        - Если модель недоступна, возвращает справочную информацию из данных сайта
+          (см. `degraded_answer`); такой ответ не кэшируется.
+        """
+        # Ищем ответ на похожий вопрос, построенный на текущих данных сайта
+        version, cached = await self._get_cached_answer(question, session_id)
+        if cached is not None:
+            ANSWERS_TOTAL.inc(source="cache", category=question_category.get())
+            self.llm_service.remember(session_id, question, cached)
+            return cached
+
+        context = None
+        try:
+            context = await self.build_context(question)
+
+            # Передаем контекст в LLM для формирования ответа
+            with LLM_SECONDS.time(mode="answer", category=question_category.get()), span("llm"):
+                answer = await self.llm_service.get_answer(question, context=context, session_id=session_id, **kwargs)
+            observe_prompt("answer", prompt_stats.get())
+        except LLMUnavailableError:
+            ANSWERS_TOTAL.inc(source="degraded", category=question_category.get())
+            return await self.degraded_answer(context)
+        ANSWERS_TOTAL.inc(source="llm", category=question_category.get())
+        if version is not None:
+            self.answer_cache.set(question, answer, version)
+        return answer
+
+    async def stream_answer(self, question: str, session_id=None, **kwargs):
+        """
+        Асинхронно обрабатывает вопрос пользователя так же, как `get_answer`,
+        но отдает ответ по частям по мере генерации.
+
+        Args:
+            question (str): Вопрос пользователя.
+            session_id (optional): Идентификатор сессии (пользователя или чата) для истории диалога.
+            **kwargs: Дополнительные параметры для передачи в LLMService.
+
+        Yields:
+            str: Очередной фрагмент ответа. Ответ из кэша и справочная информация при
+                 недоступности модели отдаются одним фрагментом.
+
+        Raises:
+            LLMUnavailableError: Если модель стала недоступна после начала ответа.
+        """
+        version, cached = await self._get_cached_answer(question, session_id)
+        if cached is not None:
+            ANSWERS_TOTAL.inc(source="cache", category=question_category.get())
+            self.llm_service.remember(session_id, question, cached)
+            yield cached
+            return
+
+        context = None
+        chunks = []
+        try:
+            context = await self.build_context(question)
+            with LLM_SECONDS.time(mode="stream", category=question_category.get()), span("llm", stream=True):
+                async for chunk in self.llm_service.stream_answer(question, context=context, session_id=session_id, **kwargs):
+                    chunks.append(chunk)
+                    yield chunk
+            observe_prompt("stream", prompt_stats.get())
+        except LLMUnavailableError:
+            if chunks:
+                raise
+            ANSWERS_TOTAL.inc(source="degraded", category=question_category.get())
+            yield await self.degraded_answer(context)
+            return
+        ANSWERS_TOTAL.inc(source="llm", category=question_category.get())
+        if version is not None:
+            self.answer_cache.set(question, "".join(chunks), version)
+
+    async def _get_cached_answer(self, question: str, session_id=None):
+        """
+        Ищет ответ на похожий вопрос в кэше ответов для текущей версии данных сайта.
+
+        Ответ, построенный с учетом истории диалога, нельзя отдавать другим пользователям,
+        поэтому для сессии с предыдущими вопросами кэш не читается и не пополняется.
+
+        Returns:
+            Tuple[str | None, str | None]: Текущая версия данных (None, если кэш не используется)
+                                           и найденный ответ (или None).
+        """
+        if self.llm_service.has_history(session_id):
+            return None, None
+        with span("answer_cache"):
+            await self.data_processor.get_snapshot()
+            version = self.data_processor.version
+            if version is None:
+                return None, None
+            cached = self.answer_cache.get(question, version)
+        CACHE_REQUESTS_TOTAL.inc(cache="answer", outcome="miss" if cached is None else "hit")
+        return version, cached
+
+    async def degraded_answer(self, context: dict = None) -> str:
+        """
+        Формирует ответ без участия модели из уже загруженных данных сайта.
+
+        Args:
+            context (dict, optional): Разделы контекста, подобранные по категориям вопроса.
+                                      Если не указаны, используются расписание и контакты.
+
+        Returns:
+            str: Шаблонный ответ со справочной информацией.
+        """
+        if not context:
+            context = {
+                "schedule": await self.data_processor.get_schedule(),
+                "contacts": await self.data_processor.get_contacts(),
+            }
+        parts = [DEGRADED_HEADER]
+        for key, title in DEGRADED_SECTIONS.items():
+            if context.get(key):
+                parts.append(f"{title}:\n{plain_text(context[key])}")
+        return "\n\n".join(parts)
+
+    async def build_context(self, question: str) -> dict:
+        """
+        Классифицирует вопрос и формирует контекст для LLM на основе его категорий.
+
+        Args:
+            question (str): Вопрос пользователя.
+
+        Returns:
+            dict: Разделы контекста с данными из `DataProcessor`.
         """
         # Классифицируем вопрос
-        categories = await self.classify_question(question)
+        with span("classify") as classify_span:
+            categories = await self.classify_question(question)
+            question_category.set(primary_category(categories))
+            if classify_span is not None:
+                classify_span.attrs["category"] = question_category.get()
+        with span("context"):
+            return await self.context_for(categories)
+
+    async def context_for(self, categories, snapshot=None) -> dict:
+        """
+        Формирует контекст для LLM на основе категорий вопроса.
 
-        # Формируем контекст на основе категорий
+        Args:
+            categories: Категории вопроса (словарь или список).
+            snapshot (dict, optional): Снимок данных сайта. Если не указан, используется текущий.
+
+        Returns:
+            dict: Разделы контекста с данными из `DataProcessor`.
+        """
         context = {}
         if "Расписание" in categories:
-            context["schedule"] = await self.data_processor.get_schedule()
+            context["schedule"] = await self.data_processor.get_schedule(snapshot)
         if "Контакты" in categories:
-            context["contacts"] = await self.data_processor.get_contacts()
+            context["contacts"] = await self.data_processor.get_contacts(snapshot)
         if "Анализы" in categories:
             context["analyze_time"] = (
                 "общеклинические в течение дня сдачи анализа, "
@@ -56,10 +249,93 @@ class MedicBotCore:
                 "молекулярная диагностика и иммунохроматографический анализ уточняются индивидуально"
             )
         if "Памятка" in categories:
-            context["reminder"] = await self.data_processor.get_reminder()
+            context["reminder"] = await self.data_processor.get_reminder(snapshot)
+        return context
+
+    async def answer_batch(self, items: list, concurrency: int = None):
+        """
+        Асинхронно отвечает на пакет вопросов с ограничением числа одновременных обращений к LLM.
+
+        Args:
+            items (List[dict]): Вопросы в виде словарей с ключом "question" и необязательными
+                                "session_id" и параметрами генерации.
+            concurrency (int, optional): Максимальное число одновременных обращений к LLM.
+                                         По умолчанию берется из `CONFIG["batch_concurrency"]`.
 
-        # Передаем контекст в LLM для формирования ответа
-        return await self.llm_service.get_answer(question, context=context, **kwargs)
+        Yields:
+            dict: Результат по каждому вопросу по мере готовности: index, question, answer,
+                  error и processing_time. Если модель недоступна, answer содержит справочную
+                  информацию, а degraded равен True.
+
+        Описание логики:
+        - Снимок данных сайта берется один раз и используется для всех вопросов пакета.
+        - Одинаковые (после нормализации) вопросы классифицируются один раз, все классификации
+          выполняются вместе.
+        - Ответы формируются параллельно, но не более `concurrency` одновременно.
+        - Если поток закрывается до конца пакета, неготовые ответы отменяются.
+        """
+        concurrency = concurrency or CONFIG.get("batch_concurrency", 4)
+        semaphore = asyncio.Semaphore(concurrency)
+        snapshot = await self.data_processor.get_snapshot()
+        version = self.data_processor.version
+
+        async def classify(question):
+            async with semaphore:
+                return await self.classify_question(question)
+
+        unique = {normalize_text(item["question"]): item["question"] for item in items}
+        results = await asyncio.gather(*(classify(q) for q in unique.values()), return_exceptions=True)
+        categories = dict(zip(unique, results))
+
+        async def answer(index, item):
+            start_time = time.time()
+            params = dict(item)
+            question = params.pop("question")
+            session_id = params.pop("session_id", None)
+            result = {"index": index, "question": question, "answer": None, "error": None}
+            context = None
+            # Ответ с учетом истории диалога не берется из кэша и не попадает в него
+            item_version = None if self.llm_service.has_history(session_id) else version
+            try:
+                cached = self.answer_cache.get(question, item_version) if item_version is not None else None
+                if item_version is not None:
+                    CACHE_REQUESTS_TOTAL.inc(cache="answer", outcome="miss" if cached is None else "hit")
+                if cached is not None:
+                    result["answer"] = cached
+                    ANSWERS_TOTAL.inc(source="cache", category=question_category.get())
+                    self.llm_service.remember(session_id, question, cached)
+                else:
+                    item_categories = categories[normalize_text(question)]
+                    if isinstance(item_categories, Exception):
+                        raise item_categories
+                    question_category.set(primary_category(item_categories))
+                    context = await self.context_for(item_categories, snapshot)
+                    async with semaphore:
+                        with LLM_SECONDS.time(mode="batch", category=question_category.get()):
+                            result["answer"] = await self.llm_service.get_answer(
+                                question, context=context, session_id=session_id, **params
+                            )
+                    observe_prompt("batch", prompt_stats.get())
+                    ANSWERS_TOTAL.inc(source="llm", category=question_category.get())
+                    if item_version is not None:
+                        self.answer_cache.set(question, result["answer"], item_version)
+            except LLMUnavailableError:
+                result["answer"] = await self.degraded_answer(context)
+                result["degraded"] = True
+                ANSWERS_TOTAL.inc(source="degraded", category=question_category.get())
+            except Exception as e:
+                result["error"] = str(e)
+            result["processing_time"] = round(time.time() - start_time, 2)
+            return result
+
+        tasks = [asyncio.create_task(answer(i, item)) for i, item in enumerate(items)]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            # Клиент отключился или поток закрыт раньше времени: оставшиеся вопросы не отправляются в LLM
+            for task in tasks:
+                task.cancel()
 
     async def classify_question(self, question: str) -> dict:
         """
@@ -72,9 +348,40 @@ class MedicBotCore:
             dict: Словарь с категориями, к которым относится вопрос.
 
         Описание логики:
-        - Формируется промпт для языковой модели, содержащий описание категорий.
-        - Промпт отправляется в LLM, которая возвращает JSON с подходящими категориями.
-        - Результат парсится и возвращается в виде словаря.
+        - Результат ищется в кэше по нормализованному тексту вопроса (регистр, ё→е,
+          знаки препинания и пробелы не учитываются).
+        - Вопрос классифицируется локально (ключевые слова и модель n-грамм). Если хотя бы одна
+          категория набрала уверенность выше порога, возвращаются категории с их уверенностью.
+        - Иначе формируется промпт для языковой модели, содержащий описание категорий.
+        - Промпт отправляется в LLM разовым запросом (без сохранения в историю диалога),
+          и модель возвращает JSON с подходящими категориями.
+        - Результат парсится, сохраняется в кэш и возвращается в виде словаря.
+        """
+        key = normalize_text(question)
+        with CLASSIFY_SECONDS.time(source="cache") as labels:
+            categories = self.classification_cache.get(key)
+            CACHE_REQUESTS_TOTAL.inc(cache="classification", outcome="miss" if categories is None else "hit")
+            if categories is None:
+                labels["source"] = "local"
+                categories = self.classifier.classify(question)
+                if not categories:
+                    labels["source"] = "llm"
+                    categories = await self._classify_with_llm(question)
+                self.classification_cache.set(key, categories)
+        for category in categories:
+            if category in CATEGORIES:
+                CLASSIFIED_TOTAL.inc(category=category)
+        return categories
+
+    async def _classify_with_llm(self, question: str) -> dict:
+        """
+        Классифицирует вопрос с помощью LLM (если локальный классификатор не уверен).
+
+        Args:
+            question (str): Вопрос пользователя.
+
+        Returns:
+            dict: Словарь с категориями, к которым относится вопрос.
         """
         prompt = f"""
         Классифицируй следующий вопрос пользователя в одну или несколько категорий:
@@ -87,7 +394,7 @@ class MedicBotCore:
 
         Ответь в формате JSON, указав категории, которые подходят к вопросу. Если категория не подходит, не включай её в ответ.
         """
-        classification_result = await self.llm_service.get_answer(prompt)
+        classification_result = await self.llm_service.complete(prompt)
         return json.loads(classification_result)
 
     async def get_schedule(self):
@@ -0,0 +1,286 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from question_classifier import CATEGORIES
+
+# Границы корзин гистограмм времени (секунды)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Границы корзин гистограмм размера промпта (токены)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000)
+
+# Основная категория вопроса в текущем запросе (для меток метрик уровня запроса)
+question_category: ContextVar = ContextVar("question_category", default="unknown")
+
+
+def _escape(value) -> str:
+    """Экранирует значение метки для текстового формата Prometheus."""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra: str = "") -> str:
+    """Формирует блок меток вида {name="value",...}."""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value) -> str:
+    """Форматирует число для текстового формата Prometheus."""
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """
+    Базовый класс метрики с набором меток.
+
+    Attributes:
+        name (str): Имя метрики.
+        documentation (str): Описание метрики (строка HELP).
+        labelnames (Tuple[str, ...]): Имена меток.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), registry=None):
+        """
+        Инициализирует метрику и регистрирует ее в реестре.
+
+        Args:
+            name (str): Имя метрики.
+            documentation (str): Описание метрики.
+            labelnames (Iterable[str]): Имена меток.
+            registry (MetricsRegistry, optional): Реестр; по умолчанию общий `REGISTRY`.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _key(self, labels: dict) -> tuple:
+        """Возвращает значения меток в порядке `labelnames`."""
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Метрика {self.name} ожидает метки {self.labelnames}, получены {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self):
+        """Возвращает строки значений метрики в текстовом формате."""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        """Возвращает метрику в текстовом формате Prometheus."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """Монотонно растущий счетчик."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        """
+        Увеличивает счетчик.
+
+        Args:
+            amount (float): Величина увеличения.
+            **labels: Значения меток.
+        """
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in sorted(self._values.items())]
+
+
+class Histogram(Metric):
+    """
+    Гистограмма значений с накопительными корзинами.
+
+    Attributes:
+        buckets (Tuple[float, ...]): Верхние границы корзин (включая +Inf).
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS, registry=None):
+        """
+        Инициализирует гистограмму.
+
+        Args:
+            name (str): Имя метрики.
+            documentation (str): Описание метрики.
+            labelnames (Iterable[str]): Имена меток.
+            buckets (Iterable[float]): Верхние границы корзин.
+            registry (MetricsRegistry, optional): Реестр; по умолчанию общий `REGISTRY`.
+        """
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value: float, **labels):
+        """
+        Добавляет наблюдение.
+
+        Args:
+            value (float): Наблюдаемое значение.
+            **labels: Значения меток.
+        """
+        key = self._key(labels)
+        counts, total = self._values.get(key) or ([0] * len(self.buckets), 0.0)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+        self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Измеряет время выполнения блока и добавляет его как наблюдение.
+
+        Метки можно дополнить внутри блока через возвращаемый словарь. Метка "outcome",
+        если она есть у метрики и не задана в блоке, принимает значение "ok" или "error"
+        (при исключении).
+
+        Yields:
+            dict: Изменяемый словарь меток наблюдения.
+        """
+        start = time.perf_counter()
+        try:
+            yield labels
+        except BaseException:
+            if "outcome" in self.labelnames:
+                labels.setdefault("outcome", "error")
+            raise
+        finally:
+            if "outcome" in self.labelnames:
+                labels.setdefault("outcome", "ok")
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        lines = []
+        for key, (counts, total) in sorted(self._values.items()):
+            for bound, count in zip(self.buckets, counts):
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {count}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {counts[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """Реестр метрик, отдающий их в текстовом формате Prometheus."""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric: Metric):
+        """
+        Регистрирует метрику.
+
+        Raises:
+            ValueError: Если метрика с таким именем уже зарегистрирована.
+        """
+        if metric.name in self._metrics:
+            raise ValueError(f"Метрика {metric.name} уже зарегистрирована")
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        """
+        Возвращает все метрики в текстовом формате Prometheus (версия 0.0.4).
+
+        Returns:
+            str: Текст для ответа на /metrics.
+        """
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+REQUEST_SECONDS = Histogram(
+    "medicbot_request_seconds", "Полное время обработки запроса",
+    ["route", "category", "outcome"]
+)
+CLASSIFY_SECONDS = Histogram(
+    "medicbot_classify_seconds", "Время классификации вопроса",
+    ["source", "outcome"]
+)
+CLASSIFIED_TOTAL = Counter(
+    "medicbot_classified_total", "Число вопросов по категориям",
+    ["category"]
+)
+DATA_GETTER_SECONDS = Histogram(
+    "medicbot_data_getter_seconds", "Время получения раздела данных сайта в DataProcessor",
+    ["getter", "outcome"]
+)
+PAGE_FETCH_SECONDS = Histogram(
+    "medicbot_page_fetch_seconds", "Время загрузки страницы сайта поликлиники",
+    ["page", "outcome"]
+)
+PAGE_PARSE_SECONDS = Histogram(
+    "medicbot_page_parse_seconds", "Время парсинга разделов страницы сайта поликлиники",
+    ["page", "outcome"]
+)
+LLM_SECONDS = Histogram(
+    "medicbot_llm_seconds", "Время генерации ответа языковой моделью",
+    ["mode", "category", "outcome"]
+)
+LLM_PROMPT_TOKENS = Histogram(
+    "medicbot_llm_prompt_tokens", "Оценка размера промпта в токенах",
+    ["mode"], buckets=TOKEN_BUCKETS
+)
+LLM_PROMPT_TOKENS_TOTAL = Counter(
+    "medicbot_llm_prompt_tokens_total", "Суммарная оценка токенов промпта по частям",
+    ["part"]
+)
+CACHE_REQUESTS_TOTAL = Counter(
+    "medicbot_cache_requests_total", "Обращения к кэшам",
+    ["cache", "outcome"]
+)
+ANSWERS_TOTAL = Counter(
+    "medicbot_answers_total", "Число ответов по источнику (cache, llm, degraded) и категории",
+    ["source", "category"]
+)
+
+
+def observe_prompt(mode: str, stats: dict):
+    """
+    Учитывает статистику токенов собранного промпта.
+
+    Args:
+        mode (str): Режим вызова модели ("answer", "stream" или "batch").
+        stats (dict | None): Статистика из `prompt_stats`.
+    """
+    if not stats:
+        return
+    LLM_PROMPT_TOKENS.observe(stats["total"], mode=mode)
+    for part in ("system", "context", "history", "question"):
+        LLM_PROMPT_TOKENS_TOTAL.inc(stats[part], part=part)
+
+
+def primary_category(categories) -> str:
+    """
+    Возвращает основную категорию вопроса для меток метрик.
+
+    Args:
+        categories: Категории вопроса (словарь с уверенностью или список).
+
+    Returns:
+        str: Известная категория с наибольшей уверенностью или "unknown". Категории,
+             которых нет в `CATEGORIES` (например, из ответа LLM), не попадают в метки.
+    """
+    known = [category for category in categories or () if category in CATEGORIES]
+    if not known:
+        return "unknown"
+    if isinstance(categories, dict):
+        try:
+            return max(known, key=lambda category: float(categories[category]))
+        except (TypeError, ValueError):
+            pass
+    return known[0]
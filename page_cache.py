@@ -0,0 +1,115 @@
+import hashlib
+import json
+import os
+
+
+class PageCache:
+    """
+    Класс PageCache представляет собой дисковый кэш загруженных страниц сайта.
+    Для каждого URL хранит HTML-код, заголовки ETag/Last-Modified и хэш содержимого,
+    что позволяет выполнять условные запросы и не парсить неизменившиеся страницы.
+
+    Attributes:
+        folder (str): Директория, в которой хранятся записи кэша.
+        entries (Dict[str, Dict[str, str]]): Загруженные в память записи кэша по URL.
+    """
+
+    def __init__(self, folder: str):
+        """
+        Инициализирует экземпляр класса PageCache.
+
+        Args:
+            folder (str): Директория для хранения записей кэша. Создается при первой записи.
+        """
+        self.folder = folder
+        self.entries = {}
+
+    @staticmethod
+    def content_hash(html: str) -> str:
+        """
+        Вычисляет хэш содержимого страницы.
+
+        Args:
+            html (str): HTML-код страницы.
+
+        Returns:
+            str: Шестнадцатеричный SHA-256 хэш.
+        """
+        return hashlib.sha256(html.encode("utf-8")).hexdigest()
+
+    def _path(self, url: str) -> str:
+        """Возвращает путь к файлу записи кэша для указанного URL."""
+        name = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.folder, f"{name}.json")
+
+    def get(self, url: str):
+        """
+        Возвращает запись кэша для URL, при необходимости загружая ее с диска.
+
+        Args:
+            url (str): Адрес страницы.
+
+        Returns:
+            Dict[str, str] | None: Запись с ключами "html", "etag", "last_modified", "hash" или None.
+        """
+        if url in self.entries:
+            return self.entries[url]
+        try:
+            with open(self._path(url), "r", encoding="utf-8") as file:
+                entry = json.load(file)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Ошибка чтения кэша страницы {url}: {e}")
+            return None
+        self.entries[url] = entry
+        return entry
+
+    def conditional_headers(self, url: str) -> dict:
+        """
+        Формирует заголовки условного запроса для URL.
+
+        Args:
+            url (str): Адрес страницы.
+
+        Returns:
+            Dict[str, str]: Заголовки If-None-Match и/или If-Modified-Since, если они известны.
+        """
+        entry = self.get(url)
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def put(self, url: str, html: str, etag: str = None, last_modified: str = None) -> dict:
+        """
+        Сохраняет страницу в кэш в памяти и на диске.
+
+        Args:
+            url (str): Адрес страницы.
+            html (str): HTML-код страницы.
+            etag (str, optional): Значение заголовка ETag.
+            last_modified (str, optional): Значение заголовка Last-Modified.
+
+        Returns:
+            Dict[str, str]: Сохраненная запись кэша.
+        """
+        entry = {
+            "url": url,
+            "html": html,
+            "etag": etag,
+            "last_modified": last_modified,
+            "hash": self.content_hash(html)
+        }
+        self.entries[url] = entry
+        try:
+            if not os.path.exists(self.folder):
+                os.makedirs(self.folder)
+            with open(self._path(url), "w", encoding="utf-8") as file:
+                json.dump(entry, file, ensure_ascii=False)
+        except Exception as e:
+            print(f"Ошибка сохранения кэша страницы {url}: {e}")
+        return entry
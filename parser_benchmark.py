@@ -0,0 +1,147 @@
+"""
+Микро-бенчмарк парсинга страниц поликлиники.
+
+Воспроизводит сохраненные HTML-фикстуры трех страниц сайта (а если они не сохранены —
+встроенные страницы CLINIC_PAGES) и для каждого движка парсинга измеряет время и пиковое
+потребление памяти, а также проверяет, что результаты парсеров разделов совпадают
+с эталонным html.parser.
+
+Сравниваются только движки BeautifulSoup: парсеры разделов WebsiteScraper работают
+с деревом BeautifulSoup, а движок вроде selectolax потребовал бы второй реализации
+каждого из них, и их результаты пришлось бы сверять отдельно.
+
+Запуск:
+    python parser_benchmark.py --record      # сохранить фикстуры с сайта
+    python parser_benchmark.py -n 50         # прогнать бенчмарк
+"""
+import argparse
+import asyncio
+import os
+import time
+import tracemalloc
+
+from bs4.builder import builder_registry
+
+from config import CONFIG
+from website_scraper import WebsiteScraper, MAIN_PAGE_TAGS, CONSULTATIVE_PAGE_TAGS, LAB_PAGE_TAGS
+
+FIXTURES_DIR = os.path.join("data", "fixtures")
+BACKENDS = ["html.parser", "lxml"]
+
+# Имя фикстуры -> (ключ URL в CONFIG, теги страницы, имена парсеров разделов)
+PAGES = {
+    "main": ("website_url", MAIN_PAGE_TAGS, ["_parse_contacts", "_parse_main_schedule"]),
+    "consultative": ("consultative_url", CONSULTATIVE_PAGE_TAGS, ["_parse_consultative_schedule"]),
+    "lab": ("lab_url", LAB_PAGE_TAGS, ["_parse_results_schedule", "parse_patient_reminder"]),
+}
+
+
+async def record_fixtures(folder):
+    """Загружает страницы сайта и сохраняет их как фикстуры."""
+    os.makedirs(folder, exist_ok=True)
+    async with WebsiteScraper() as scraper:
+        for name, (url_key, _, _) in PAGES.items():
+            page = await scraper._fetch_page(CONFIG[url_key])
+            with open(os.path.join(folder, f"{name}.html"), "w", encoding="utf-8") as file:
+                file.write(page["html"])
+            print(f"Сохранена фикстура {name}.html")
+
+
+# Встроенные страницы сайта поликлиники, если фикстуры не сохранены.
+# Разметка повторяет то, что читают парсеры разделов WebsiteScraper.
+CLINIC_PAGES = {
+    "main": """<html><body>
+<p>Телефон единого центра обработки звонков диагностической поликлиники:
+<strong style="color: #21347d;">8 (3022) 73-70-73</strong></p>
+<p>СТУДЕНТАМ ЧГМА: <strong style="color: #21347d;">8 (3022) 35-43-24</strong>
+<strong style="color: #21347d;">8 (3022) 35-43-25</strong></p>
+<table style="width: 350px;"><tr><td>Понедельник - пятница</td><td>08:00 - 18:00</td></tr>
+<tr><td>Суббота</td><td>09:00 - 14:00</td></tr><tr><td>Воскресенье</td><td>выходной</td></tr></table>
+<table style="width: 350px;"><tr><td>Понедельник - пятница</td><td>08:00 - 10:30</td></tr>
+<tr><td>Суббота</td><td>09:00 - 10:30</td></tr></table>
+<table style="width: 350px;"><tr><td>Понедельник - пятница</td><td>08:00 - 11:00</td></tr></table>
+</body></html>""",
+    "consultative": """<html><body>
+<table style="width: 644px;"><tr><td>День</td><td>Время</td></tr>
+<tr><td>Понедельник - пятница</td><td>08:00 - 16:00</td></tr>
+<tr><td>Суббота</td><td>09:00 - 13:00</td></tr></table>
+</body></html>""",
+    "lab": """<html><body>
+<p style="font-family: Arial;">Выдача результатов: понедельник - пятница 13:00 - 18:00</p>
+<p style="font-family: Arial;">суббота 12:00 - 14:00</p>
+<p style="font-family: Arial;">воскресенье 00:00 - 00:00</p>
+<p><strong style="color: #21347d;">Подготовка к сдаче крови</strong></p>
+<ol><li>Кровь сдается натощак.</li><li>Накануне исключите жирную пищу и алкоголь.</li></ol>
+<p><strong style="color: #21347d;">Сбор мочи</strong></p>
+<ol><li>Соберите утреннюю порцию мочи в стерильный контейнер.</li></ol>
+</body></html>""",
+}
+
+
+def load_pages(folder):
+    """Возвращает HTML страниц сайта: сохраненные фикстуры или встроенные страницы."""
+    pages = {}
+    for name in PAGES:
+        path = os.path.join(folder, f"{name}.html")
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as file:
+                pages[name] = file.read()
+        else:
+            pages[name] = CLINIC_PAGES[name]
+    return pages
+
+
+def parse_page(scraper, html, tags, parsers):
+    """Строит дерево страницы и запускает ее парсеры разделов."""
+    soup = scraper.make_soup(html, tags)
+    return [getattr(scraper, parser)(soup) for parser in parsers]
+
+
+def run_case(scraper, html, tags, parsers, repeat):
+    """
+    Измеряет среднее время и пиковую память парсинга одной страницы.
+
+    Returns:
+        Tuple[float, float, list]: Среднее время в мс, пиковая память в КБ и результат парсеров.
+    """
+    result = parse_page(scraper, html, tags, parsers)  # прогрев
+    start = time.perf_counter()
+    for _ in range(repeat):
+        parse_page(scraper, html, tags, parsers)
+    elapsed = (time.perf_counter() - start) / repeat * 1000
+
+    tracemalloc.start()
+    parse_page(scraper, html, tags, parsers)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024, result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Бенчмарк парсинга страниц поликлиники")
+    arg_parser.add_argument("--fixtures", default=FIXTURES_DIR, help="Директория с HTML-фикстурами")
+    arg_parser.add_argument("--record", action="store_true", help="Сохранить фикстуры с сайта")
+    arg_parser.add_argument("-n", "--repeat", type=int, default=20, help="Число повторов на случай")
+    args = arg_parser.parse_args()
+
+    if args.record:
+        asyncio.run(record_fixtures(args.fixtures))
+        return
+
+    fixtures = load_pages(args.fixtures)
+    backends = [b for b in BACKENDS if builder_registry.lookup(b) is not None]
+    reference = {}
+
+    print(f"{'страница':<14}{'движок':<13}{'режим':<10}{'время, мс':>11}{'память, КБ':>12}  результат")
+    for name, (_, tags, parsers) in PAGES.items():
+        for backend in backends:
+            scraper = WebsiteScraper(parser=backend)
+            for mode, mode_tags in (("полный", None), ("выборка", tags)):
+                elapsed, peak, result = run_case(scraper, fixtures[name], mode_tags, parsers, args.repeat)
+                reference.setdefault(name, result)
+                status = "совпадает" if result == reference[name] else "ОТЛИЧАЕТСЯ"
+                print(f"{name:<14}{backend:<13}{mode:<10}{elapsed:>11.2f}{peak:>12.0f}  {status}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,15 +2,18 @@ from datetime import datetime
 
 import psycopg2
 
+from config import CONFIG
 from db_handler import *
+from db_migrations import apply_migrations
 
 class PostgreSQLHandler(DatabaseHandler):
-    def __init__(self, dbname, user, password, host="localhost", port="5432"):
+    def __init__(self, dbname, user, password, host="localhost", port="5432", auto_migrate=None):
         self.dbname = dbname
         self.user = user
         self.password = password
         self.host = host
         self.port = port
+        self.auto_migrate = auto_migrate if auto_migrate is not None else CONFIG.get("db_auto_migrate", True)
         self.conn = None
         self.cursor = None
         self.connect()
@@ -40,9 +43,17 @@ class PostgreSQLHandler(DatabaseHandler):
                 port=self.port
             )
             self.cursor = self.conn.cursor()
+            if self.auto_migrate:
+                self.migrate()
         except Exception as e:
             print(f"Error connecting to database: {e}")
 
+    def migrate(self):
+        """Применение новых миграций схемы (см. db_migrations.py)"""
+        applied = apply_migrations(self.conn)
+        if applied:
+            print(f"Applied schema migrations: {applied}")
+
     def close(self):
         """Закрытие соединения с базой данных"""
         if self.cursor:
@@ -63,32 +74,31 @@ class PostgreSQLHandler(DatabaseHandler):
             return None
 
     def is_user_verified(self, user_id):
-        """Проверка верификации пользователя"""
+        """Проверка верификации пользователя; None при ошибке базы данных"""
         try:
             self.cursor.execute("SELECT is_verified FROM users WHERE user_id = %s", (user_id,))
             result = self.cursor.fetchone()
             return result[0] if result else False
         except Exception as e:
             print(f"Error checking user verification: {e}")
-            return False
+            return None  # Неизвестно: в отличие от False, не кэшируется менеджером
 
     def is_user_registered(self, user_id):
-        """Проверка, зарегистрирован ли пользователь"""
+        """Проверка, зарегистрирован ли пользователь; None при ошибке базы данных"""
         try:
             self.cursor.execute("SELECT EXISTS(SELECT 1 FROM users WHERE user_id = %s)", (user_id,))
             return self.cursor.fetchone()[0]
         except Exception as e:
             print(f"Error checking user registration: {e}")
-            return False
+            return None  # Неизвестно: в отличие от False, не кэшируется менеджером
 
     def register_user(self, user_id, username, phone, full_name=""):
         try:
-            if self.is_user_registered(user_id):
-                return True
-
+            # Одна операция вместо проверки и вставки: уже зарегистрированный пользователь не изменяется
             self.cursor.execute("""
                 INSERT INTO users (user_id, username, phone, full_name, is_verified, registration_date)
                 VALUES (%s, %s, %s, %s, %s, %s)
+                ON CONFLICT (user_id) DO NOTHING
             """, (user_id, username, phone, full_name, False, datetime.now()))
             self.conn.commit()
             return True
@@ -99,18 +109,14 @@ class PostgreSQLHandler(DatabaseHandler):
 
     def create_call_request(self, user_id):
         try:
-            self.cursor.execute("SELECT phone FROM users WHERE user_id = %s", (user_id,))
-            user = self.cursor.fetchone()
-            if not user:
-                return False
-
-            phone = user[0]
+            # Телефон берется из users той же вставкой; если пользователя нет, строка не вставляется
             self.cursor.execute("""
                 INSERT INTO call_requests (user_id, phone, request_time, call_status)
-                VALUES (%s, %s, %s, %s)
-            """, (user_id, phone, datetime.now(), False))  # Используем False для "pending"
+                SELECT user_id, phone, %s, FALSE FROM users WHERE user_id = %s
+            """, (datetime.now(), user_id))  # Используем False для "pending"
+            created = self.cursor.rowcount > 0
             self.conn.commit()
-            return True
+            return created
         except Exception as e:
             print(f"Call request error: {e}")
             self.conn.rollback()
@@ -119,12 +125,48 @@ class PostgreSQLHandler(DatabaseHandler):
     def get_pending_requests(self):
         """Получение ожидающих запросов"""
         try:
-            self.cursor.execute("SELECT * FROM call_requests WHERE call_status = 'pending'")
+            # call_status — логический флаг: FALSE означает, что звонок еще не выполнен
+            self.cursor.execute("""
+                SELECT * FROM call_requests
+                WHERE call_status = FALSE
+                ORDER BY request_time, request_id
+            """)
+            rows = self.cursor.fetchall()
+            columns = [desc[0] for desc in self.cursor.description]
+            return [dict(zip(columns, row)) for row in rows]
+        except Exception as e:
+            print(f"Error fetching pending requests: {e}")
+            return []
+
+    def get_pending_requests_page(self, limit=100, after=None):
+        """
+        Страница очереди ожидающих запросов в порядке поступления (keyset-пагинация).
+
+        after — курсор (request_time, request_id) последней строки предыдущей страницы;
+        запрос читает только частичный индекс call_requests_pending_idx, поэтому время
+        не зависит от номера страницы и размера таблицы.
+        """
+        try:
+            if after is None:
+                self.cursor.execute("""
+                    SELECT * FROM call_requests
+                    WHERE call_status = FALSE
+                    ORDER BY request_time, request_id
+                    LIMIT %s
+                """, (limit,))
+            else:
+                self.cursor.execute("""
+                    SELECT * FROM call_requests
+                    WHERE call_status = FALSE AND (request_time, request_id) > (%s, %s)
+                    ORDER BY request_time, request_id
+                    LIMIT %s
+                """, (after[0], after[1], limit))
             rows = self.cursor.fetchall()
             columns = [desc[0] for desc in self.cursor.description]
             return [dict(zip(columns, row)) for row in rows]
         except Exception as e:
             print(f"Error fetching pending requests: {e}")
+            self.conn.rollback()
             return []
 
     def update_call_status(self, request_id, status=True):
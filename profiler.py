@@ -0,0 +1,260 @@
+import cProfile
+import hashlib
+import hmac
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+
+from config import CONFIG
+
+# Текущий участок (span) трассировки запроса; None, если запрос не трассируется
+current_span: ContextVar = ContextVar("current_span", default=None)
+
+
+class Span:
+    """
+    Класс Span представляет собой участок обработки запроса с вложенными участками.
+
+    Attributes:
+        name (str): Имя участка (например, "classify", "context", "llm").
+        attrs (dict): Дополнительные сведения об участке.
+        start (float): Время начала (time.perf_counter).
+        end (float | None): Время окончания.
+        children (List[Span]): Вложенные участки.
+    """
+
+    def __init__(self, name: str, **attrs):
+        self.name = name
+        self.attrs = attrs
+        self.start = time.perf_counter()
+        self.end = None
+        self.children = []
+
+    def finish(self):
+        """Отмечает окончание участка."""
+        if self.end is None:
+            self.end = time.perf_counter()
+
+    @property
+    def duration(self) -> float:
+        """Длительность участка в секундах (для незавершенного — до текущего момента)."""
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def to_dict(self, origin: float = None) -> dict:
+        """
+        Преобразует дерево участков в словарь.
+
+        Args:
+            origin (float, optional): Время начала корневого участка; смещения считаются от него.
+
+        Returns:
+            dict: Имя, смещение и длительность в мс, сведения и вложенные участки.
+        """
+        origin = self.start if origin is None else origin
+        result = {
+            "name": self.name,
+            "offset_ms": round((self.start - origin) * 1000, 2),
+            "duration_ms": round(self.duration * 1000, 2),
+        }
+        if self.attrs:
+            result["attrs"] = self.attrs
+        if self.children:
+            result["children"] = [child.to_dict(origin) for child in self.children]
+        return result
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """
+    Открывает вложенный участок трассировки. Если запрос не трассируется, ничего не делает.
+
+    Args:
+        name (str): Имя участка.
+        **attrs: Дополнительные сведения об участке.
+
+    Yields:
+        Span | None: Открытый участок или None.
+    """
+    parent = current_span.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(name, **attrs)
+    parent.children.append(child)
+    current_span.set(child)
+    try:
+        yield child
+    finally:
+        child.finish()
+        # Восстанавливаем родителя через set, а не reset: участок может закрываться
+        # в асинхронном генераторе, который завершается в другом контексте
+        current_span.set(parent)
+
+
+class RequestProfiler:
+    """
+    Класс RequestProfiler строит дерево участков обработки каждого запроса, по требованию
+    (заголовок или случайная выборка) добавляет профиль CPU и записывает медленные запросы
+    в локальный файл с ротацией.
+
+    Дерево участков строится для всех запросов: это несколько вызовов time.perf_counter,
+    зато у каждого медленного запроса есть разбивка времени по этапам.
+
+    Attributes:
+        sample_rate (float): Доля запросов, профилируемых без заголовка.
+        header (str): Имя заголовка, включающего профилирование ("1" — дерево участков, "cpu" — и профиль CPU).
+        token (str): Секрет заголовка `<header>-Token`; без него заголовок профилирования игнорируется.
+        cpu (bool): Снимать профиль CPU у всех профилируемых запросов.
+        threshold (float): Порог длительности запроса в секундах для записи в журнал медленных запросов.
+        redact (bool): Не записывать текст вопроса, а только его хэш и длину.
+        log_path (str): Путь к журналу медленных запросов.
+    """
+
+    def __init__(self, sample_rate: float = None, header: str = None, cpu: bool = None, threshold: float = None,
+                 redact: bool = None, log_path: str = None, max_bytes: int = None, backup_count: int = None,
+                 token: str = None):
+        """
+        Инициализирует экземпляр класса RequestProfiler. Не указанные параметры берутся из `CONFIG`.
+
+        Args:
+            sample_rate (float, optional): Доля запросов, профилируемых без заголовка.
+            header (str, optional): Имя заголовка, включающего профилирование.
+            cpu (bool, optional): Снимать профиль CPU у всех профилируемых запросов.
+            threshold (float, optional): Порог медленного запроса в секундах.
+            redact (bool, optional): Не записывать текст вопроса в журнал.
+            log_path (str, optional): Путь к журналу медленных запросов.
+            max_bytes (int, optional): Максимальный размер файла журнала до ротации.
+            backup_count (int, optional): Число хранимых старых файлов журнала.
+            token (str, optional): Секрет заголовка `<header>-Token`.
+        """
+        self.sample_rate = sample_rate if sample_rate is not None else CONFIG.get("profile_sample_rate", 0.0)
+        self.header = header or CONFIG.get("profile_header", "X-Profile")
+        self.cpu = cpu if cpu is not None else CONFIG.get("profile_cpu", False)
+        self.token = token if token is not None else CONFIG.get("profile_token", "")
+        self.threshold = threshold if threshold is not None else CONFIG.get("slow_request_threshold", 2.0)
+        self.redact = redact if redact is not None else CONFIG.get("slow_request_redact", False)
+        self.log_path = log_path or CONFIG.get("slow_request_log", os.path.join("data", "slow_requests.log"))
+        self.max_bytes = max_bytes if max_bytes is not None else CONFIG.get("slow_request_log_max_bytes", 5 * 1024 * 1024)
+        self.backup_count = backup_count if backup_count is not None else CONFIG.get("slow_request_log_backups", 5)
+        self._logger = None
+
+    def mode(self, headers) -> str:
+        """
+        Определяет режим профилирования запроса.
+
+        Заголовок профилирования учитывается, только если задан `token` и заголовок
+        `<header>-Token` совпадает с ним: профиль раскрывает внутреннее устройство сервиса,
+        а профиль CPU замедляет обработку.
+
+        Args:
+            headers: Заголовки HTTP-запроса.
+
+        Returns:
+            str | None: "cpu" (участки и профиль CPU), "spans" (только участки) или None.
+        """
+        value = ""
+        if self.token and hmac.compare_digest(headers.get(f"{self.header}-Token") or "", self.token):
+            value = (headers.get(self.header) or "").strip().lower()
+        if value == "cpu":
+            return "cpu"
+        if value in ("1", "true", "yes") or (self.sample_rate and random.random() < self.sample_rate):
+            return "cpu" if self.cpu else "spans"
+        return None
+
+    @contextmanager
+    def trace(self, name: str, cpu: bool = False, **attrs):
+        """
+        Трассирует обработку запроса.
+
+        Профиль CPU снимается cProfile для всего потока, поэтому при одновременных запросах
+        в него попадает и работа других задач цикла событий.
+
+        Args:
+            name (str): Имя корневого участка (обычно маршрут).
+            cpu (bool): Снимать профиль CPU.
+            **attrs: Дополнительные сведения о запросе.
+
+        Yields:
+            Span: Корневой участок; после выхода из блока в `attrs["cpu_profile"]`
+                  лежит текстовый отчет профиля CPU, если он снимался.
+        """
+        root = Span(name, **attrs)
+        previous = current_span.get()
+        current_span.set(root)
+        profile = cProfile.Profile() if cpu else None
+        if profile is not None:
+            try:
+                profile.enable()
+            except ValueError:  # Профилировщик уже включен другим запросом
+                profile = None
+                root.attrs["cpu_profile"] = "недоступен: профилируется другой запрос"
+        try:
+            yield root
+        finally:
+            if profile is not None:
+                profile.disable()
+                root.attrs["cpu_profile"] = self.cpu_report(profile)
+            root.finish()
+            current_span.set(previous)
+
+    @staticmethod
+    def cpu_report(profile: cProfile.Profile, limit: int = 25) -> str:
+        """Возвращает самые затратные функции профиля CPU в текстовом виде."""
+        stream = io.StringIO()
+        pstats.Stats(profile, stream=stream).sort_stats("tottime").print_stats(limit)
+        return stream.getvalue()
+
+    def _get_logger(self) -> logging.Logger:
+        """Возвращает журнал медленных запросов, создавая файл при первом обращении."""
+        if self._logger is None:
+            folder = os.path.dirname(self.log_path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            logger = logging.getLogger(f"medicbot.slow_requests.{id(self)}")
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            handler = RotatingFileHandler(self.log_path, maxBytes=self.max_bytes,
+                                          backupCount=self.backup_count, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+            self._logger = logger
+        return self._logger
+
+    def record(self, root: Span, question: str = None, **extra) -> bool:
+        """
+        Записывает запрос в журнал медленных запросов, если он длился дольше порога.
+
+        Args:
+            root (Span): Корневой участок запроса.
+            question (str, optional): Текст вопроса.
+            **extra: Дополнительные поля записи (например, request_id).
+
+        Returns:
+            bool: True, если запрос записан в журнал.
+        """
+        if root.duration < self.threshold:
+            return False
+        entry = {"timestamp": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"), **extra}
+        if question is not None:
+            if self.redact:
+                entry["question"] = {
+                    "sha1": hashlib.sha1(question.encode("utf-8")).hexdigest()[:12],
+                    "length": len(question),
+                }
+            else:
+                entry["question"] = question
+        entry["trace"] = root.to_dict()
+        try:
+            self._get_logger().info(json.dumps(entry, ensure_ascii=False))
+        except OSError as e:
+            print(f"Ошибка записи журнала медленных запросов: {e}")
+            return False
+        return True
@@ -0,0 +1,148 @@
+import math
+from contextvars import ContextVar
+from typing import List
+
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+
+CONTEXT_HEADER = "Контекстные данные:\n"
+
+# Статистика токенов последнего собранного промпта в текущем запросе
+prompt_stats: ContextVar = ContextVar("prompt_stats", default=None)
+
+# Приоритеты разделов контекста: при нехватке бюджета первыми урезаются разделы
+# с меньшим приоритетом. Неизвестные разделы получают приоритет 1.
+DEFAULT_CONTEXT_PRIORITY = {
+    "schedule": 3,
+    "contacts": 3,
+    "analyze_time": 2,
+    "reminder": 1,
+}
+
+
+class PromptBuilder:
+    """
+    Класс PromptBuilder собирает список сообщений для модели в пределах бюджета токенов.
+    Системный промпт не изменяется: контекст добавляется к его копии при каждом вызове.
+
+    Attributes:
+        token_budget (int): Максимальный размер промпта в токенах.
+        chars_per_token (float): Среднее число символов на токен для оценки размера текста.
+        context_priority (Dict[str, int]): Приоритеты разделов контекста.
+        min_section_tokens (int): Минимальный размер урезанного раздела; меньшие разделы отбрасываются.
+    """
+
+    def __init__(self, token_budget: int, chars_per_token: float = 3.0, context_priority: dict = None,
+                 min_section_tokens: int = 32):
+        """
+        Инициализирует экземпляр класса PromptBuilder.
+
+        Args:
+            token_budget (int): Максимальный размер промпта в токенах.
+            chars_per_token (float): Среднее число символов на токен.
+            context_priority (dict, optional): Приоритеты разделов контекста.
+            min_section_tokens (int): Минимальный размер урезанного раздела контекста в токенах.
+        """
+        self.token_budget = token_budget
+        self.chars_per_token = chars_per_token
+        self.context_priority = context_priority or DEFAULT_CONTEXT_PRIORITY
+        self.min_section_tokens = min_section_tokens
+
+    def estimate_tokens(self, text: str) -> int:
+        """
+        Оценивает число токенов в тексте.
+
+        Args:
+            text (str): Текст.
+
+        Returns:
+            int: Приблизительное число токенов.
+        """
+        return math.ceil(len(text) / self.chars_per_token) if text else 0
+
+    def _truncate(self, text: str, tokens: int) -> str:
+        """Урезает текст до указанного числа токенов."""
+        return text[:int(tokens * self.chars_per_token)].rstrip() + "…"
+
+    def build(self, messages: List[BaseMessage], context: dict = None):
+        """
+        Собирает промпт из системного сообщения, контекста, истории и текущего вопроса.
+
+        Args:
+            messages (List[BaseMessage]): Сообщения: системное (необязательно), история и текущий вопрос последним.
+            context (dict, optional): Разделы контекста для добавления к системному сообщению.
+
+        Returns:
+            Tuple[List[BaseMessage], Dict[str, Any]]: Итоговые сообщения и статистика токенов.
+
+        Описание логики:
+        - Системное сообщение и текущий вопрос включаются всегда.
+        - Разделы контекста добавляются по убыванию приоритета; не помещающийся раздел урезается
+          или отбрасывается.
+        - Оставшийся бюджет заполняется историей, начиная с самых новых сообщений.
+        """
+        system_msg = next((msg for msg in messages if isinstance(msg, SystemMessage)), None)
+        dialog = [msg for msg in messages if msg is not system_msg]
+        question, history = dialog[-1:], dialog[:-1]
+
+        system_tokens = self.estimate_tokens(system_msg.content) if system_msg else 0
+        question_tokens = sum(self.estimate_tokens(msg.content) for msg in question)
+        remaining = self.token_budget - system_tokens - question_tokens
+        context_tokens = self.estimate_tokens(CONTEXT_HEADER) if context else 0
+        remaining -= context_tokens
+
+        # Контекст: по убыванию приоритета, с урезанием не помещающихся разделов
+        sections = {}
+        dropped_context = []
+        ordered = sorted((context or {}).items(), key=lambda item: -self.context_priority.get(item[0], 1))
+        for key, value in ordered:
+            line = f"{key}: {value}"
+            tokens = self.estimate_tokens(line)
+            if tokens > remaining:
+                if remaining < self.min_section_tokens:
+                    dropped_context.append(key)
+                    continue
+                line = self._truncate(line, remaining)
+                tokens = self.estimate_tokens(line)
+            sections[key] = line
+            remaining -= tokens
+            context_tokens += tokens
+
+        # История: самые новые сообщения в пределах оставшегося бюджета
+        kept_history = []
+        history_tokens = 0
+        for msg in reversed(history):
+            tokens = self.estimate_tokens(msg.content)
+            if tokens > remaining:
+                break
+            kept_history.insert(0, msg)
+            remaining -= tokens
+            history_tokens += tokens
+        # История не должна начинаться с ответа модели без вопроса к нему
+        if kept_history and not isinstance(kept_history[0], HumanMessage):
+            history_tokens -= self.estimate_tokens(kept_history.pop(0).content)
+
+        # Сохраняем исходный порядок разделов контекста
+        context_lines = [sections[key] for key in (context or {}) if key in sections]
+        if not context_lines:
+            context_tokens = 0
+        result = []
+        if context_lines:
+            context_str = CONTEXT_HEADER + "\n".join(context_lines)
+            content = f"{system_msg.content}\n\n{context_str}" if system_msg else context_str
+            result.append(SystemMessage(content=content))
+        elif system_msg:
+            result.append(system_msg)
+        result.extend(kept_history)
+        result.extend(question)
+
+        stats = {
+            "system": system_tokens,
+            "context": context_tokens,
+            "history": history_tokens,
+            "question": question_tokens,
+            "total": system_tokens + context_tokens + history_tokens + question_tokens,
+            "budget": self.token_budget,
+            "dropped_context": dropped_context,
+            "dropped_messages": len(history) - len(kept_history),
+        }
+        return result, stats
@@ -0,0 +1,220 @@
+import json
+import math
+import re
+from collections import Counter
+
+try:
+    import pymorphy3
+except ImportError:  # Без pymorphy3 используется упрощенный стеммер
+    pymorphy3 = None
+
+CATEGORIES = ["Расписание", "Контакты", "Анализы", "Памятка"]
+
+# Основы ключевых слов для каждой категории (сравниваются с началом нормализованного слова)
+KEYWORDS = {
+    "Расписание": ["график", "расписан", "режим", "врем", "работ", "час", "открыт",
+                   "открыв", "прием", "приним", "выходн", "суббот", "воскресен", "празднич"],
+    "Контакты": ["телефон", "номер", "адрес", "позвон", "звон", "связ", "регистратур", "контакт",
+                 "наход", "добрат", "проехат", "почт", "сайт"],
+    "Анализы": ["анализ", "кров", "моч", "результат", "сда", "лаборатор",
+                "бактериолог", "пцр", "мазок", "мазк", "исследован", "готов"],
+    "Памятка": ["памятк", "подготов", "правил", "рекомендац", "натощак", "документ", "взя",
+                "полис", "паспорт", "направлен"],
+}
+
+# Короткие или многозначные основы, которые совпадают и с посторонними словами ("час" — "часть",
+# "сда" — "сдаться", "работ" — "работник"). Такое совпадение весит вдвое меньше: одного его
+# недостаточно для порога уверенности, решают другие признаки или LLM.
+WEAK_KEYWORDS = {"врем", "работ", "час", "прием", "сда", "моч", "готов", "взя"}
+WEAK_KEYWORD_WEIGHT = 0.5
+
+# Одно ключевое слово не доказывает категорию ("Часть документов потерял" — не вопрос о памятке):
+# его уверенность не выше SINGLE_KEYWORD_SCORE (ниже порога), если остальные слова вопроса
+# не похожи на вопросы той же категории хотя бы на NGRAM_AGREEMENT по модели n-грамм.
+SINGLE_KEYWORD_SCORE = 0.5
+NGRAM_AGREEMENT = 0.25
+
+# Окончания для упрощенного стеммера (от длинных к коротким)
+ENDINGS = sorted([
+    "иями", "ями", "ами", "ого", "его", "ому", "ему", "ыми", "ими", "ией", "ей", "ой", "ий", "ый",
+    "ая", "яя", "ое", "ее", "ые", "ие", "ую", "юю", "ом", "ем", "ах", "ях", "ов", "ев", "ам", "ям",
+    "ть", "ти", "ешь", "ет", "ем", "ете", "ут", "ют", "ит", "ат", "ят", "ишь", "ил", "ила", "ило",
+    "или", "ся", "сь", "а", "я", "о", "е", "ы", "и", "у", "ю", "ь", "й",
+], key=len, reverse=True)
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Приводит текст к каноническому виду: нижний регистр, ё→е,
+    без знаков препинания и лишних пробелов.
+
+    Args:
+        text (str): Исходный текст.
+
+    Returns:
+        str: Нормализованный текст.
+    """
+    text = text.lower().replace("ё", "е")
+    text = _PUNCTUATION.sub(" ", text)
+    return " ".join(text.split())
+
+
+class QuestionClassifier:
+    """
+    Класс QuestionClassifier выполняет локальную классификацию вопросов пользователей
+    по категориям без обращения к языковой модели.
+
+    Классификация объединяет ключевые слова и модель символьных n-грамм, обученную
+    на размеченном файле вопросов. Для каждой категории возвращается степень уверенности.
+
+    Attributes:
+        threshold (float): Минимальная уверенность, при которой категория считается подходящей.
+        ngram (int): Длина символьных n-грамм.
+        examples (List[Tuple[Dict[str, float], Set[str]]]): Векторы обучающих вопросов с категориями.
+    """
+
+    def __init__(self, data_path: str = None, threshold: float = 0.6, ngram: int = 3):
+        """
+        Инициализирует экземпляр класса QuestionClassifier.
+
+        Args:
+            data_path (str, optional): Путь к JSON-файлу с размеченными вопросами вида
+                                       [{"question": "...", "categories": ["..."]}].
+            threshold (float): Минимальная уверенность для включения категории в результат.
+            ngram (int): Длина символьных n-грамм.
+        """
+        self.threshold = threshold
+        self.ngram = ngram
+        self.morph = pymorphy3.MorphAnalyzer() if pymorphy3 else None
+        self._lemmas = {}
+        self.examples = []
+        if data_path:
+            self.load(data_path)
+
+    def _lemma(self, word: str) -> str:
+        """Возвращает нормальную форму слова (лемму или основу)."""
+        lemma = self._lemmas.get(word)
+        if lemma is None:
+            if self.morph:
+                lemma = self.morph.parse(word)[0].normal_form.replace("ё", "е")
+            else:
+                lemma = word
+                for ending in ENDINGS:
+                    if word.endswith(ending) and len(word) - len(ending) >= 3:
+                        lemma = word[:-len(ending)]
+                        break
+            self._lemmas[word] = lemma
+        return lemma
+
+    def tokenize(self, text: str):
+        """
+        Нормализует текст и приводит слова к нормальной форме.
+
+        Args:
+            text (str): Исходный текст.
+
+        Returns:
+            List[str]: Список нормализованных слов.
+        """
+        return [self._lemma(word) for word in normalize_text(text).split()]
+
+    def _vectorize(self, tokens):
+        """Строит нормированный вектор символьных n-грамм."""
+        counts = Counter()
+        for token in tokens:
+            padded = f" {token} "
+            for i in range(max(len(padded) - self.ngram + 1, 1)):
+                counts[padded[i:i + self.ngram]] += 1
+        norm = math.sqrt(sum(v * v for v in counts.values())) or 1.0
+        return {gram: v / norm for gram, v in counts.items()}
+
+    def _similarities(self, tokens) -> dict:
+        """Максимальное косинусное сходство вопроса с обучающими вопросами каждой категории."""
+        result = {}
+        if not tokens:
+            return result
+        vector = self._vectorize(tokens)
+        for example, categories in self.examples:
+            similarity = sum(weight * example.get(gram, 0.0) for gram, weight in vector.items())
+            for category in categories:
+                if similarity > result.get(category, 0.0):
+                    result[category] = similarity
+        return result
+
+    def load(self, data_path: str):
+        """
+        Обучает модель n-грамм на размеченном файле вопросов.
+
+        Args:
+            data_path (str): Путь к JSON-файлу с размеченными вопросами.
+        """
+        try:
+            with open(data_path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except Exception as e:
+            print(f"Ошибка загрузки обучающих вопросов из {data_path}: {e}")
+            return
+        self.examples = [
+            (self._vectorize(self.tokenize(item["question"])), set(item["categories"]))
+            for item in data
+        ]
+
+    def scores(self, question: str) -> dict:
+        """
+        Вычисляет уверенность для каждой категории.
+
+        Args:
+            question (str): Вопрос пользователя.
+
+        Returns:
+            Dict[str, float]: Уверенность от 0 до 1 для каждой категории.
+
+        Описание логики:
+        - Для ключевых слов уверенность растет с числом совпадений: 1 - 0.3^n, где совпадение
+          со слабой основой (WEAK_KEYWORDS) считается за половину.
+        - Если совпадение одно, уверенность ограничивается SINGLE_KEYWORD_SCORE, пока модель
+          n-грамм не подтвердит категорию по остальным словам вопроса (NGRAM_AGREEMENT).
+        - Для модели n-грамм берется максимальное косинусное сходство с вопросами категории.
+        - Итоговая уверенность — максимум из двух оценок.
+        """
+        tokens = self.tokenize(question)
+        result = {}
+        for category in CATEGORIES:
+            hits = 0.0
+            matched_tokens = set()
+            for token in tokens:
+                matched = [kw for kw in KEYWORDS[category] if token.startswith(kw)]
+                if matched:
+                    strong = any(kw not in WEAK_KEYWORDS for kw in matched)
+                    hits += 1.0 if strong else WEAK_KEYWORD_WEIGHT
+                    matched_tokens.add(token)
+            score = 1 - 0.3 ** hits if hits else 0.0
+            if 0 < hits <= 1 and score > SINGLE_KEYWORD_SCORE:
+                context = [token for token in tokens if token not in matched_tokens]
+                if self._similarities(context).get(category, 0.0) < NGRAM_AGREEMENT:
+                    score = SINGLE_KEYWORD_SCORE
+            result[category] = score
+
+        for category, similarity in self._similarities(tokens).items():
+            if similarity > result.get(category, 0.0):
+                result[category] = similarity
+        return result
+
+    def classify(self, question: str) -> dict:
+        """
+        Классифицирует вопрос пользователя.
+
+        Args:
+            question (str): Вопрос пользователя.
+
+        Returns:
+            Dict[str, float]: Категории с уверенностью не ниже порога.
+                              Пустой словарь означает, что вопрос нужно классифицировать через LLM.
+        """
+        return {
+            category: round(score, 3)
+            for category, score in self.scores(question).items()
+            if score >= self.threshold
+        }
@@ -0,0 +1,240 @@
+import asyncio
+import random
+import time
+from typing import AsyncIterator, List
+
+from base_llm_adapter import *
+from config import CONFIG
+
+# HTTP-статусы провайдера, которые считаются временными ошибками
+TRANSIENT_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+class LLMUnavailableError(Exception):
+    """Модель недоступна: все попытки исчерпаны или цепь разомкнута."""
+
+
+class CircuitOpenError(LLMUnavailableError):
+    """Цепь разомкнута: вызовы модели временно не выполняются."""
+
+
+def is_transient(exc: Exception) -> bool:
+    """
+    Проверяет, является ли ошибка временной (таймаут, сбой соединения, 429 или 5xx).
+
+    Args:
+        exc (Exception): Исключение, возникшее при вызове модели.
+
+    Returns:
+        bool: True, если вызов имеет смысл повторить.
+    """
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    try:
+        import httpx
+        if isinstance(exc, httpx.TransportError):
+            return True
+    except ImportError:
+        pass
+    status = getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+    if status is None and len(getattr(exc, "args", ())) > 1 and isinstance(exc.args[1], int):
+        status = exc.args[1]  # gigachat.exceptions.ResponseError(url, status_code, ...)
+    return status in TRANSIENT_STATUSES
+
+
+class CircuitBreaker:
+    """
+    Класс CircuitBreaker размыкает цепь после серии подряд идущих сбоев и на время
+    перестает пропускать вызовы. По истечении паузы пропускается один пробный вызов:
+    при успехе цепь замыкается, при сбое снова размыкается.
+
+    Attributes:
+        failure_threshold (int): Число подряд идущих сбоев, после которого цепь размыкается.
+        reset_timeout (float): Пауза в секундах до пробного вызова.
+        failures (int): Текущее число подряд идущих сбоев.
+        opened_at (float | None): Время размыкания цепи.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        """
+        Инициализирует экземпляр класса CircuitBreaker.
+
+        Args:
+            failure_threshold (int): Число подряд идущих сбоев до размыкания цепи.
+            reset_timeout (float): Пауза в секундах до пробного вызова.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_at = None  # Время начала пробного вызова
+
+    @property
+    def state(self) -> str:
+        """Текущее состояние цепи: "closed", "open" или "half_open"."""
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def _trial_running(self) -> bool:
+        """True, если пробный вызов уже выполняется (зависший пробный вызов забывается через паузу)."""
+        return self._trial_at is not None and time.monotonic() - self._trial_at < self.reset_timeout
+
+    @property
+    def is_open(self) -> bool:
+        """True, если вызовы сейчас не пропускаются."""
+        state = self.state
+        return state == "open" or (state == "half_open" and self._trial_running())
+
+    def check(self):
+        """
+        Проверяет, можно ли выполнить вызов.
+
+        Raises:
+            CircuitOpenError: Если цепь разомкнута или пробный вызов уже выполняется.
+        """
+        if self.is_open:
+            raise CircuitOpenError("Модель временно недоступна")
+        if self.state == "half_open":
+            self._trial_at = time.monotonic()
+
+    def record_success(self):
+        """Отмечает успешный вызов и замыкает цепь."""
+        self.failures = 0
+        self.opened_at = None
+        self._trial_at = None
+
+    def release(self):
+        """
+        Отмечает вызов, ошибка которого не говорит о доступности провайдера (например, неверный
+        запрос): состояние цепи не меняется, пробный вызов освобождается для следующего запроса.
+        """
+        self._trial_at = None
+
+    def record_failure(self):
+        """Отмечает сбой; после `failure_threshold` сбоев подряд цепь размыкается."""
+        self.failures += 1
+        if self._trial_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self._trial_at = None
+
+
+class ResilientAdapter(BaseLLMAdapter):
+    """
+    Класс ResilientAdapter представляет собой обертку над адаптером языковой модели, которая
+    ограничивает время каждого вызова, повторяет вызовы при временных ошибках с экспоненциальной
+    задержкой и случайным разбросом и размыкает цепь при серии сбоев. Все попытки вместе с
+    задержками укладываются в общий срок `deadline`, чтобы клиент получил справочный ответ
+    раньше, чем истечет его собственный таймаут.
+
+    Attributes:
+        adapter (BaseLLMAdapter): Оборачиваемый адаптер.
+        system_prompt (str): Системный промпт оборачиваемого адаптера.
+        timeout (float): Предельное время одного вызова в секундах.
+        deadline (float): Предельное время всех попыток вместе с задержками в секундах.
+        retries (int): Число повторов при временных ошибках.
+        base_delay (float): Базовая задержка перед повтором в секундах.
+        max_delay (float): Максимальная задержка перед повтором в секундах.
+        breaker (CircuitBreaker): Автомат размыкания цепи.
+    """
+
+    def __init__(self, adapter: BaseLLMAdapter, timeout: float = None, retries: int = None,
+                 base_delay: float = None, max_delay: float = None, breaker: CircuitBreaker = None,
+                 deadline: float = None, **kwargs):
+        """
+        Инициализирует экземпляр класса ResilientAdapter. Не указанные параметры берутся из `CONFIG`.
+
+        Args:
+            adapter (BaseLLMAdapter): Оборачиваемый адаптер.
+            timeout (float, optional): Предельное время одного вызова в секундах.
+            retries (int, optional): Число повторов при временных ошибках.
+            base_delay (float, optional): Базовая задержка перед повтором в секундах.
+            max_delay (float, optional): Максимальная задержка перед повтором в секундах.
+            breaker (CircuitBreaker, optional): Автомат размыкания цепи.
+            deadline (float, optional): Предельное время всех попыток вместе с задержками в секундах.
+        """
+        self.adapter = adapter
+        self.system_prompt = adapter.system_prompt
+        self.timeout = timeout if timeout is not None else CONFIG.get("llm_timeout", 20)
+        self.deadline = deadline if deadline is not None else CONFIG.get("llm_deadline", 25)
+        self.retries = retries if retries is not None else CONFIG.get("llm_retries", 2)
+        self.base_delay = base_delay if base_delay is not None else CONFIG.get("llm_retry_base_delay", 0.5)
+        self.max_delay = max_delay if max_delay is not None else CONFIG.get("llm_retry_max_delay", 5)
+        self.breaker = breaker or CircuitBreaker(
+            failure_threshold=CONFIG.get("breaker_failure_threshold", 5),
+            reset_timeout=CONFIG.get("breaker_reset_timeout", 30)
+        )
+
+    def _delay(self, attempt: int) -> float:
+        """Задержка перед повтором: экспоненциальная, со случайным разбросом (full jitter)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def get_response(self, messages: List[BaseMessage], context: dict = None, **kwargs) -> str:
+        """
+        Асинхронно получает ответ модели с ограничением времени, повторами и размыканием цепи.
+
+        Args:
+            messages (List[BaseMessage]): Список сообщений, которые будут отправлены модели.
+            context (dict, optional): Словарь с контекстными данными.
+            **kwargs: Дополнительные параметры для вызова модели.
+
+        Returns:
+            str: Текст ответа, сгенерированный моделью.
+
+        Raises:
+            CircuitOpenError: Если цепь разомкнута.
+            LLMUnavailableError: Если все попытки завершились временными ошибками или истек
+                                 общий срок `deadline`.
+        """
+        deadline = time.monotonic() + self.deadline
+        for attempt in range(self.retries + 1):
+            self.breaker.check()
+            try:
+                # Попытка ограничена и своим таймаутом, и остатком общего срока
+                async with asyncio.timeout(min(self.timeout, deadline - time.monotonic())):
+                    response = await self.adapter.get_response(messages, context=context, **kwargs)
+            except Exception as e:
+                if not is_transient(e):
+                    # Сбой не связан с доступностью провайдера: не замыкает и не размыкает цепь
+                    self.breaker.release()
+                    raise
+                self.breaker.record_failure()
+                delay = self._delay(attempt)
+                if attempt >= self.retries or time.monotonic() + delay >= deadline:
+                    raise LLMUnavailableError(f"Модель недоступна: {e!r}") from e
+                await asyncio.sleep(delay)
+            else:
+                self.breaker.record_success()
+                return response
+
+    async def stream_response(self, messages: List[BaseMessage], context: dict = None, **kwargs) -> AsyncIterator[str]:
+        """
+        Потоковый ответ модели с ограничением времени ожидания каждого фрагмента.
+        Поток не повторяется, но сбои учитываются автоматом размыкания цепи.
+
+        Raises:
+            CircuitOpenError: Если цепь разомкнута.
+            LLMUnavailableError: Если поток прервался временной ошибкой.
+        """
+        self.breaker.check()
+        iterator = self.adapter.stream_response(messages, context=context, **kwargs).__aiter__()
+        while True:
+            try:
+                async with asyncio.timeout(self.timeout):
+                    chunk = await iterator.__anext__()
+            except StopAsyncIteration:
+                break
+            except Exception as e:
+                if not is_transient(e):
+                    self.breaker.release()
+                    raise
+                self.breaker.record_failure()
+                raise LLMUnavailableError(f"Модель недоступна: {e!r}") from e
+            yield chunk
+        self.breaker.record_success()
+
+    def format_message(self, text: str, is_user: bool) -> BaseMessage:
+        """Форматирует сообщение средствами оборачиваемого адаптера."""
+        return self.adapter.format_message(text, is_user)
@@ -0,0 +1,111 @@
+import asyncio
+import hashlib
+import json
+from typing import AsyncIterator, List
+
+from base_llm_adapter import *
+from config import CONFIG
+from prompt_builder import prompt_stats
+
+
+class SingleFlightAdapter(BaseLLMAdapter):
+    """
+    Класс SingleFlightAdapter представляет собой обертку над адаптером языковой модели,
+    которая объединяет одинаковые одновременные запросы в один вызов модели и ограничивает
+    общее число одновременных вызовов.
+
+    Лишние вызовы ждут свободного слота asyncio.Semaphore, поэтому нагрузка на провайдера
+    не превышает лимит. Порядок, в котором ожидающие получают слоты, не гарантируется.
+
+    Attributes:
+        adapter (BaseLLMAdapter): Оборачиваемый адаптер.
+        system_prompt (str): Системный промпт оборачиваемого адаптера.
+        max_concurrency (int): Максимальное число одновременных вызовов модели.
+        in_flight (Dict[str, asyncio.Task]): Выполняющиеся вызовы по ключу запроса.
+        coalesced (int): Число запросов, получивших результат чужого вызова.
+    """
+
+    def __init__(self, adapter: BaseLLMAdapter, max_concurrency: int = None, **kwargs):
+        """
+        Инициализирует экземпляр класса SingleFlightAdapter.
+
+        Args:
+            adapter (BaseLLMAdapter): Оборачиваемый адаптер.
+            max_concurrency (int, optional): Максимальное число одновременных вызовов модели.
+                                             По умолчанию берется из `CONFIG["llm_max_concurrency"]`.
+        """
+        self.adapter = adapter
+        self.system_prompt = adapter.system_prompt
+        self.max_concurrency = max_concurrency if max_concurrency is not None else CONFIG.get("llm_max_concurrency", 8)
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.in_flight = {}
+        self.coalesced = 0
+
+    @staticmethod
+    def _key(messages: List[BaseMessage], context: dict, kwargs: dict) -> str:
+        """Строит ключ запроса по сообщениям, контексту и параметрам генерации."""
+        payload = json.dumps(
+            [[(type(msg).__name__, msg.content) for msg in messages], context, kwargs],
+            ensure_ascii=False, sort_keys=True, default=str
+        )
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    async def _call(self, messages: List[BaseMessage], context: dict, kwargs: dict):
+        """Вызывает оборачиваемый адаптер в пределах лимита одновременных вызовов."""
+        async with self.semaphore:
+            response = await self.adapter.get_response(messages, context=context, **kwargs)
+        return response, prompt_stats.get()
+
+    async def get_response(self, messages: List[BaseMessage], context: dict = None, **kwargs) -> str:
+        """
+        Асинхронно получает ответ модели, объединяя одинаковые одновременные запросы.
+
+        Args:
+            messages (List[BaseMessage]): Список сообщений, которые будут отправлены модели.
+            context (dict, optional): Словарь с контекстными данными.
+            **kwargs: Дополнительные параметры для вызова модели.
+
+        Returns:
+            str: Текст ответа, сгенерированный моделью.
+
+        Описание логики:
+        - Если такой же запрос уже выполняется, вызывающий ждет его результата.
+        - Иначе запускается новый вызов, который занимает слот семафора.
+        - Отмена одного из ожидающих не отменяет общий вызов для остальных.
+        """
+        key = self._key(messages, context, kwargs)
+        task = self.in_flight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._call(messages, context, kwargs))
+            self.in_flight[key] = task
+            task.add_done_callback(lambda _: self.in_flight.pop(key, None))
+        else:
+            self.coalesced += 1
+        response, stats = await asyncio.shield(task)
+        prompt_stats.set(stats)
+        return response
+
+    async def stream_response(self, messages: List[BaseMessage], context: dict = None, **kwargs) -> AsyncIterator[str]:
+        """
+        Потоковый ответ модели. Потоки не объединяются, но занимают слот семафора на все время генерации.
+        """
+        async with self.semaphore:
+            async for chunk in self.adapter.stream_response(messages, context=context, **kwargs):
+                yield chunk
+
+    def format_message(self, text: str, is_user: bool) -> BaseMessage:
+        """Форматирует сообщение средствами оборачиваемого адаптера."""
+        return self.adapter.format_message(text, is_user)
+
+    def stats(self) -> dict:
+        """
+        Возвращает текущую загрузку модели.
+
+        Returns:
+            Dict[str, int]: Число выполняющихся вызовов, лимит и число объединенных запросов.
+        """
+        return {
+            "in_flight": len(self.in_flight),
+            "max_concurrency": self.max_concurrency,
+            "coalesced": self.coalesced,
+        }
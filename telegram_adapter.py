@@ -1,8 +1,18 @@
+import asyncio
+import re
+import time
+
 from telegram import Update, ReplyKeyboardMarkup
-import requests
+from telegram.constants import ChatAction, MessageLimit
+from telegram.error import BadRequest
 from telegram.ext import Application, CommandHandler, MessageHandler, filters
 from telegram import Update
 from telegram.ext import ContextTypes
+from api_client import ApiClient
+from config import CONFIG, HELP_TEXT
+
+# Сообщение, дописываемое к ответу, если поток оборвался после начала ответа
+STREAM_INTERRUPTED_TEXT = "Извините, ответ прерван из-за ошибки. Попробуйте задать вопрос еще раз."
 
 
 def get_persistent_menu():
@@ -24,36 +34,91 @@ def get_persistent_menu():
     )
 
 
+def split_message(text: str, limit: int = MessageLimit.MAX_TEXT_LENGTH):
+    """
+    Делит текст, не помещающийся в одно сообщение Telegram.
+
+    Args:
+        text (str): Текст ответа.
+        limit (int): Максимальная длина сообщения.
+
+    Returns:
+        Tuple[str, str]: Начало текста не длиннее `limit` (по возможности до последнего перевода
+                         строки или пробела) и остаток для следующего сообщения.
+    """
+    if len(text) <= limit:
+        return text, ""
+    cut = max(text.rfind("\n", 0, limit), text.rfind(" ", 0, limit))
+    if cut <= 0:
+        cut = limit
+    return text[:cut], text[cut:].lstrip()
+
+
+async def edit_message(message, text: str):
+    """Изменяет текст сообщения; ответ Telegram "message is not modified" не считается ошибкой."""
+    try:
+        await message.edit_text(text)
+    except BadRequest as e:
+        if "not modified" not in str(e).lower():
+            raise
+
+
 class TelegramAdapter():
     """
     Класс TelegramAdapter представляет собой адаптер для взаимодействия Telegram-бота с внешним API.
     Он обрабатывает команды и сообщения от пользователей, отправляет запросы к API и возвращает ответы.
 
+    Если передан экземпляр MedicBotCore, адаптер вызывает его напрямую в том же процессе
+    и цикле событий, без HTTP-запросов к API.
+
     Attributes:
         token (str): Токен Telegram-бота, используемый для авторизации.
         api_url (str): URL внешнего API, к которому отправляются запросы.
+        api_client (ApiClient | None): Асинхронный HTTP-клиент с пулом соединений для запросов к API.
+        bot_core (MedicBotCore | None): Ядро бота для вызова в том же процессе.
         application: Экземпляр приложения Telegram для обработки событий.
+        update_queue (asyncio.Queue | None): Ограниченная очередь обновлений в режиме webhook.
     """
 
-    def __init__(self, token: str, api_url: str):
+    def __init__(self, token: str, api_url: str = None, bot_core=None):
         """
         Инициализирует экземпляр класса TelegramAdapter.
 
         Args:
             token (str): Токен Telegram-бота.
-            api_url (str): URL внешнего API.
+            api_url (str, optional): URL внешнего API. Используется, если не передан `bot_core`.
+            bot_core (MedicBotCore, optional): Ядро бота для вызова в том же процессе.
         """
+        if api_url is None and bot_core is None:
+            raise ValueError("Нужно указать api_url или bot_core")
         self.token = token
         self.api_url = api_url  # Сохраняем URL API
-        self.application = Application.builder().token(token).build()
+        self.bot_core = bot_core
+        self.api_client = ApiClient(api_url) if bot_core is None else None
+        # Обновления разных пользователей обрабатываются параллельно
+        builder = Application.builder().token(token).concurrent_updates(True).post_shutdown(self._shutdown)
+        if CONFIG.get("telegram_base_url"):
+            # Например, локальный фейковый сервер Telegram Bot API для тестов
+            builder = builder.base_url(CONFIG["telegram_base_url"])
+        self.application = builder.build()
+        self.update_queue = None
+        self._workers = []
+        # Кнопки постоянного меню обрабатываются напрямую, без обращения к LLM
+        self.menu_handlers = {
+            "Режим работы": self.show_schedule,
+            "Контакты": self.show_contacts,
+            "Помощь": self.show_help,
+            "График приема": self.show_schedule,
+        }
         self._setup_handlers()
 
     def _setup_handlers(self):
         """
         Настройка обработчиков команд и сообщений для Telegram-бота.
-        Добавляет обработчики для команды /start и текстовых сообщений.
+        Добавляет обработчики для команд /start, /help и текстовых сообщений.
         """
         self.application.add_handler(CommandHandler("start", self.start))
+        self.application.add_handler(CommandHandler("help", self.show_help))
         self.application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_message))
 
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -66,10 +131,179 @@ class TelegramAdapter():
         """
         await update.message.reply_text("Добро пожаловать!", reply_markup=get_persistent_menu())
 
+    async def show_help(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """
+        Обработчик кнопки "Помощь" и команды /help. Отправляет справку по боту.
+
+        Args:
+            update (Update): Объект, содержащий информацию о входящем обновлении (сообщении).
+            context (ContextTypes.DEFAULT_TYPE): Контекст выполнения обработчика.
+        """
+        await update.message.reply_text(HELP_TEXT, parse_mode="HTML", reply_markup=get_persistent_menu())
+
+    async def show_schedule(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """
+        Обработчик кнопок "Режим работы" и "График приема". Отправляет расписание
+        из кэшированных данных сайта без обращения к LLM.
+
+        Args:
+            update (Update): Объект, содержащий информацию о входящем обновлении (сообщении).
+            context (ContextTypes.DEFAULT_TYPE): Контекст выполнения обработчика.
+        """
+        await self._reply_info(update, "schedule")
+
+    async def show_contacts(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """
+        Обработчик кнопки "Контакты". Отправляет контакты из кэшированных данных сайта
+        без обращения к LLM.
+
+        Args:
+            update (Update): Объект, содержащий информацию о входящем обновлении (сообщении).
+            context (ContextTypes.DEFAULT_TYPE): Контекст выполнения обработчика.
+        """
+        await self._reply_info(update, "contacts")
+
+    async def _get_info(self, key: str) -> str:
+        """
+        Получает справочные данные (расписание или контакты) от ядра бота или от API.
+
+        Args:
+            key (str): Имя раздела данных ("schedule" или "contacts").
+
+        Returns:
+            str: Текст раздела данных.
+        """
+        if self.bot_core is not None:
+            return await getattr(self.bot_core, f"get_{key}")()
+        data = await self.api_client.get(f"/{key}")
+        return data[key]
+
+    async def _ask(self, question: str, session_id: str) -> str:
+        """
+        Получает ответ на вопрос от ядра бота или от API.
+
+        Args:
+            question (str): Вопрос пользователя.
+            session_id (str): Идентификатор сессии (чата).
+
+        Returns:
+            str: Ответ на вопрос.
+        """
+        if self.bot_core is not None:
+            return await self.bot_core.get_answer(question, session_id=session_id)
+        data = await self.api_client.post("/qa", json={"question": question, "session_id": session_id})
+        return data["answer"]
+
+    async def _ask_stream(self, question: str, session_id: str):
+        """
+        Получает ответ на вопрос по частям от ядра бота или от потокового маршрута API.
+
+        Args:
+            question (str): Вопрос пользователя.
+            session_id (str): Идентификатор сессии (чата).
+
+        Yields:
+            str: Очередной фрагмент ответа.
+        """
+        if self.bot_core is not None:
+            async for chunk in self.bot_core.stream_answer(question, session_id=session_id):
+                yield chunk
+            return
+        async for event, data in self.api_client.stream_events(
+                "/qa/stream", json={"question": question, "session_id": session_id}):
+            if event == "error":
+                raise RuntimeError(data["error"])
+            if event == "message":
+                yield data["delta"]
+
+    async def _keep_typing(self, update: Update):
+        """Показывает индикатор набора текста, пока не появится первый фрагмент ответа."""
+        while True:
+            await update.effective_chat.send_action(ChatAction.TYPING)
+            await asyncio.sleep(4)  # Индикатор в Telegram гаснет примерно через 5 секунд
+
+    async def _reply_streaming(self, update: Update, question: str):
+        """
+        Отправляет ответ по мере генерации: показывает индикатор набора, затем отправляет
+        первый фрагмент и дописывает сообщение не чаще одного раза в `telegram_edit_interval` секунд.
+        Ответ длиннее лимита Telegram продолжается в следующем сообщении. Если поток обрывается
+        после начала ответа, к ответу дописывается уведомление об ошибке.
+
+        Args:
+            update (Update): Объект, содержащий информацию о входящем обновлении (сообщении).
+            question (str): Вопрос пользователя.
+        """
+        interval = CONFIG.get("telegram_edit_interval", 1.0)
+        limit = MessageLimit.MAX_TEXT_LENGTH
+        typing = asyncio.create_task(self._keep_typing(update))
+        message = None  # Сообщение, которое сейчас дописывается
+        answered = False
+        text = sent_text = ""
+        last_edit = 0.0
+        try:
+            async for chunk in self._ask_stream(question, str(update.effective_chat.id)):
+                text += chunk
+                # Заполненное сообщение закрывается, остаток ответа уходит в новое
+                while len(text) > limit:
+                    head, text = split_message(text, limit)
+                    if message is None:
+                        typing.cancel()
+                        await update.message.reply_text(head, reply_markup=get_persistent_menu())
+                    else:
+                        await edit_message(message, head)
+                    message, sent_text, answered = None, "", True
+                if not text.strip():
+                    continue
+                now = time.monotonic()
+                if message is None:
+                    typing.cancel()
+                    message = await update.message.reply_text(text, reply_markup=get_persistent_menu())
+                    sent_text, last_edit, answered = text, now, True
+                elif now - last_edit >= interval and text != sent_text:
+                    await edit_message(message, text)
+                    sent_text, last_edit = text, now
+            if message is not None and text != sent_text:
+                await edit_message(message, text)
+        except Exception as e:
+            print(f"Ошибка обработки вопроса: {e}")
+            try:
+                if not answered:
+                    await update.message.reply_text("Извините, произошла ошибка при обработке вашего запроса.",
+                                                    reply_markup=get_persistent_menu())
+                elif message is not None and len(text) + len(STREAM_INTERRUPTED_TEXT) + 2 <= limit:
+                    await edit_message(message, f"{text}\n\n{STREAM_INTERRUPTED_TEXT}")
+                else:
+                    await update.message.reply_text(STREAM_INTERRUPTED_TEXT, reply_markup=get_persistent_menu())
+            except Exception as e:
+                print(f"Ошибка отправки уведомления об ошибке: {e}")
+        finally:
+            typing.cancel()
+
+    async def _reply_info(self, update: Update, key: str):
+        """
+        Получает справочные данные (расписание или контакты) и отправляет их пользователю.
+
+        Args:
+            update (Update): Объект, содержащий информацию о входящем обновлении (сообщении).
+            key (str): Имя раздела данных ("schedule" или "contacts").
+        """
+        try:
+            answer = await self._get_info(key)
+        except Exception as e:
+            print(f"Ошибка получения данных {key}: {e}")
+            answer = "Извините, произошла ошибка при обработке вашего запроса."
+
+        try:
+            await update.message.reply_text(answer, parse_mode="HTML", reply_markup=get_persistent_menu())
+        except BadRequest as e:
+            # Разметка не разобрана (например, данные получены от старой версии API): отправляем текстом
+            print(f"Ошибка разметки {key}: {e}")
+            await update.message.reply_text(re.sub(r"<[^>]+>", "", answer), reply_markup=get_persistent_menu())
+
     async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """
-        Обработчик текстовых сообщений от пользователей. Отправляет запрос к внешнему API
-        с текстом сообщения и возвращает ответ пользователю.
+        Обработчик текстовых сообщений от пользователей. Кнопки меню обрабатываются напрямую,
+        остальные сообщения отправляются в ядро бота или во внешний API, и ответ возвращается пользователю.
 
         Args:
             update (Update): Объект, содержащий информацию о входящем обновлении (сообщении).
@@ -77,24 +311,113 @@ class TelegramAdapter():
         """
         user_input = update.message.text
 
-        # Отправляем запрос к API
+        menu_handler = self.menu_handlers.get(user_input)
+        if menu_handler:
+            await menu_handler(update, context)
+            return
+
+        if CONFIG.get("telegram_streaming", True):
+            await self._reply_streaming(update, user_input)
+            return
+
+        # Получаем ответ от ядра бота или API
         try:
-            response = requests.post(
-                f"{self.api_url}/qa",
-                json={"question": user_input},
-                headers={"Content-Type": "application/json"}
-            )
-            response.raise_for_status()  # Проверяем статус ответа
-            data = response.json()
-            answer = data["answer"]
-        except requests.exceptions.RequestException as e:
+            answer = await self._ask(user_input, str(update.effective_chat.id))
+        except Exception as e:
+            print(f"Ошибка обработки вопроса: {e}")
             answer = "Извините, произошла ошибка при обработке вашего запроса."
 
         await update.message.reply_text(answer, reply_markup=get_persistent_menu())
 
+    async def _shutdown(self, application: Application):
+        """
+        Вызывается при остановке приложения Telegram. Закрывает пул соединений к API.
+
+        Args:
+            application (Application): Экземпляр приложения Telegram.
+        """
+        if self.api_client is not None:
+            await self.api_client.close()
+
     def run(self):
         """
         Запускает бота в режиме опроса (polling).
         Бот начинает получать обновления от Telegram и обрабатывать их.
         """
-        self.application.run_polling()
\ No newline at end of file
+        self.application.run_polling()
+
+    async def start_polling(self):
+        """
+        Запускает опрос Telegram в уже работающем цикле событий,
+        например рядом с сервером FastAPI в одном процессе.
+        """
+        await self.application.initialize()
+        await self.application.start()
+        await self.application.updater.start_polling()
+
+    async def start_webhook(self, webhook_url: str = None, workers: int = None, queue_size: int = None,
+                            secret_token: str = None):
+        """
+        Запускает режим webhook: обновления принимаются маршрутом приложения FastAPI,
+        складываются в ограниченную очередь и обрабатываются пулом асинхронных обработчиков.
+
+        Args:
+            webhook_url (str, optional): Публичный URL маршрута webhook. Если не указан,
+                                         webhook в Telegram не регистрируется.
+            workers (int, optional): Число обработчиков очереди.
+            queue_size (int, optional): Максимальный размер очереди обновлений.
+            secret_token (str, optional): Секрет, который Telegram передает в заголовке запроса.
+        """
+        workers = workers if workers is not None else CONFIG.get("webhook_workers", 8)
+        queue_size = queue_size if queue_size is not None else CONFIG.get("webhook_queue_size", 1000)
+        await self.application.initialize()
+        await self.application.start()
+        if webhook_url:
+            await self.application.bot.set_webhook(webhook_url, secret_token=secret_token or None)
+        self.update_queue = asyncio.Queue(maxsize=queue_size)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(workers)]
+
+    def enqueue_update(self, data: dict) -> bool:
+        """
+        Помещает обновление от Telegram в очередь, не дожидаясь его обработки.
+
+        Args:
+            data (dict): JSON-тело запроса webhook.
+
+        Returns:
+            bool: True, если обновление принято; False, если очередь переполнена.
+        """
+        update = Update.de_json(data, self.application.bot)
+        try:
+            self.update_queue.put_nowait(update)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def _worker(self):
+        """Обработчик очереди обновлений в режиме webhook."""
+        while True:
+            update = await self.update_queue.get()
+            try:
+                await self.application.process_update(update)
+            except Exception as e:
+                print(f"Ошибка обработки обновления Telegram: {e}")
+            finally:
+                self.update_queue.task_done()
+
+    async def stop_webhook(self):
+        """Останавливает обработчики очереди и приложение Telegram, запущенные через `start_webhook`."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        await self.application.stop()
+        await self.application.shutdown()
+        await self._shutdown(self.application)
+
+    async def stop(self):
+        """Останавливает опрос, запущенный через `start_polling`, и освобождает ресурсы."""
+        await self.application.updater.stop()
+        await self.application.stop()
+        await self.application.shutdown()
+        await self._shutdown(self.application)
\ No newline at end of file
@@ -0,0 +1,82 @@
+"""
+Пакетные ответы MedicBotCore.answer_batch: если клиент перестал читать поток,
+оставшиеся вопросы не отправляются в LLM.
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from medic_bot import MedicBotCore  # noqa: E402
+
+
+class SlowLLMService:
+    """Сервис модели, отвечающий с задержкой и считающий начатые и завершенные вызовы."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.started = 0
+        self.finished = 0
+
+    def has_history(self, session_id):
+        return False
+
+    def remember(self, session_id, question, answer):
+        pass
+
+    async def get_answer(self, question, context=None, session_id=None, **kwargs):
+        self.started += 1
+        await asyncio.sleep(self.delay)
+        self.finished += 1
+        return f"Ответ: {question}"
+
+
+def make_bot(llm):
+    bot = MedicBotCore(llm)
+
+    async def get_snapshot():
+        return {}
+
+    async def classify_question(question):
+        return {"Расписание": 1.0}
+
+    async def context_for(categories, snapshot):
+        return ""
+
+    bot.data_processor.get_snapshot = get_snapshot
+    bot.classify_question = classify_question
+    bot.context_for = context_for
+    return bot
+
+
+def test_batch_answers_every_question():
+    llm = SlowLLMService(0.01)
+    bot = make_bot(llm)
+    items = [{"question": f"Вопрос {i}"} for i in range(5)]
+
+    async def run():
+        return [result async for result in bot.answer_batch(items, concurrency=2)]
+
+    results = asyncio.run(run())
+    assert sorted(result["index"] for result in results) == list(range(5))
+    assert all(result["answer"] == f"Ответ: Вопрос {result['index']}" for result in results)
+
+
+def test_closing_stream_cancels_remaining_questions():
+    llm = SlowLLMService(0.05)
+    bot = make_bot(llm)
+    items = [{"question": f"Вопрос {i}"} for i in range(10)]
+
+    async def run():
+        stream = bot.answer_batch(items, concurrency=1)
+        first = await stream.__anext__()
+        await stream.aclose()
+        started = llm.started
+        await asyncio.sleep(0.2)
+        return first, started
+
+    first, started = asyncio.run(run())
+    assert first["answer"] is not None
+    assert llm.started == started <= 2
+    assert llm.finished == 1
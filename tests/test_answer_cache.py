@@ -0,0 +1,56 @@
+"""Кэш ответов на похожие вопросы: перефразирования совпадают, вопросы с другой датой, днем или фамилией — нет."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from answer_cache import AnswerCache  # noqa: E402
+
+VERSION = "v1"
+
+
+@pytest.fixture
+def cache():
+    cache = AnswerCache(maxsize=16, threshold=0.9)
+    cache.get("", VERSION)  # Как в MedicBotCore: поиск перед записью фиксирует текущую версию
+    return cache
+
+
+@pytest.mark.parametrize("cached, asked", [
+    ("Работает ли диагностическая поликлиника 1 мая в праздничный день?",
+     "Работает ли диагностическая поликлиника 9 мая в праздничный день?"),
+    ("Работает ли поликлиника в пятницу?", "Работает ли поликлиника в субботу?"),
+    ("Когда принимает врач Иванов?", "Когда принимает врач Петров?"),
+    ("Можно ли сдать анализ крови до 10 часов?", "Можно ли сдать анализ крови до 11 часов?"),
+    ("Где кабинет 12?", "Где кабинет 21?"),
+    ("Как записаться к терапевту?", "Как записаться к хирургу?"),
+])
+def test_near_miss_questions_do_not_share_answers(cache, cached, asked):
+    cache.set(cached, "ответ", VERSION)
+    assert cache.get(asked, VERSION) is None
+
+
+@pytest.mark.parametrize("cached, asked", [
+    ("Как записаться к врачу?", "как записаться к врачу"),
+    ("Как записаться к врачу?", "Подскажите, пожалуйста, как записаться к врачу?"),
+    ("Как записаться к врачу?", "Как мне записаться к врачу?"),
+])
+def test_paraphrases_share_answers(cache, cached, asked):
+    cache.set(cached, "ответ", VERSION)
+    assert cache.get(asked, VERSION) == "ответ"
+
+
+def test_version_change_clears_cache(cache):
+    cache.set("Как записаться к врачу?", "ответ", VERSION)
+    assert cache.get("Как записаться к врачу?", "v2") is None
+    assert cache.stats()["size"] == 0
+    # Ответ, построенный на старых данных, не сохраняется после смены версии
+    cache.set("Как записаться к врачу?", "старый ответ", VERSION)
+    assert cache.get("Как записаться к врачу?", "v2") is None
+
+
+def test_short_questions_need_higher_similarity(cache):
+    assert cache.min_similarity(("записаться", "врачу")) > cache.min_similarity(tuple("abcdef"))
+    assert cache.min_similarity(tuple("abcdef")) == pytest.approx(0.9)
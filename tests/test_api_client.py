@@ -0,0 +1,81 @@
+"""
+Повторы запросов ApiClient: POST повторяется, только если соединение не установлено,
+GET — и при обрыве соединения после отправки запроса.
+"""
+import asyncio
+import os
+import socket
+import sys
+
+import aiohttp
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api_client import ApiClient  # noqa: E402
+
+
+async def start_dropping_server():
+    """Сервер, который читает запрос и закрывает соединение без ответа."""
+    requests = []
+
+    async def handle(reader, writer):
+        requests.append(await reader.readuntil(b"\r\n\r\n"))
+        writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}", requests
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def disconnected_requests(method):
+    async def run():
+        server, url, requests = await start_dropping_server()
+        client = ApiClient(url, retries=2, backoff=0.01)
+        try:
+            with pytest.raises(aiohttp.ServerDisconnectedError):
+                await client.request(method, "/qa", json={"question": "Режим работы"})
+        finally:
+            await client.close()
+            server.close()
+            await server.wait_closed()
+        return len(requests)
+
+    return asyncio.run(run())
+
+
+def test_post_is_not_retried_after_the_request_was_sent():
+    assert disconnected_requests("POST") == 1
+
+
+def test_get_is_retried_after_disconnect():
+    # aiohttp сам повторяет идемпотентный запрос на оборванном соединении, поэтому попыток не меньше retries + 1
+    assert disconnected_requests("GET") >= 3
+
+
+def test_post_is_retried_when_connection_is_refused():
+    port = free_port()
+    client = ApiClient(f"http://127.0.0.1:{port}", retries=2, backoff=0.01)
+    calls = []
+    request = client._get_session
+
+    def counting_session():
+        calls.append(1)
+        return request()
+
+    client._get_session = counting_session
+
+    async def run():
+        try:
+            with pytest.raises(aiohttp.ClientConnectorError):
+                await client.post("/qa", json={"question": "Режим работы"})
+        finally:
+            await client.close()
+
+    asyncio.run(run())
+    assert len(calls) == 3
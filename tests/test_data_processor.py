@@ -0,0 +1,98 @@
+"""
+Обновление снимка данных сайта (DataProcessor): после неудачной загрузки повтор
+откладывается, устаревший снимок продолжает отдаваться, а превышение `max_stale` пишется в лог.
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_processor  # noqa: E402
+from data_processor import DataProcessor  # noqa: E402
+
+SNAPSHOT = {"contacts": "8 (3022) 73-70-73", "schedule": "08:00 - 18:00", "results": "", "patient_reminder": {}}
+
+
+class Clock:
+    """Подменяемое монотонное время."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+class ScriptedWebsite:
+    """Скрапер сайта, отдающий заданные результаты по очереди и считающий загрузки."""
+
+    def __init__(self, results):
+        self.results = list(results)
+        self.calls = 0
+
+    async def fetch_data(self):
+        self.calls += 1
+        return self.results.pop(0)
+
+
+def make_processor(monkeypatch, results, **kwargs):
+    clock = Clock()
+    monkeypatch.setattr(data_processor, "time", clock)
+    processor = DataProcessor(ttl=600, retry_delay=30, max_stale=3600, **kwargs)
+    website = processor.scrapers["website"] = ScriptedWebsite(results)
+    return processor, website, clock
+
+
+async def settle(processor):
+    if processor._refresh_task is not None:
+        await processor._refresh_task
+
+
+def test_failed_first_load_backs_off(monkeypatch):
+    processor, website, clock = make_processor(monkeypatch, [[], [], [dict(SNAPSHOT)]])
+
+    async def run():
+        assert await processor.get_snapshot() is None
+        assert await processor.get_snapshot() is None  # пауза после неудачи: сайт не запрашивается
+        assert website.calls == 1
+        clock.now += 30
+        assert await processor.get_snapshot() is None
+        assert website.calls == 2
+        clock.now += 30  # после второй неудачи пауза удвоилась
+        assert await processor.get_snapshot() is None
+        assert website.calls == 2
+        clock.now += 30
+        assert await processor.get_snapshot() == SNAPSHOT
+        assert processor.failures == 0
+
+    asyncio.run(run())
+
+
+def test_stale_snapshot_is_served_and_reported(monkeypatch, capsys):
+    processor, website, clock = make_processor(monkeypatch, [[dict(SNAPSHOT)], [], []])
+
+    async def run():
+        assert await processor.get_snapshot() == SNAPSHOT
+        version = processor.version
+
+        clock.now += 600
+        assert await processor.get_snapshot() == SNAPSHOT  # устаревший снимок, обновление в фоне
+        await settle(processor)
+        assert processor.failures == 1
+        assert "Данные сайта не обновляются" not in capsys.readouterr().out
+
+        clock.now += 3600
+        assert await processor.get_snapshot() == SNAPSHOT
+        await settle(processor)
+        assert website.calls == 3
+        assert processor.version == version
+        assert "Данные сайта не обновляются (2 неудач подряд)" in capsys.readouterr().out
+
+    asyncio.run(run())
+
+
+def test_retry_delay_is_capped_by_ttl(monkeypatch):
+    processor, _, _ = make_processor(monkeypatch, [])
+    processor.failures = 10
+    assert processor._retry_after() == processor.ttl
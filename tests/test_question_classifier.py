@@ -0,0 +1,69 @@
+"""
+Локальный классификатор вопросов (question_classifier.py) на размеченном файле
+classifier_questions.json: вопрос, отнесенный к категории, должен относиться к ней на самом деле;
+остальные вопросы уходят в LLM.
+"""
+import json
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from question_classifier import QuestionClassifier  # noqa: E402
+
+DATA_PATH = os.path.join(ROOT, "classifier_questions.json")
+
+
+@pytest.fixture(scope="module")
+def data():
+    with open(DATA_PATH, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+@pytest.fixture(scope="module")
+def classifier():
+    return QuestionClassifier(DATA_PATH)
+
+
+def test_leave_one_out_accuracy(data):
+    classifier = QuestionClassifier()
+    vectors = [classifier._vectorize(classifier.tokenize(item["question"])) for item in data]
+    correct = wrong = 0
+    for i, item in enumerate(data):
+        classifier.examples = [(vectors[j], set(other["categories"]))
+                               for j, other in enumerate(data) if j != i]
+        result = classifier.classify(item["question"])
+        if not result:
+            continue  # Классифицирует LLM
+        if set(result) <= set(item["categories"]):
+            correct += 1
+        else:
+            wrong += 1
+    assert wrong == 0
+    assert correct >= 0.7 * len(data)
+
+
+@pytest.mark.parametrize("question", [
+    "Часть документов потерял",
+    "Потерял направление, что делать?",
+    "Готов ли мой паспорт?",
+    "Номер моего кабинета",
+    "Сайт не открывается",
+    "Кошка заболела",
+])
+def test_single_keyword_is_not_enough(classifier, question):
+    assert classifier.classify(question) == {}
+
+
+@pytest.mark.parametrize("question, category", [
+    ("Во сколько открывается поликлиника в субботу?", "Расписание"),
+    ("Какой телефон регистратуры?", "Контакты"),
+    ("Как сдать кровь на сахар?", "Анализы"),
+    ("Где взять полис?", "Памятка"),
+    ("Как с вами связаться?", "Контакты"),
+])
+def test_confident_questions_are_classified_locally(classifier, question, category):
+    assert category in classifier.classify(question)
@@ -0,0 +1,107 @@
+"""Автомат размыкания цепи, повторы с общим сроком и справочный ответ при недоступности модели."""
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from medic_bot import DEGRADED_HEADER, MedicBotCore  # noqa: E402
+from resilient_adapter import CircuitBreaker, CircuitOpenError, LLMUnavailableError, ResilientAdapter  # noqa: E402
+
+
+class TransientError(Exception):
+    status_code = 503
+
+
+class ScriptedAdapter:
+    """Адаптер модели, который по очереди выполняет заданные действия: текст ответа, исключение или пауза."""
+
+    system_prompt = ""
+
+    def __init__(self, *actions):
+        self.actions = list(actions)
+        self.calls = 0
+
+    async def get_response(self, messages, context=None, **kwargs):
+        self.calls += 1
+        action = self.actions.pop(0) if self.actions else "ok"
+        if isinstance(action, Exception):
+            raise action
+        if isinstance(action, (int, float)):
+            await asyncio.sleep(action)
+        return "ok"
+
+
+def adapter_with(*actions, **kwargs):
+    params = dict(timeout=1, retries=0, base_delay=0, max_delay=0, deadline=5,
+                  breaker=CircuitBreaker(failure_threshold=2, reset_timeout=0.05))
+    params.update(kwargs)
+    return ResilientAdapter(ScriptedAdapter(*actions), **params)
+
+
+def test_breaker_opens_after_consecutive_failures():
+    adapter = adapter_with(TransientError(), TransientError())
+    for _ in range(2):
+        with pytest.raises(LLMUnavailableError):
+            asyncio.run(adapter.get_response([]))
+    assert adapter.breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(adapter.get_response([]))
+    assert adapter.adapter.calls == 2
+
+
+def test_half_open_trial_closes_or_reopens():
+    adapter = adapter_with(TransientError(), TransientError(), TransientError(), "ok")
+    for _ in range(2):
+        with pytest.raises(LLMUnavailableError):
+            asyncio.run(adapter.get_response([]))
+    time.sleep(0.06)
+    assert adapter.breaker.state == "half_open"
+    # Неудачный пробный вызов снова размыкает цепь
+    with pytest.raises(LLMUnavailableError):
+        asyncio.run(adapter.get_response([]))
+    assert adapter.breaker.state == "open"
+    time.sleep(0.06)
+    assert asyncio.run(adapter.get_response([])) == "ok"
+    assert adapter.breaker.state == "closed"
+
+
+def test_non_transient_error_does_not_close_half_open_circuit():
+    adapter = adapter_with(TransientError(), TransientError(), ValueError("bad request"))
+    for _ in range(2):
+        with pytest.raises(LLMUnavailableError):
+            asyncio.run(adapter.get_response([]))
+    time.sleep(0.06)
+    with pytest.raises(ValueError):
+        asyncio.run(adapter.get_response([]))
+    assert adapter.breaker.state == "half_open"
+    assert adapter.breaker.failures == 2
+    # Пробный вызов освобожден: следующий запрос снова может попробовать
+    assert not adapter.breaker.is_open
+
+
+def test_retries_give_up_at_overall_deadline():
+    adapter = adapter_with(10, 10, 10, 10, timeout=0.2, retries=10, deadline=0.5,
+                           breaker=CircuitBreaker(failure_threshold=100, reset_timeout=1))
+    start = time.monotonic()
+    with pytest.raises(LLMUnavailableError):
+        asyncio.run(adapter.get_response([]))
+    assert time.monotonic() - start < 0.7
+    assert adapter.adapter.calls <= 3
+
+
+def test_degraded_answer_is_plain_text():
+    bot = MedicBotCore.__new__(MedicBotCore)
+    context = {
+        "schedule": "\n<b>Диагностическая поликлиника</b>\n• Пн &amp; Вт: 08:00 - 18:00",
+        "contacts": " <b>Единый центр:</b> 8 (3022) 73-70-73",
+        "reminder": {"Подготовка к сдаче крови": ["Кровь сдается натощак.", "Исключите алкоголь."]},
+    }
+    answer = asyncio.run(bot.degraded_answer(context))
+    assert answer.startswith(DEGRADED_HEADER)
+    assert "<b>" not in answer and "&amp;" not in answer and "{" not in answer
+    assert "Пн & Вт: 08:00 - 18:00" in answer
+    assert "Подготовка к сдаче крови:\n• Кровь сдается натощак.\n• Исключите алкоголь." in answer
@@ -0,0 +1,124 @@
+"""
+Потоковый ответ в Telegram (TelegramAdapter._reply_streaming): лимит длины сообщения,
+ответ Telegram "message is not modified" и обрыв потока после начала ответа.
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("telegram")
+
+from telegram.constants import MessageLimit  # noqa: E402
+from telegram.error import BadRequest  # noqa: E402
+
+from config import CONFIG  # noqa: E402
+from telegram_adapter import STREAM_INTERRUPTED_TEXT, TelegramAdapter, edit_message, split_message  # noqa: E402
+
+LIMIT = MessageLimit.MAX_TEXT_LENGTH
+
+
+class FakeMessage:
+    """Сообщение Telegram: отклоняет слишком длинный и неизмененный текст, как Bot API."""
+
+    def __init__(self, chat, text):
+        self.chat = chat
+        self.text = text
+
+    async def reply_text(self, text, **kwargs):
+        return self.chat.send(text)
+
+    async def edit_text(self, text, **kwargs):
+        if len(text) > LIMIT:
+            raise BadRequest("Message is too long")
+        if text == self.text:
+            raise BadRequest("Message is not modified: specified new message content and reply markup "
+                             "are exactly the same as a current content and reply markup of the message")
+        self.text = text
+
+
+class FakeChat:
+    id = 42
+
+    def __init__(self):
+        self.messages = []
+
+    def send(self, text):
+        if len(text) > LIMIT:
+            raise BadRequest("Message is too long")
+        message = FakeMessage(self, text)
+        self.messages.append(message)
+        return message
+
+    async def send_action(self, action):
+        pass
+
+
+class FakeUpdate:
+    def __init__(self):
+        self.effective_chat = FakeChat()
+        self.message = FakeMessage(self.effective_chat, "вопрос")
+
+
+class ScriptedCore:
+    """Ядро бота, отдающее заданные фрагменты и, если указано, обрывающее поток ошибкой."""
+
+    def __init__(self, chunks, error=None):
+        self.chunks = chunks
+        self.error = error
+
+    async def stream_answer(self, question, session_id=None):
+        for chunk in self.chunks:
+            yield chunk
+        if self.error is not None:
+            raise self.error
+
+
+def reply(chunks, error=None):
+    saved = dict(CONFIG)
+    CONFIG["telegram_edit_interval"] = 0
+    try:
+        adapter = TelegramAdapter("123456:TEST", bot_core=ScriptedCore(chunks, error))
+        update = FakeUpdate()
+        asyncio.run(adapter._reply_streaming(update, "вопрос"))
+        return [message.text for message in update.effective_chat.messages]
+    finally:
+        CONFIG.clear()
+        CONFIG.update(saved)
+
+
+def test_split_message_prefers_line_breaks():
+    head, rest = split_message("а" * 10 + "\n" + "б" * 10, limit=15)
+    assert head == "а" * 10
+    assert rest == "б" * 10
+    assert split_message("в" * 20, limit=15) == ("в" * 15, "в" * 5)
+    assert split_message("короткий", limit=15) == ("короткий", "")
+
+
+def test_unchanged_text_is_not_an_error():
+    message = FakeChat().send("Ответ")
+    asyncio.run(edit_message(message, "Ответ"))
+    with pytest.raises(BadRequest):
+        asyncio.run(edit_message(message, "о" * (LIMIT + 1)))
+    assert reply(["Начало", "", " ответа"]) == ["Начало ответа"]
+
+
+def test_long_answer_continues_in_next_message():
+    paragraph = "слово " * 500
+    messages = reply([paragraph] * 3)
+    assert len(messages) == 3  # 9000 символов
+    assert all(len(text) <= LIMIT for text in messages)
+    assert " ".join(messages).split() == (paragraph * 3).split()
+
+
+def test_interrupted_stream_appends_notice():
+    messages = reply(["Начало ответа"], error=RuntimeError("сбой потока"))
+    assert messages == [f"Начало ответа\n\n{STREAM_INTERRUPTED_TEXT}"]
+
+
+def test_stream_failing_before_answer_reports_error():
+    messages = reply([], error=RuntimeError("сбой потока"))
+    assert messages == ["Извините, произошла ошибка при обработке вашего запроса."]
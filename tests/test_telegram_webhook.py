@@ -0,0 +1,105 @@
+"""
+Режим webhook с заглушкой Telegram Bot API (fake_telegram.py): обновление, принятое маршрутом
+/telegram/webhook, обрабатывается ботом, и ответ уходит в Bot API.
+"""
+import asyncio
+import os
+import sys
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("telegram")
+
+from config import CONFIG  # noqa: E402
+from fake_telegram import FakeTelegramServer  # noqa: E402
+
+SECRET = "test-secret"
+
+
+def start_update(update_id=1, chat_id=42):
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "Test"},
+            "text": "/start",
+            "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+        },
+    }
+
+
+async def run_webhook(check):
+    """Поднимает заглушку Bot API и приложение FastAPI в режиме webhook и выполняет проверку."""
+    server = FakeTelegramServer()
+    base_url = await server.start()
+    saved = dict(CONFIG)
+    CONFIG.update({
+        "llm_backend": "fake",
+        "bot_mode": "webhook",
+        "token": "123456:TEST",
+        "telegram_base_url": base_url,
+        "webhook_url": "https://bot.example/telegram/webhook",
+        "webhook_secret": SECRET,
+        "webhook_workers": 1,
+        # Данные сайта не нужны: страницы запрашиваются у заглушки и не находятся
+        "website_url": f"{server.base_url}/site",
+        "lab_url": f"{server.base_url}/site",
+        "consultative_url": f"{server.base_url}/site",
+    })
+    try:
+        import fast_api
+        await fast_api.startup()
+        try:
+            transport = httpx.ASGITransport(app=fast_api.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                await check(server, client)
+        finally:
+            await fast_api.shutdown()
+    finally:
+        CONFIG.clear()
+        CONFIG.update(saved)
+        await server.stop()
+
+
+def test_webhook_update_is_answered_through_bot_api():
+    async def check(server, client):
+        webhook = await server.wait_for("setWebhook")
+        assert webhook["secret_token"] == SECRET
+
+        response = await client.post("/telegram/webhook", json=start_update(),
+                                     headers={"X-Telegram-Bot-Api-Secret-Token": SECRET})
+        assert response.status_code == 200
+
+        message = await server.wait_for("sendMessage")
+        assert message["chat_id"] == "42"
+        assert message["text"] == "Добро пожаловать!"
+
+    asyncio.run(run_webhook(check))
+
+
+def test_webhook_rejects_update_without_secret():
+    async def check(server, client):
+        for headers in ({}, {"X-Telegram-Bot-Api-Secret-Token": "wrong"}):
+            response = await client.post("/telegram/webhook", json=start_update(), headers=headers)
+            assert response.status_code == 403
+        await asyncio.sleep(0.1)
+        assert not any(method == "sendMessage" for method, _ in server.calls)
+
+    asyncio.run(run_webhook(check))
+
+
+def test_webhook_mode_requires_secret():
+    saved = dict(CONFIG)
+    CONFIG.update({"llm_backend": "fake", "bot_mode": "webhook", "webhook_secret": ""})
+    try:
+        import fast_api
+        with pytest.raises(RuntimeError):
+            asyncio.run(fast_api.startup())
+    finally:
+        CONFIG.clear()
+        CONFIG.update(saved)
@@ -0,0 +1,165 @@
+"""
+Отложенная запись запросов на звонок (write_behind.py) на заглушке пула asyncpg:
+пакетная запись, ответ вызывающим только после фиксации, перезапуск и отмена фоновой записи.
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from write_behind import BATCH_INSERT_CALL_REQUESTS, CallWriteBehind  # noqa: E402
+
+
+class FakeTransaction:
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            await self.pool.commit_gate.wait()
+            self.pool.commits += 1
+
+
+class FakeConnection:
+    def __init__(self, pool):
+        self.pool = pool
+
+    def transaction(self):
+        return FakeTransaction(self.pool)
+
+    async def fetch(self, query, *args, timeout=None):
+        self.pool.queries.append((query, args))
+        await self.pool.fetch_gate.wait()
+        if query == BATCH_INSERT_CALL_REQUESTS:
+            return [{"request_id": i, "user_id": user_id}
+                    for i, user_id in enumerate(args[0], 1) if user_id in self.pool.users]
+        return [{"request_id": request_id} for request_id in args[1]]
+
+
+class FakePool:
+    """Пул asyncpg: фиксация и запросы можно задержать событиями commit_gate и fetch_gate."""
+
+    def __init__(self, users=()):
+        self.users = set(users)
+        self.queries = []
+        self.commits = 0
+        self.commit_gate = asyncio.Event()
+        self.commit_gate.set()
+        self.fetch_gate = asyncio.Event()
+        self.fetch_gate.set()
+
+    def acquire(self):
+        pool = self
+
+        class Acquire:
+            async def __aenter__(self):
+                return FakeConnection(pool)
+
+            async def __aexit__(self, *args):
+                pass
+
+        return Acquire()
+
+
+def test_operations_are_written_in_one_batch():
+    async def run():
+        pool = FakePool(users={1, 2, 3})
+        writer = CallWriteBehind(pool, batch_size=100, flush_interval=0.05)
+        writer.start()
+        results = await asyncio.gather(
+            *(writer.create_call_request(user_id) for user_id in (1, 2, 3, 4)),
+            writer.update_call_status(10), writer.update_call_status(11, False), writer.update_call_status(10, False),
+        )
+        await writer.close()
+        return pool, writer, results
+
+    pool, writer, results = asyncio.run(run())
+    assert results == [True, True, True, False, True, True, True]
+    assert pool.commits == 1
+    insert = [args for query, args in pool.queries if query == BATCH_INSERT_CALL_REQUESTS]
+    assert [list(args[0]) for args in insert] == [[1, 2, 3, 4]]
+    # Последнее изменение статуса запроса 10 — False: одно обновление на оба запроса
+    updates = [args for query, args in pool.queries if query != BATCH_INSERT_CALL_REQUESTS]
+    assert [(status, sorted(ids)) for status, ids in updates] == [(False, [10, 11])]
+    assert writer.stats()["batches"] == 1 and writer.stats()["operations"] == 7
+
+
+def test_result_is_returned_after_commit():
+    async def run():
+        pool = FakePool(users={1})
+        pool.commit_gate.clear()
+        writer = CallWriteBehind(pool, flush_interval=0)
+        writer.start()
+        call = asyncio.create_task(writer.create_call_request(1))
+        await asyncio.sleep(0.05)
+        assert pool.queries and not call.done()
+        pool.commit_gate.set()
+        result = await asyncio.wait_for(call, 1)
+        await writer.close()
+        return result, pool.commits
+
+    assert asyncio.run(run()) == (True, 1)
+
+
+def test_cancelled_writer_fails_taken_operations_and_restarts():
+    async def run():
+        pool = FakePool(users={1})
+        pool.fetch_gate.clear()
+        writer = CallWriteBehind(pool, flush_interval=0)
+        writer.start()
+        in_flush = asyncio.create_task(writer.create_call_request(1))
+        await asyncio.sleep(0.05)
+        queued = asyncio.create_task(writer.update_call_status(5))
+        await asyncio.sleep(0)
+        writer._task.cancel()
+        interrupted = await asyncio.wait_for(asyncio.gather(in_flush, queued), 1)
+
+        pool.fetch_gate.set()
+        restarted = await asyncio.wait_for(writer.create_call_request(1), 1)
+        await writer.close()
+        return interrupted, restarted
+
+    interrupted, restarted = asyncio.run(run())
+    assert interrupted == [False, False]
+    assert restarted is True
+
+
+def test_crashed_writer_is_restarted_for_queued_operations():
+    async def run():
+        pool = FakePool(users={1})
+        writer = CallWriteBehind(pool, flush_interval=0)
+
+        async def crash():
+            raise RuntimeError("writer crashed")
+
+        writer._task = asyncio.create_task(crash())
+        await asyncio.sleep(0)
+        result = await asyncio.wait_for(writer.create_call_request(1), 1)
+        await writer.close()
+        return result
+
+    assert asyncio.run(run()) is True
+
+
+def test_submit_without_writer_returns_false():
+    writer = CallWriteBehind(FakePool())
+    assert asyncio.run(writer.update_call_status(1)) is False
+
+
+@pytest.mark.parametrize("batch_size", [1, 2])
+def test_batch_size_limits_transaction(batch_size):
+    async def run():
+        pool = FakePool(users={1, 2, 3})
+        writer = CallWriteBehind(pool, batch_size=batch_size, flush_interval=0.05)
+        writer.start()
+        await asyncio.gather(*(writer.create_call_request(user_id) for user_id in (1, 2, 3)))
+        await writer.close()
+        return pool.commits
+
+    assert asyncio.run(run()) == -(-3 // batch_size)
@@ -0,0 +1,91 @@
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Класс TTLCache представляет собой ограниченный по размеру LRU-кэш с временем жизни записей.
+
+    Attributes:
+        maxsize (int): Максимальное число записей; при переполнении удаляются самые давние.
+        ttl (float): Время жизни записи в секундах.
+        hits (int): Число попаданий в кэш.
+        misses (int): Число промахов.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        """
+        Инициализирует экземпляр класса TTLCache.
+
+        Args:
+            maxsize (int): Максимальное число записей.
+            ttl (float): Время жизни записи в секундах.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()  # ключ -> (время истечения, значение)
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        """
+        Возвращает значение по ключу, если запись существует и не устарела.
+
+        Args:
+            key: Ключ записи.
+            default: Значение, возвращаемое при промахе.
+
+        Returns:
+            Значение записи или `default`.
+        """
+        item = self._data.get(key)
+        if item is not None:
+            expires, value = item
+            if expires > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._data[key]
+        self.misses += 1
+        return default
+
+    def set(self, key, value):
+        """
+        Сохраняет значение по ключу, вытесняя самые давние записи при переполнении.
+
+        Args:
+            key: Ключ записи.
+            value: Значение записи.
+        """
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        """Удаляет запись по ключу и возвращает ее значение."""
+        item = self._data.pop(key, None)
+        return item[1] if item is not None else default
+
+    def clear(self):
+        """Удаляет все записи, не сбрасывая счетчики."""
+        self._data.clear()
+
+    def stats(self) -> dict:
+        """
+        Возвращает статистику использования кэша.
+
+        Returns:
+            Dict[str, Any]: Размер, число попаданий и промахов и доля попаданий.
+        """
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
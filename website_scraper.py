@@ -1,10 +1,33 @@
+import asyncio
+import html
 import json
 import os
 from base_scraper import *
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from bs4.builder import builder_registry
 from config import *
+from metrics import PAGE_FETCH_SECONDS, PAGE_PARSE_SECONDS
+from page_cache import PageCache
 import aiohttp
 
+# Теги, которые реально читают парсеры разделов каждой страницы.
+# Остальная разметка при построении дерева пропускается.
+MAIN_PAGE_TAGS = ["p", "table"]
+CONSULTATIVE_PAGE_TAGS = ["table"]
+LAB_PAGE_TAGS = ["p", "strong", "ol"]
+
+# Ключи CONFIG с адресами страниц сайта; имя страницы для меток метрик — ключ без "_url"
+PAGE_URL_KEYS = ["website_url", "consultative_url", "lab_url"]
+
+
+def page_name(url):
+    """Возвращает короткое имя страницы сайта для меток метрик ("other" для прочих адресов)."""
+    for key in PAGE_URL_KEYS:
+        if CONFIG.get(key) == url:
+            return key[:-len("_url")]
+    return "other"
+
+
 class WebsiteScraper(BaseScraper):
     """
     Класс WebsiteScraper представляет собой скрапер для парсинга данных с веб-сайтов.
@@ -12,24 +35,46 @@ class WebsiteScraper(BaseScraper):
     расписании и других данных с различных страниц сайта.
 
     Attributes:
-        session: Асинхронная HTTP-сессия для выполнения запросов.
+        session: Долгоживущая асинхронная HTTP-сессия с пулом соединений.
+        timeout (float): Таймаут загрузки одной страницы в секундах.
+        limit_per_host (int): Максимальное число одновременных соединений к одному хосту.
+        keepalive (float): Время удержания простаивающего соединения в секундах.
+        page_cache (PageCache): Дисковый кэш страниц для условных запросов.
+        parser (str): Движок парсинга HTML для BeautifulSoup ("lxml" или "html.parser").
     """
 
-    def __init__(self):
+    def __init__(self, timeout: float = None, limit_per_host: int = None, keepalive: float = None,
+                 parser: str = None):
         """
-        Инициализирует экземпляр класса. Создает атрибут session, который будет использоваться
-        для выполнения HTTP-запросов.
+        Инициализирует экземпляр класса. Сессия создается лениво при первом запросе,
+        так как она должна принадлежать работающему циклу событий.
+
+        Args:
+            timeout (float, optional): Таймаут загрузки одной страницы в секундах.
+            limit_per_host (int, optional): Лимит соединений к одному хосту.
+            keepalive (float, optional): Время удержания простаивающего соединения.
+            parser (str, optional): Движок парсинга HTML. Если он не установлен,
+                                    используется встроенный "html.parser".
         """
         self.session = None  # Не создаем сессию здесь
+        self.timeout = timeout if timeout is not None else CONFIG.get("scraper_timeout", 10)
+        self.limit_per_host = limit_per_host if limit_per_host is not None else CONFIG.get("scraper_limit_per_host", 4)
+        self.keepalive = keepalive if keepalive is not None else CONFIG.get("scraper_keepalive", 30)
+        self.page_cache = PageCache(CONFIG.get("page_cache_dir", os.path.join("data", "page_cache")))
+        self._parsed = {}  # URL -> (хэш страницы, результаты парсеров разделов)
+        self.parser = parser or CONFIG.get("html_parser", "lxml")
+        if builder_registry.lookup(self.parser) is None:
+            print(f"Парсер {self.parser} недоступен, используется html.parser")
+            self.parser = "html.parser"
 
     async def __aenter__(self):
         """
-        Метод контекстного менеджера для асинхронного входа. Создает новую HTTP-сессию.
+        Метод контекстного менеджера для асинхронного входа. Открывает HTTP-сессию, если она еще не открыта.
 
         Returns:
             self: Возвращает текущий экземпляр класса.
         """
-        self.session = aiohttp.ClientSession()
+        self._get_session()
         return self
 
     async def __aexit__(self, exc_type, exc, tb):
@@ -41,90 +86,154 @@ class WebsiteScraper(BaseScraper):
             exc: Само исключение, если оно произошло.
             tb: Traceback исключения, если оно произошло.
         """
-        await self.session.close()
+        await self.close()
 
-    async def fetch_data(self, query: Optional[str] = None) -> List[Dict[str, Any]]:
+    def _get_session(self):
         """
-        Основной метод для получения данных с сайта. Выполняет парсинг различных разделов сайта
-        и возвращает структурированные данные.
+        Возвращает общую HTTP-сессию, создавая ее при первом обращении.
+
+        Returns:
+            aiohttp.ClientSession: Сессия с пулом соединений и поддержкой keep-alive.
+        """
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive
+            )
+            self.session = aiohttp.ClientSession(connector=connector)
+        return self.session
+
+    async def close(self):
+        """Закрывает общую HTTP-сессию и освобождает соединения пула."""
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+
+    async def _fetch_page(self, url):
+        """
+        Загружает страницу через общую сессию с использованием условного запроса.
 
         Args:
-            query (Optional[str]): Дополнительный параметр запроса (не используется).
+            url (str): Адрес страницы.
 
         Returns:
-            List[Dict[str, Any]]: Список словарей, содержащих извлеченные данные.
-                                  В случае ошибки возвращается пустой список.
+            Dict[str, str]: Запись кэша страницы с ключами "html" и "hash".
 
         Описание логики:
-        - Парсит главную страницу сайта.
-        - Парсит расписание отделения консультативной помощи.
-        - Парсит напоминания для пациентов.
-        - Возвращает объединенные данные.
+        - Отправляет сохраненные ETag/Last-Modified в заголовках If-None-Match/If-Modified-Since.
+        - При ответе 304 возвращает страницу из кэша.
+        - Иначе сохраняет новую версию страницы и ее заголовки в кэш.
         """
-        async with aiohttp.ClientSession() as session:
-            try:
-                main_data = await self.parse_main_site(session)
-                combined_contacts = main_data['contacts']
-                combined_schedule = main_data['schedule']
-                results_schedule = await self.parse_results_schedule(session)
-                patient_reminder = await self.parse_patient_reminder(session)
-                # Сохранение данных в JSON файлы (закомментировано)
-                # self.save_to_json(self.clean_text(combined_contacts), "contacts.json")
-                # self.save_to_json(self.clean_text(combined_schedule), "schedule.json")
-                # self.save_to_json(self.clean_text(results_schedule), "results_schedule.json")
-                # self.save_to_json(patient_reminder, "patient_reminder.json")
-                return [{
-                    "contacts": combined_contacts,
-                    "schedule": combined_schedule,
-                    "results": results_schedule,
-                    "patient_reminder": patient_reminder
-                }]
-            except Exception as e:
-                print(f"Ошибка парсинга сайта: {e}")
-                return []
-
-    async def parse_main_site(self, session):
-        """
-        Парсит главную страницу сайта для извлечения контактной информации и основного расписания.
+        session = self._get_session()
+        cached = self.page_cache.get(url)
+        headers = self.page_cache.conditional_headers(url)
+        with PAGE_FETCH_SECONDS.time(page=page_name(url)) as labels:
+            async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=self.timeout)) as response:
+                if response.status == 304 and cached:
+                    labels["outcome"] = "not_modified"
+                    return cached
+                response.raise_for_status()
+                text = await response.text()
+                return self.page_cache.put(
+                    url, text,
+                    etag=response.headers.get("ETag"),
+                    last_modified=response.headers.get("Last-Modified")
+                )
+
+    def make_soup(self, markup, tags=None):
+        """
+        Строит дерево BeautifulSoup выбранным движком парсинга.
 
         Args:
-            session: Асинхронная HTTP-сессия.
+            markup (str): HTML-код страницы.
+            tags (List[str], optional): Теги, которые нужно сохранить в дереве.
+                                        Если не указаны, разбирается вся страница.
 
         Returns:
-            Dict[str, str]: Словарь, содержащий контакты и расписание.
+            BeautifulSoup: Объект для парсинга HTML.
+        """
+        parse_only = SoupStrainer(tags) if tags else None
+        return BeautifulSoup(markup, self.parser, parse_only=parse_only)
 
-        Описание логики:
-        - Получает HTML-код главной страницы.
-        - Использует BeautifulSoup для парсинга данных.
-        - Возвращает контакты и объединенное расписание.
+    def _parse_sections(self, url, page, parsers, tags=None):
         """
-        async with session.get(CONFIG["website_url"]) as response:
-            html = await response.text()
-            soup = BeautifulSoup(html, 'html.parser')
-            return {
-                "contacts": self._parse_contacts(soup),
-                "schedule": self._parse_main_schedule(soup) + "\n" + await self.parse_consultative_department_schedule(session)
-            }
+        Запускает парсеры разделов страницы, только если ее содержимое изменилось.
+
+        Args:
+            url (str): Адрес страницы.
+            page (Dict[str, str]): Запись кэша страницы.
+            parsers (Dict[str, Callable]): Парсеры разделов, принимающие объект BeautifulSoup.
+            tags (List[str], optional): Теги, которые читают парсеры разделов.
 
-    async def parse_consultative_department_schedule(self, session):
+        Returns:
+            Dict[str, Any]: Результаты парсеров по именам разделов.
         """
-        Парсит страницу с расписанием отделения консультативной помощи.
+        with PAGE_PARSE_SECONDS.time(page=page_name(url)) as labels:
+            cached = self._parsed.get(url)
+            if cached and cached[0] == page["hash"]:
+                labels["outcome"] = "unchanged"
+                return cached[1]
+            soup = self.make_soup(page["html"], tags)
+            sections = {name: parser(soup) for name, parser in parsers.items()}
+            self._parsed[url] = (page["hash"], sections)
+        return sections
+
+    async def fetch_data(self, query: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Основной метод для получения данных с сайта. Выполняет парсинг различных разделов сайта
+        и возвращает структурированные данные.
 
         Args:
-            session: Асинхронная HTTP-сессия.
+            query (Optional[str]): Дополнительный параметр запроса (не используется).
 
         Returns:
-            str: Текстовое представление расписания.
+            List[Dict[str, Any]]: Список словарей, содержащих извлеченные данные.
+                                  В случае ошибки возвращается пустой список.
 
         Описание логики:
-        - Получает HTML-код страницы с расписанием.
-        - Использует BeautifulSoup для извлечения таблицы расписания.
-        - Возвращает форматированный текст расписания.
+        - Параллельно загружает главную страницу, страницу отделения консультативной помощи
+          и страницу лаборатории (с условными запросами).
+        - Разделы страницы парсятся заново, только если изменилось ее содержимое.
+        - Парсит контакты и расписание главной страницы и расписание консультативного отделения.
+        - Парсит расписание выдачи результатов и напоминания для пациентов со страницы лаборатории.
+        - Возвращает объединенные данные.
         """
-        async with session.get(CONFIG["consultative_url"]) as response:
-            html = await response.text()
-            soup = BeautifulSoup(html, 'html.parser')
-            return self._parse_consultative_schedule(soup)
+        try:
+            main_page, consultative_page, lab_page = await asyncio.gather(
+                self._fetch_page(CONFIG["website_url"]),
+                self._fetch_page(CONFIG["consultative_url"]),
+                self._fetch_page(CONFIG["lab_url"])
+            )
+            main = self._parse_sections(CONFIG["website_url"], main_page, {
+                "contacts": self._parse_contacts,
+                "schedule": self._parse_main_schedule
+            }, MAIN_PAGE_TAGS)
+            consultative = self._parse_sections(CONFIG["consultative_url"], consultative_page, {
+                "schedule": self._parse_consultative_schedule
+            }, CONSULTATIVE_PAGE_TAGS)
+            lab = self._parse_sections(CONFIG["lab_url"], lab_page, {
+                "results": self._parse_results_schedule,
+                "patient_reminder": self.parse_patient_reminder
+            }, LAB_PAGE_TAGS)
+
+            combined_contacts = main["contacts"]
+            combined_schedule = main["schedule"] + "\n" + consultative["schedule"]
+            results_schedule = lab["results"]
+            patient_reminder = lab["patient_reminder"]
+            # Сохранение данных в JSON файлы (закомментировано)
+            # self.save_to_json(self.clean_text(combined_contacts), "contacts.json")
+            # self.save_to_json(self.clean_text(combined_schedule), "schedule.json")
+            # self.save_to_json(self.clean_text(results_schedule), "results_schedule.json")
+            # self.save_to_json(patient_reminder, "patient_reminder.json")
+            return [{
+                "contacts": combined_contacts,
+                "schedule": combined_schedule,
+                "results": results_schedule,
+                "patient_reminder": patient_reminder
+            }]
+        except Exception as e:
+            print(f"Ошибка парсинга сайта: {e}")
+            return []
 
     def _parse_consultative_schedule(self, soup):
         """
@@ -152,19 +261,20 @@ class WebsiteScraper(BaseScraper):
             for row in rows:
                 cols = row.find_all('td')
                 if len(cols) == 2:
-                    day = cols[0].get_text(strip=True)
-                    time = cols[1].get_text(strip=True)
+                    # Текст с сайта экранируется: результат отправляется в Telegram с разметкой HTML
+                    day = html.escape(cols[0].get_text(strip=True))
+                    time = html.escape(cols[1].get_text(strip=True))
                     result.append(f"• {day}: {time}")
         else:
             result.append("Расписание не найдено")
         return '\n'.join(result)
 
-    async def parse_patient_reminder(self, session):
+    def parse_patient_reminder(self, soup):
         """
         Парсит страницу с напоминаниями для пациентов.
 
         Args:
-            session: Асинхронная HTTP-сессия.
+            soup: Объект BeautifulSoup для парсинга HTML страницы лаборатории.
 
         Returns:
             Dict[str, List[str]]: Словарь, где ключи — это заголовки, а значения — списки напоминаний.
@@ -174,20 +284,17 @@ class WebsiteScraper(BaseScraper):
         - Извлекает связанные с ними пункты списка.
         - Возвращает словарь напоминаний.
         """
-        async with session.get(CONFIG["lab_url"]) as response:
-            html = await response.text()
-            soup = BeautifulSoup(html, 'html.parser')
-            reminders = {}
-            strong_headers = soup.find_all("strong", style=re.compile(r"color:\s*#21347d;"))
-            for strong in strong_headers:
-                title = strong.get_text(strip=True).replace("\xa0", " ")
-                if not title:
-                    continue
-                next_ol = strong.find_next("ol")
-                if next_ol:
-                    items = [li.get_text(strip=True) for li in next_ol.find_all("li")]
-                    reminders[title] = items
-            return reminders if reminders else "Нужные памятки не найдены"
+        reminders = {}
+        strong_headers = soup.find_all("strong", style=re.compile(r"color:\s*#21347d;"))
+        for strong in strong_headers:
+            title = strong.get_text(strip=True).replace("\xa0", " ")
+            if not title:
+                continue
+            next_ol = strong.find_next("ol")
+            if next_ol:
+                items = [li.get_text(strip=True) for li in next_ol.find_all("li")]
+                reminders[title] = items
+        return reminders if reminders else "Нужные памятки не найдены"
 
     def _parse_results_schedule(self, soup):
         """
@@ -288,26 +395,34 @@ class WebsiteScraper(BaseScraper):
             str: Форматированный текст с контактами.
 
         Описание логики:
+        - За один проход по абзацам находит блок единого центра и блок для студентов.
         - Извлекает телефонные номера и адреса.
         - Форматирует их в удобочитаемый вид.
         """
         phones = []
         main_phone_text = "Телефон единого центра обработки звонков диагностической поликлиники"
-        main_phone = soup.find(
-            lambda tag: tag.name == 'p' and main_phone_text in tag.get_text(strip=True).replace('\xa0', ' '))
+        main_phone = None
+        student_block = None
+        # Один проход по абзацам: текст каждого абзаца извлекается только один раз
+        for paragraph in soup.find_all('p'):
+            text = paragraph.get_text(strip=True).replace('\xa0', ' ')
+            if main_phone is None and main_phone_text in text:
+                main_phone = paragraph
+            if student_block is None and 'СТУДЕНТАМ ЧГМА' in text:
+                student_block = paragraph
+            if main_phone is not None and student_block is not None:
+                break
         if main_phone:
             phone_number = main_phone.find('strong', style=lambda s: s and 'color' in s.lower())
             if phone_number:
-                phone_text = phone_number.get_text(strip=True)
+                phone_text = html.escape(phone_number.get_text(strip=True))
                 phones.append(f" <b>Единый центр:</b> {phone_text}")
-        student_block = soup.find(
-            lambda tag: tag.name == 'p' and 'СТУДЕНТАМ ЧГМА' in tag.get_text(strip=True).replace('\xa0', ' '))
         if student_block:
             student_phones = student_block.find_all('strong', style=lambda s: s and 'color' in s.lower())
             if student_phones:
                 phones.append("\n <b>Для студентов ЧГМА:</b>")
                 for phone in student_phones:
-                    phone_text = phone.get_text(strip=True)
+                    phone_text = html.escape(phone.get_text(strip=True))
                     phones.append(f" {phone_text}")
                 address_text = "ул. Бабушкина, 48 (к терапевту Котовщиковой И.А.)"
 
@@ -362,7 +477,8 @@ class WebsiteScraper(BaseScraper):
         for row in table.find_all('tr'):
             cols = row.find_all('td')
             if len(cols) == 2:
-                day = cols[0].get_text(strip=True)
-                time = cols[1].get_text(' ', strip=True)
+                # Текст с сайта экранируется: результат отправляется в Telegram с разметкой HTML
+                day = html.escape(cols[0].get_text(strip=True))
+                time = html.escape(cols[1].get_text(' ', strip=True))
                 result.append(f"• {day}: {time}")
         return result
\ No newline at end of file
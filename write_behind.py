@@ -0,0 +1,183 @@
+import asyncio
+from datetime import datetime
+
+from config import CONFIG
+
+# Создание запросов пакетом: одна вставка на все запросы пакета, телефон берется из users.
+# Пользователи, которых нет в users, не попадают в выборку и получают False.
+BATCH_INSERT_CALL_REQUESTS = """
+    INSERT INTO call_requests (user_id, phone, request_time, call_status)
+    SELECT u.user_id, u.phone, r.request_time, FALSE
+    FROM unnest($1::bigint[], $2::timestamp[]) AS r (user_id, request_time)
+    JOIN users u ON u.user_id = r.user_id
+    RETURNING request_id, user_id
+"""
+
+BATCH_UPDATE_CALL_STATUS = """
+    UPDATE call_requests SET call_status = $1
+    WHERE request_id = ANY($2::bigint[])
+    RETURNING request_id
+"""
+
+
+class CallWriteBehind:
+    """
+    Очередь отложенной записи запросов на звонок и изменений их статуса.
+
+    Операции, пришедшие за `flush_interval` (но не больше `batch_size`), записываются
+    одной транзакцией: все новые запросы — одним INSERT ... SELECT, изменения статуса —
+    одним UPDATE ... WHERE request_id = ANY(...) на каждое значение статуса.
+
+    Вызывающий получает результат только после фиксации транзакции (подтверждение
+    после записи), поэтому семантика вызова не отличается от немедленной записи,
+    но задержка увеличивается не более чем на `flush_interval`.
+
+    Если фоновая запись отменена, операции текущего пакета и очереди получают False.
+    Если она завершилась ошибкой, False получает текущий пакет, а очередь записывается
+    перезапущенной задачей при следующем вызове.
+
+    Attributes:
+        pool (asyncpg.Pool): Пул соединений.
+        batch_size (int): Максимальное число операций в одной транзакции.
+        flush_interval (float): Максимальное время ожидания пакета в секундах.
+        query_timeout (float): Предельное время одного запроса в секундах.
+        batches (int): Число записанных пакетов.
+        operations (int): Число записанных операций.
+    """
+
+    def __init__(self, pool, batch_size=None, flush_interval=None, query_timeout=None):
+        self.pool = pool
+        self.batch_size = batch_size if batch_size is not None else CONFIG.get("db_batch_size", 500)
+        self.flush_interval = flush_interval if flush_interval is not None else CONFIG.get("db_flush_interval", 0.02)
+        self.query_timeout = query_timeout if query_timeout is not None else CONFIG.get("db_query_timeout", 5)
+        self.queue = asyncio.Queue()
+        self.batches = 0
+        self.operations = 0
+        self._task = None
+
+    def start(self):
+        """Запускает фоновую запись; вызывается из работающего цикла событий"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """Записывает накопленные операции и останавливает фоновую запись"""
+        if self._task is None:
+            return
+        await self.queue.put(None)  # Признак остановки: все операции до него будут записаны
+        await self._task
+        self._task = None
+
+    async def _submit(self, operation):
+        if self._task is None:
+            print("Batch write error: очередь записи не запущена или закрыта")
+            return False
+        if self._task.done():
+            # Фоновая запись завершилась аварийно или отменена: перезапускаем для новых операций
+            error = None if self._task.cancelled() else self._task.exception()
+            print(f"Batch writer stopped ({error!r}), restarting")
+            self._task = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((operation, future))
+        return await future
+
+    async def create_call_request(self, user_id):
+        """Создание запроса на обратный звонок; True после фиксации, False если пользователя нет"""
+        return await self._submit(("create", user_id, datetime.now()))
+
+    async def update_call_status(self, request_id, status=True):
+        """Обновление статуса звонка; True после фиксации"""
+        return await self._submit(("status", request_id, status))
+
+    async def _collect(self, batch):
+        """
+        Дополняет пакет операциями, пришедшими за flush_interval (не больше batch_size).
+
+        Returns:
+            bool: True, если получен признак остановки.
+        """
+        deadline = asyncio.get_running_loop().time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - asyncio.get_running_loop().time()
+            try:
+                item = self.queue.get_nowait() if timeout <= 0 else await asyncio.wait_for(self.queue.get(), timeout)
+            except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                break
+            if item is None:
+                return True
+            batch.append(item)
+        return False
+
+    async def _run(self):
+        batch = []
+        try:
+            stop = False
+            while not stop:
+                first = await self.queue.get()
+                if first is None:
+                    break
+                batch = [first]
+                stop = await self._collect(batch)
+                await self._flush(batch)
+                batch = []
+        except asyncio.CancelledError:
+            # Запись остановлена: операции в очереди больше никто не запишет
+            while not self.queue.empty():
+                item = self.queue.get_nowait()
+                if item is not None:
+                    batch.append(item)
+            raise
+        finally:
+            # Операции, уже взятые из очереди, не должны остаться без ответа; при отмене посреди
+            # записи транзакция могла и зафиксироваться, поэтому результат — неудача, как при ошибке
+            pending = [future for _, future in batch if not future.done()]
+            if pending:
+                print(f"Batch write interrupted: {len(pending)} operations not confirmed")
+            for future in pending:
+                future.set_result(False)
+
+    async def _flush(self, batch):
+        """Записывает пакет одной транзакцией и сообщает результат каждому вызывающему"""
+        creates = [(op, future) for (op, future) in batch if op[0] == "create"]
+        updates = [(op, future) for (op, future) in batch if op[0] == "status"]
+        try:
+            async with self.pool.acquire() as conn:
+                async with conn.transaction():
+                    created = set()
+                    if creates:
+                        rows = await conn.fetch(
+                            BATCH_INSERT_CALL_REQUESTS,
+                            [op[1] for op, _ in creates], [op[2] for op, _ in creates],
+                            timeout=self.query_timeout
+                        )
+                        created = {row["user_id"] for row in rows}
+                    # Для одного запроса в пакете действует последнее изменение статуса
+                    statuses = {}
+                    for op, _ in updates:
+                        statuses[op[1]] = op[2]
+                    for status in set(statuses.values()):
+                        request_ids = [request_id for request_id, value in statuses.items() if value == status]
+                        await conn.fetch(BATCH_UPDATE_CALL_STATUS, status, request_ids, timeout=self.query_timeout)
+        except Exception as e:
+            print(f"Batch write error: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(False)
+            return
+        self.batches += 1
+        self.operations += len(batch)
+        for op, future in creates:
+            if not future.done():
+                future.set_result(op[1] in created)
+        for _, future in updates:
+            if not future.done():
+                future.set_result(True)
+
+    def stats(self):
+        """Число записанных пакетов и операций, средний размер пакета и длина очереди"""
+        return {
+            "batches": self.batches,
+            "operations": self.operations,
+            "avg_batch": round(self.operations / self.batches, 1) if self.batches else 0.0,
+            "queued": self.queue.qsize(),
+        }